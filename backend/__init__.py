@@ -250,6 +250,7 @@ def add_api_endpoints(app):
         TasksQueriesJsonAPI,
         TasksQueriesXmlAPI,
         TasksQueriesGpxAPI,
+        TasksQueriesTileAPI,
         TasksQueriesAoiAPI,
         TasksQueriesMappedAPI,
         TasksQueriesOwnInvalidatedAPI,
@@ -332,6 +333,7 @@ def add_api_endpoints(app):
         NotificationsAllAPI,
         NotificationsQueriesCountUnreadAPI,
         NotificationsQueriesPostUnreadAPI,
+        NotificationsQueriesStreamUnreadAPI,
     )
     from backend.api.notifications.actions import (
         NotificationsActionsDeleteMultipleAPI,
@@ -590,6 +592,13 @@ def add_api_endpoints(app):
     api.add_resource(
         TasksQueriesGpxAPI, format_url("projects/<int:project_id>/tasks/queries/gpx/")
     )
+    api.add_resource(
+        TasksQueriesTileAPI,
+        format_url(
+            "projects/<int:project_id>/tasks/tiles/<int:zoom>/<int:x>/<int:y>.mvt"
+        ),
+        strict_slashes=False,
+    )
     api.add_resource(
         TasksQueriesAoiAPI, format_url("projects/<int:project_id>/tasks/queries/aoi/")
     )
@@ -849,6 +858,10 @@ def add_api_endpoints(app):
         format_url("notifications/queries/own/post-unread/"),
         methods=["POST"],
     )
+    api.add_resource(
+        NotificationsQueriesStreamUnreadAPI,
+        format_url("notifications/queries/own/stream-unread/"),
+    )
     # Notifications Actions endpoints
     api.add_resource(
         NotificationsActionsDeleteMultipleAPI,
@@ -1,3 +1,4 @@
+from flask import Response
 from flask_restful import Resource, request
 from backend.services.messaging.message_service import (
     MessageService,
@@ -239,3 +240,37 @@ class NotificationsQueriesPostUnreadAPI(Resource):
         user_id = token_auth.current_user()
         unread_count = NotificationService.update(user_id)
         return unread_count, 200
+
+
+class NotificationsQueriesStreamUnreadAPI(Resource):
+    @tm.pm_only(False)
+    @token_auth.login_required
+    def get(self):
+        """
+        Streams the count of unread messages as server-sent events
+        ---
+        tags:
+          - notifications
+        produces:
+          - text/event-stream
+        parameters:
+            - in: header
+              name: Authorization
+              description: Base64 encoded session token
+              required: true
+              type: string
+              default: Token sessionTokenHere==
+        responses:
+            200:
+                description: Events with the same data as the count of unread messages, the
+                    current count is sent first and then every change. The stream closes after
+                    a while and clients are expected to reconnect
+            500:
+                description: Internal Server Error
+        """
+        events = NotificationService.stream_unread_counters(token_auth.current_user())
+        return Response(
+            events,
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
@@ -4,6 +4,7 @@ from flask import send_file
 from flask_restful import Resource, current_app, request
 from schematics.exceptions import DataError
 from distutils.util import strtobool
+from backend.models.postgis.utils import InvalidData
 from backend.models.dtos.project_dto import (
     DraftProjectDTO,
     ProjectDTO,
@@ -27,7 +28,6 @@ from backend.services.project_admin_service import (
     ProjectAdminService,
     ProjectAdminServiceError,
     InvalidGeoJson,
-    InvalidData,
 )
 from backend.services.recommendation_service import ProjectRecommendationService
 
@@ -118,12 +118,6 @@ class ProjectsRestAPI(Resource):
                 }, 403
         except ProjectServiceError as e:
             return {"Error": str(e).split("-")[1], "SubCode": str(e).split("-")[0]}, 403
-        finally:
-            # this will try to unlock tasks that have been locked too long
-            try:
-                ProjectService.auto_unlock_tasks(project_id)
-            except Exception as e:
-                current_app.logger.critical(str(e))
 
     @token_auth.login_required
     def post(self):
@@ -967,12 +961,6 @@ class ProjectsQueriesNoGeometriesAPI(Resource):
             return project_dto, 200
         except ProjectServiceError as e:
             return {"Error": str(e).split("-")[1], "SubCode": str(e).split("-")[0]}, 403
-        finally:
-            # this will try to unlock tasks that have been locked too long
-            try:
-                ProjectService.auto_unlock_tasks(project_id)
-            except Exception as e:
-                current_app.logger.critical(str(e))
 
 
 class ProjectsQueriesNoTasksAPI(Resource):
@@ -1,10 +1,10 @@
-import io
 from distutils.util import strtobool
 
-from flask import send_file, Response
+from flask import Response, stream_with_context
 from flask_restful import Resource, current_app, request
 from schematics.exceptions import DataError
 
+from backend.api.utils import stream_response
 from backend.services.mapping_service import MappingService
 from backend.models.dtos.grid_dto import GridDTO
 
@@ -15,6 +15,7 @@ from backend.services.validator_service import ValidatorService
 from backend.services.project_service import ProjectService, ProjectServiceError
 from backend.services.grid.grid_service import GridService
 from backend.models.postgis.statuses import UserRole
+from backend.models.postgis.task import MVT_MAX_ZOOM
 from backend.models.postgis.utils import InvalidGeoJson
 
 
@@ -104,18 +105,17 @@ class TasksQueriesJsonAPI(Resource):
                 else True
             )
 
-            tasks_json = ProjectService.get_project_tasks(int(project_id), tasks)
+            tasks_geojson = ProjectService.stream_project_tasks(int(project_id), tasks)
+            response = Response(
+                stream_with_context(tasks_geojson), mimetype="application/json"
+            )
 
             if as_file:
-                tasks_json = str(tasks_json).encode("utf-8")
-                return send_file(
-                    io.BytesIO(tasks_json),
-                    mimetype="application/json",
-                    as_attachment=True,
-                    download_name=f"{str(project_id)}-tasks.geojson",
-                )
-
-            return tasks_json, 200
+                response.headers[
+                    "Content-Disposition"
+                ] = f"attachment; filename={str(project_id)}-tasks.geojson"
+
+            return response
         except ProjectServiceError as e:
             return {"Error": str(e)}, 403
 
@@ -214,9 +214,13 @@ class TasksQueriesXmlAPI(Resource):
               type: boolean
               description: Set to true if file download preferred
               default: False
+            - in: header
+              name: Accept-Encoding
+              type: string
+              description: The XML is gzip compressed when gzip is accepted
         responses:
             200:
-                description: OSM XML
+                description: OSM XML, streamed in chunks
             400:
                 description: Client Error
             404:
@@ -231,17 +235,16 @@ class TasksQueriesXmlAPI(Resource):
             else False
         )
 
-        xml = MappingService.generate_osm_xml(project_id, tasks)
+        xml_chunks = MappingService.generate_osm_xml(project_id, tasks)
 
         if as_file:
-            return send_file(
-                io.BytesIO(xml),
+            return stream_response(
+                xml_chunks,
                 mimetype="text.xml",
-                as_attachment=True,
                 download_name=f"HOT-project-{project_id}.osm",
             )
 
-        return Response(xml, mimetype="text/xml", status=200)
+        return stream_response(xml_chunks, mimetype="text/xml")
 
 
 class TasksQueriesGpxAPI(Resource):
@@ -270,9 +273,13 @@ class TasksQueriesGpxAPI(Resource):
               type: boolean
               description: Set to true if file download preferred
               default: False
+            - in: header
+              name: Accept-Encoding
+              type: string
+              description: The XML is gzip compressed when gzip is accepted
         responses:
             200:
-                description: GPX XML
+                description: GPX XML, streamed in chunks
             400:
                 description: Client error
             404:
@@ -288,17 +295,70 @@ class TasksQueriesGpxAPI(Resource):
             else False
         )
 
-        xml = MappingService.generate_gpx(project_id, tasks)
+        xml_chunks = MappingService.generate_gpx(project_id, tasks)
 
         if as_file:
-            return send_file(
-                io.BytesIO(xml),
+            return stream_response(
+                xml_chunks,
                 mimetype="text.xml",
-                as_attachment=True,
                 download_name=f"HOT-project-{project_id}.gpx",
             )
 
-        return Response(xml, mimetype="text/xml", status=200)
+        return stream_response(xml_chunks, mimetype="text/xml")
+
+
+class TasksQueriesTileAPI(Resource):
+    def get(self, project_id, zoom, x, y):
+        """
+        Get the tasks of a project in a tile as a Mapbox Vector Tile
+        ---
+        tags:
+            - tasks
+        produces:
+            - application/vnd.mapbox-vector-tile
+        parameters:
+            - name: project_id
+              in: path
+              description: Project ID the tasks are associated with
+              required: true
+              type: integer
+              default: 1
+            - name: zoom
+              in: path
+              description: Zoom level of the tile
+              required: true
+              type: integer
+              default: 12
+            - name: x
+              in: path
+              description: Column of the tile
+              required: true
+              type: integer
+              default: 2048
+            - name: y
+              in: path
+              description: Row of the tile
+              required: true
+              type: integer
+              default: 2048
+        responses:
+            200:
+                description: Vector tile with a tasks layer, empty if no task is in the tile
+            400:
+                description: Client Error - Invalid tile coordinates
+            404:
+                description: Project not found
+            500:
+                description: Internal Server Error
+        """
+        if zoom > MVT_MAX_ZOOM or x >= 2**zoom or y >= 2**zoom:
+            return {
+                "Error": "Invalid tile coordinates",
+                "SubCode": "InvalidData",
+            }, 400
+
+        tile = ProjectService.get_project_tasks_tile(project_id, zoom, x, y)
+        return Response(tile, mimetype="application/vnd.mapbox-vector-tile", status=200)
 
 
 class TasksQueriesAoiAPI(Resource):
@@ -1,6 +1,9 @@
+import zlib
 from functools import wraps
 from datetime import date, datetime
 
+from flask import Response, request, stream_with_context
+
 
 class TMAPIDecorators:
     """Class for Tasking Manager custom API decorators"""
@@ -34,3 +37,33 @@ def validate_date_input(input_date):
         return input_date
     except (TypeError, ValueError):
         raise ValueError("InvalidDateValue- Invalid date value")
+
+
+def gzip_chunks(chunks):
+    """Compresses a stream of bytes chunks as a gzip stream, one chunk at a time"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_response(chunks, mimetype: str, download_name: str = None) -> Response:
+    """
+    Sends the stream of bytes chunks as a chunked response, gzip compressed when the client
+    accepts it
+    :param download_name: sends the response as an attachment with this file name
+    """
+    gzip = "gzip" in request.accept_encodings
+    if gzip:
+        chunks = gzip_chunks(chunks)
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    if gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    if download_name:
+        response.headers[
+            "Content-Disposition"
+        ] = f"attachment; filename={download_name}"
+    return response
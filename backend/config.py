@@ -81,6 +81,12 @@ class EnvironmentConfig:
             + f"/{POSTGRES_DB}"
         )
 
+    # Cache shared by the workers. "local" keeps a separate in-process cache per worker,
+    # "redis" stores entries in the redis server at TM_CACHE_REDIS_URL
+    CACHE_BACKEND = os.getenv("TM_CACHE_BACKEND", "local")
+    CACHE_REDIS_URL = os.getenv("TM_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_LOCAL_MAXSIZE = int(os.getenv("TM_CACHE_LOCAL_MAXSIZE", 4096))
+
     # Logging settings
     LOG_LEVEL = os.getenv("TM_LOG_LEVEL", logging.DEBUG)
     LOG_DIR = os.getenv("TM_LOG_DIR", "/home/appuser/logs")
@@ -89,6 +95,12 @@ class EnvironmentConfig:
     MAPPER_LEVEL_INTERMEDIATE = int(os.getenv("TM_MAPPER_LEVEL_INTERMEDIATE", 250))
     MAPPER_LEVEL_ADVANCED = int(os.getenv("TM_MAPPER_LEVEL_ADVANCED", 500))
 
+    # Requests to the OSM API refreshing the mapper levels, the user details are cached for
+    # OSM_USER_DETAILS_CACHE_TTL seconds
+    OSM_REQUEST_TIMEOUT = int(os.getenv("TM_OSM_REQUEST_TIMEOUT", 10))
+    OSM_REQUEST_CONCURRENCY = int(os.getenv("TM_OSM_REQUEST_CONCURRENCY", 4))
+    OSM_USER_DETAILS_CACHE_TTL = int(os.getenv("TM_OSM_USER_DETAILS_CACHE_TTL", 3600))
+
     # Time to wait until task auto-unlock (e.g. '2h' or '7d' or '30m' or '1h30m')
     TASK_AUTOUNLOCK_AFTER = os.getenv("TM_TASK_AUTOUNLOCK_AFTER", "2h")
 
@@ -117,6 +129,13 @@ class EnvironmentConfig:
         MAIL_USERNAME = _params.get("SMTP_USER", None)
         MAIL_PASSWORD = _params.get("SMTP_PASSWORD", None)
 
+    # Outbox worker sending the queued emails, see SMTPService.send_queued_emails
+    MAIL_OUTBOX_BATCH_SIZE = int(os.getenv("TM_MAIL_OUTBOX_BATCH_SIZE", 100))
+    # Maximum number of emails sent per second, 0 to disable the rate limit
+    MAIL_OUTBOX_RATE_LIMIT = float(os.getenv("TM_MAIL_OUTBOX_RATE_LIMIT", 10))
+    # Emails still failing after this many attempts are kept in the outbox but not retried
+    MAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("TM_MAIL_OUTBOX_MAX_ATTEMPTS", 5))
+
     # If disabled project update emails will not be sent.
     SEND_PROJECT_EMAIL_UPDATES = bool(os.getenv("TM_SEND_PROJECT_EMAIL_UPDATES", True))
 
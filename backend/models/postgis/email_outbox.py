@@ -0,0 +1,59 @@
+import datetime
+
+from backend import db
+from backend.models.postgis.utils import timestamp
+
+# Delay before the first retry of a failed email, doubled on every further attempt
+RETRY_DELAY = datetime.timedelta(minutes=1)
+
+
+class EmailOutbox(db.Model):
+    """Emails waiting to be sent, persisted with the request and sent later by the outbox worker"""
+
+    __tablename__ = "email_outbox"
+    id = db.Column(db.BigInteger, primary_key=True)
+    to_address = db.Column(db.String, nullable=False)
+    subject = db.Column(db.String, nullable=False)
+    html_message = db.Column(db.String)
+    text_message = db.Column(db.String)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(
+        db.DateTime, nullable=False, default=timestamp, index=True
+    )
+    last_error = db.Column(db.String)
+    created_date = db.Column(db.DateTime, nullable=False, default=timestamp)
+
+    def __init__(
+        self,
+        to_address: str,
+        subject: str,
+        html_message: str,
+        text_message: str = None,
+    ):
+        self.to_address = to_address
+        self.subject = subject
+        self.html_message = html_message
+        self.text_message = text_message
+
+    @staticmethod
+    def get_due(limit: int, max_attempts: int):
+        """
+        Locks and returns the next emails to send. Rows locked by another worker are skipped so
+        concurrent workers never send the same email
+        """
+        return (
+            EmailOutbox.query.filter(
+                EmailOutbox.next_attempt_at <= timestamp(),
+                EmailOutbox.attempts < max_attempts,
+            )
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def record_failure(self, error: str):
+        """Schedules the next attempt with an exponential backoff"""
+        self.attempts += 1
+        self.last_error = error
+        self.next_attempt_at = timestamp() + RETRY_DELAY * 2 ** (self.attempts - 1)
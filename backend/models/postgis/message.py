@@ -1,3 +1,6 @@
+from collections import Counter
+
+from sqlalchemy import delete, update
 from sqlalchemy.sql.expression import false
 
 from backend import db
@@ -108,6 +111,48 @@ class Message(db.Model):
         db.session.add(self)
         db.session.commit()
 
+    @staticmethod
+    def insert_messages(messages: list):
+        """
+        Inserts the messages with a single multi-row statement and sets their ids. The messages
+        are not added to the session - DO NOT COMMIT HERE AS MESSAGES ARE PART OF LARGER TRANSACTIONS
+        """
+        if not messages:
+            return
+
+        message_ids = db.session.execute(
+            Message.__table__.insert().returning(
+                Message.__table__.c.id, sort_by_parameter_order=True
+            ),
+            [
+                dict(
+                    message=message.message,
+                    subject=message.subject,
+                    from_user_id=message.from_user_id,
+                    to_user_id=message.to_user_id,
+                    project_id=message.project_id,
+                    task_id=message.task_id,
+                    message_type=message.message_type,
+                    date=message.date or timestamp(),
+                    read=message.read or False,
+                )
+                for message in messages
+            ],
+        ).scalars()
+        for message, message_id in zip(messages, message_ids):
+            message.id = message_id
+
+        from backend.models.postgis.notification import Notification
+
+        Notification.count_new_messages(
+            db.session,
+            Counter(
+                message.to_user_id
+                for message in messages
+                if message.to_user_id is not None and not message.read
+            ),
+        )
+
     @staticmethod
     def get_all_contributors(project_id: int):
         """Get all contributors to a project"""
@@ -172,9 +217,9 @@ class Message(db.Model):
     @staticmethod
     def delete_multiple_messages(message_ids: list, user_id: int):
         """Deletes the specified messages to the user"""
-        Message.query.filter(
-            Message.to_user_id == user_id, Message.id.in_(message_ids)
-        ).delete(synchronize_session=False)
+        Message._delete_messages(
+            user_id, Message.to_user_id == user_id, Message.id.in_(message_ids)
+        )
         db.session.commit()
 
     @staticmethod
@@ -185,12 +230,29 @@ class Message(db.Model):
         :param message_type_filters: list of message types to filter by
         returns: None
         """
-        query = Message.query.filter(Message.to_user_id == user_id)
+        filters = [Message.to_user_id == user_id]
         if message_type_filters:
-            query = query.filter(Message.message_type.in_(message_type_filters))
-        query.delete(synchronize_session=False)
+            filters.append(Message.message_type.in_(message_type_filters))
+        Message._delete_messages(user_id, *filters)
         db.session.commit()
 
+    @staticmethod
+    def _delete_messages(user_id: int, *filters):
+        """Deletes the messages to the user matching the filters and updates their unread counters"""
+        from backend.models.postgis.notification import Notification
+
+        deleted_messages = db.session.execute(
+            delete(Message)
+            .where(*filters)
+            .returning(Message.date, Message.read)
+            .execution_options(synchronize_session=False)
+        ).all()
+        Notification.uncount_messages(
+            db.session,
+            user_id,
+            [message.date for message in deleted_messages if not message.read],
+        )
+
     def delete(self):
         """Deletes the current model from the DB"""
         db.session.delete(self)
@@ -203,9 +265,9 @@ class Message(db.Model):
         :param message_ids: list of message ids to mark as read
         :param user_id: user id of the user who is marking the messages as read
         """
-        Message.query.filter(
-            Message.to_user_id == user_id, Message.id.in_(message_ids)
-        ).update({Message.read: True}, synchronize_session=False)
+        Message._mark_messages_read(
+            user_id, Message.to_user_id == user_id, Message.id.in_(message_ids)
+        )
         db.session.commit()
 
     @staticmethod
@@ -215,11 +277,23 @@ class Message(db.Model):
         :param user_id: user id of the user who is marking the messages as read
         :param message_type_filters: list of message types to filter by
         """
-        # https://docs.sqlalchemy.org/en/13/orm/query.html#sqlalchemy.orm.query.Query.update
-        query = Message.query.filter(
-            Message.to_user_id == user_id, Message.read == false()
-        )
+        filters = [Message.to_user_id == user_id]
         if message_type_filters:
-            query = query.filter(Message.message_type.in_(message_type_filters))
-        query.update({Message.read: True}, synchronize_session=False)
+            filters.append(Message.message_type.in_(message_type_filters))
+        Message._mark_messages_read(user_id, *filters)
         db.session.commit()
+
+    @staticmethod
+    def _mark_messages_read(user_id: int, *filters):
+        """Marks the messages to the user matching the filters as read and updates their unread
+        counters"""
+        from backend.models.postgis.notification import Notification
+
+        read_message_dates = db.session.scalars(
+            update(Message)
+            .where(*filters, Message.read == false())
+            .values(read=True)
+            .returning(Message.date)
+            .execution_options(synchronize_session=False)
+        ).all()
+        Notification.uncount_messages(db.session, user_id, read_message_dates)
@@ -1,21 +1,39 @@
+from datetime import timedelta
+
+from sqlalchemy import String, event, func, inspect, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
 from backend import db
 from backend.models.postgis.user import User
 from backend.models.postgis.message import Message
 from backend.models.postgis.utils import timestamp
 from backend.models.dtos.notification_dto import NotificationDTO
-from datetime import datetime, timedelta
+
+# Channel the changes of the unread counters are published on, see NotificationService
+UNREAD_COUNTERS_CHANNEL = "unread_counters"
+# Messages received before users first check their notifications are new for this long
+NEW_MESSAGES_LOOKBACK = timedelta(days=30)
 
 
 class Notification(db.Model):
-    """Describes a Notification for a user"""
+    """
+    Unread message counters of a user, kept up to date in the transactions inserting, reading and
+    deleting their messages. Messages received after the user last checked their notifications
+    are also counted as new
+    """
 
     __tablename__ = "notifications"
 
     __table_args__ = (db.ForeignKeyConstraint(["user_id"], ["users.id"]),)
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.BigInteger, db.ForeignKey("users.id"), index=True)
-    unread_count = db.Column(db.Integer)
+    user_id = db.Column(
+        db.BigInteger, db.ForeignKey("users.id"), index=True, unique=True
+    )
+    unread_count = db.Column(db.Integer, default=0)
+    new_unread_count = db.Column(
+        db.Integer, default=0, server_default="0", nullable=False
+    )
     date = db.Column(db.DateTime, default=timestamp)
 
     # Relationships
@@ -35,30 +53,171 @@ class Notification(db.Model):
         db.session.commit()
 
     def update(self):
-        self.date = timestamp()
+        """Marks the messages received so far as checked, they are no longer new"""
+        db.session.execute(
+            _publish_counters(
+                update(Notification)
+                .where(Notification.id == self.id)
+                .values(date=timestamp(), new_unread_count=0)
+            )
+        )
         db.session.commit()
 
     @staticmethod
     def get_unread_message_count(user_id: int) -> int:
-        """Get count of unread messages for user"""
+        """Get count of unread messages the user received after last check"""
         notifications = Notification.query.filter(
             Notification.user_id == user_id
         ).first()
 
         # Create if does not exist.
         if notifications is None:
-            # In case users are new but have not logged in previously.
-            date_value = datetime.today() - timedelta(days=30)
-            notifications = Notification(
-                user_id=user_id, unread_count=0, date=date_value
+            # In case users are new but have not logged in previously. Concurrent requests may
+            # create it first, the row is read again either way
+            db.session.execute(
+                insert(Notification)
+                .values(
+                    user_id=user_id,
+                    unread_count=0,
+                    new_unread_count=0,
+                    date=timestamp() - NEW_MESSAGES_LOOKBACK,
+                )
+                .on_conflict_do_nothing(index_elements=[Notification.user_id])
             )
-            notifications.save()
+            db.session.commit()
+            notifications = Notification.query.filter(
+                Notification.user_id == user_id
+            ).one()
+
+        return notifications.new_unread_count
+
+    @staticmethod
+    def count_new_messages(connection, user_counts: dict):
+        """
+        Adds the unread messages just received to the counters of the users, creating the counters
+        of the users without any yet
+        :param connection: connection or session of the transaction adding the messages
+        :param user_counts: number of messages received by user id
+        """
+        if not user_counts:
+            return
 
-        # Count messages that the user has received after last check.
-        count = (
-            Message.query.filter_by(to_user_id=user_id, read=False)
-            .filter(Message.date > notifications.date)
-            .count()
+        counters = insert(Notification).values(
+            [
+                dict(
+                    user_id=user_id,
+                    unread_count=count,
+                    new_unread_count=count,
+                    date=timestamp() - NEW_MESSAGES_LOOKBACK,
+                )
+                # Sorted so concurrent transactions lock the counters in the same order
+                for user_id, count in sorted(user_counts.items())
+            ]
         )
+        counters = counters.on_conflict_do_update(
+            index_elements=[Notification.user_id],
+            set_=dict(
+                unread_count=func.coalesce(Notification.unread_count, 0)
+                + counters.excluded.unread_count,
+                new_unread_count=Notification.new_unread_count
+                + counters.excluded.new_unread_count,
+            ),
+        )
+        connection.execute(_publish_counters(counters))
+
+    @staticmethod
+    def uncount_messages(connection, user_id: int, message_dates: list):
+        """
+        Removes the unread messages that were read or deleted from the counters of the user
+        :param connection: connection or session of the transaction changing the messages
+        :param message_dates: dates the messages were received
+        """
+        if not message_dates:
+            return
+
+        dates = (
+            func.unnest(literal(message_dates, ARRAY(db.DateTime)))
+            .table_valued("message_date")
+            .render_derived(name="message_dates")
+        )
+        new_messages = (
+            select(func.count())
+            .select_from(dates)
+            .where(dates.c.message_date > Notification.date)
+            .scalar_subquery()
+        )
+        connection.execute(
+            _publish_counters(
+                update(Notification)
+                .where(Notification.user_id == user_id)
+                .values(
+                    unread_count=func.greatest(
+                        Notification.unread_count - len(message_dates), 0
+                    ),
+                    new_unread_count=func.greatest(
+                        Notification.new_unread_count - new_messages, 0
+                    ),
+                )
+            )
+        )
+
+
+def _publish_counters(counters):
+    """
+    Wraps the statement changing the counters so it also publishes them to the workers listening
+    on the channel. PostgreSQL only delivers them once the transaction commits
+    """
+    changed_counters = counters.returning(
+        Notification.user_id, Notification.new_unread_count
+    ).cte("changed_counters")
+    return select(
+        func.pg_notify(
+            UNREAD_COUNTERS_CHANNEL,
+            func.json_build_object(
+                "userId",
+                changed_counters.c.user_id,
+                "unread",
+                changed_counters.c.new_unread_count,
+            ).cast(String),
+        )
+    ).select_from(changed_counters)
+
+
+def _is_counted(to_user_id: int, read: bool) -> bool:
+    return to_user_id is not None and not read
+
+
+@event.listens_for(Message, "after_insert")
+def _count_inserted_message(mapper, connection, message: Message):
+    if _is_counted(message.to_user_id, message.read):
+        Notification.count_new_messages(connection, {message.to_user_id: 1})
+
+
+@event.listens_for(Message, "after_delete")
+def _uncount_deleted_message(mapper, connection, message: Message):
+    if _is_counted(message.to_user_id, message.read):
+        Notification.uncount_messages(connection, message.to_user_id, [message.date])
+
+
+@event.listens_for(Message.read, "set", active_history=True)
+@event.listens_for(Message.to_user_id, "set", active_history=True)
+def _load_previous_value(message: Message, value, previous_value, initiator):
+    """Loads the values replaced on expired messages, so updates know what was counted"""
+
+
+@event.listens_for(Message, "after_update")
+def _recount_updated_message(mapper, connection, message: Message):
+    message_state = inspect(message)
+    read_history = message_state.attrs.read.history
+    to_user_history = message_state.attrs.to_user_id.history
+    if not read_history.has_changes() and not to_user_history.has_changes():
+        return
 
-        return count
+    previous_read = read_history.deleted[0] if read_history.deleted else message.read
+    previous_to_user_id = (
+        to_user_history.deleted[0] if to_user_history.deleted else message.to_user_id
+    )
+    if _is_counted(previous_to_user_id, previous_read):
+        Notification.uncount_messages(connection, previous_to_user_id, [message.date])
+    if _is_counted(message.to_user_id, message.read):
+        Notification.count_new_messages(connection, {message.to_user_id: 1})
@@ -1,16 +1,15 @@
 import os
 import json
 import re
-from typing import Optional
-from cachetools import TTLCache, cached
+from typing import Dict, List, Optional
 
 import geojson
 import datetime
 from flask import current_app
 from geoalchemy2 import Geometry
 from geoalchemy2.shape import to_shape
-from sqlalchemy.sql.expression import cast, or_
-from sqlalchemy import desc, func, Time, orm, literal
+from sqlalchemy.sql.expression import or_
+from sqlalchemy import desc, distinct, func, orm, literal, select
 from shapely.geometry import shape
 from sqlalchemy.dialects.postgresql import ARRAY
 import requests
@@ -32,7 +31,7 @@ from backend.models.dtos.project_dto import (
 from backend.models.dtos.interests_dto import InterestDTO
 
 from backend.models.dtos.tags_dto import TagsDTO
-from backend.models.postgis.organisation import Organisation
+from backend.models.postgis.organisation import Organisation, organisation_managers
 from backend.models.postgis.custom_editors import CustomEditor
 from backend.models.postgis.priority_area import PriorityArea, project_priority_areas
 from backend.models.postgis.project_info import ProjectInfo
@@ -50,9 +49,10 @@ from backend.models.postgis.statuses import (
     ProjectDifficulty,
 )
 from backend.models.postgis.task import Task, TaskHistory
-from backend.models.postgis.team import Team
+from backend.models.postgis.team import Team, TeamMembers
 from backend.models.postgis.user import User
 from backend.models.postgis.campaign import Campaign, campaign_projects
+from backend.models.postgis.licenses import user_licenses_table
 
 from backend.models.postgis.utils import (
     ST_SetSRID,
@@ -61,6 +61,7 @@ from backend.models.postgis.utils import (
     ST_Centroid,
 )
 from backend.services.grid.grid_service import GridService
+from backend.services.cache_service import CacheService
 from backend.models.postgis.interests import Interest, project_interests
 import os
 
@@ -109,10 +110,6 @@ class ProjectTeams(db.Model):
         db.session.commit()
 
 
-# cache mapper counts for 30 seconds
-active_mappers_cache = TTLCache(maxsize=1024, ttl=30)
-
-
 class Project(db.Model):
     """Describes a HOT Mapping Project"""
 
@@ -306,6 +303,18 @@ class Project(db.Model):
         """Save changes to db"""
         db.session.commit()
 
+    def create_tasks(self, task_features) -> int:
+        """
+        Inserts the tasks of the project from GeoJson features, flushing the project first so the
+        tasks can reference it. Changes are committed with the project
+        :raises InvalidGeoJson, InvalidData
+        :returns the number of tasks created
+        """
+        db.session.add(self)
+        db.session.flush()
+        self.total_tasks = Task.insert_from_geojson_features(self.id, task_features)
+        return self.total_tasks
+
     @staticmethod
     def clone(project_id: int, author_id: int):
         """Clone project"""
@@ -375,6 +384,70 @@ class Project(db.Model):
 
         return new_proj
 
+    @staticmethod
+    def get_permission_context(project_id: int, user_id: int):
+        """
+        Loads in one query the project and user attributes deciding if the user can map or
+        validate on the project
+        :return: the attributes row, None if the project doesn't exist. The user attributes are None
+        if the user doesn't exist
+        """
+        license_accepted = (
+            select(user_licenses_table.c.user)
+            .where(
+                user_licenses_table.c.user == user_id,
+                user_licenses_table.c.license == Project.license_id,
+            )
+            .exists()
+        )
+        is_org_manager = (
+            select(organisation_managers.c.user_id)
+            .where(
+                organisation_managers.c.organisation_id == Project.organisation_id,
+                organisation_managers.c.user_id == user_id,
+            )
+            .exists()
+        )
+        # Roles of the project teams the user is an active member of
+        team_roles = (
+            select(func.array_agg(ProjectTeams.role))
+            .join(TeamMembers, TeamMembers.team_id == ProjectTeams.team_id)
+            .where(
+                ProjectTeams.project_id == Project.id,
+                TeamMembers.user_id == user_id,
+                TeamMembers.active.is_(True),
+            )
+            .scalar_subquery()
+        )
+        is_allowed_user = (
+            select(project_allowed_users.c.user_id)
+            .where(
+                project_allowed_users.c.project_id == Project.id,
+                project_allowed_users.c.user_id == user_id,
+            )
+            .exists()
+        )
+        return db.session.execute(
+            select(
+                Project.status,
+                Project.private,
+                Project.license_id,
+                Project.mapping_permission,
+                Project.validation_permission,
+                Project.author_id,
+                Project.organisation_id,
+                User.role.label("user_role"),
+                User.mapping_level,
+                license_accepted.label("license_accepted"),
+                is_org_manager.label("is_org_manager"),
+                team_roles.label("team_roles"),
+                is_allowed_user.label("is_allowed_user"),
+            )
+            .select_from(Project)
+            .outerjoin(User, User.id == user_id)
+            .where(Project.id == project_id)
+        ).first()
+
     @staticmethod
     def get(project_id: int) -> Optional["Project"]:
         """
@@ -633,11 +706,7 @@ class Project(db.Model):
         stats_dto.total_time_spent = 0
 
         total_mapping_time = (
-            db.session.query(
-                func.sum(
-                    cast(func.to_timestamp(TaskHistory.action_text, "HH24:MI:SS"), Time)
-                )
-            )
+            db.session.query(func.sum(TaskHistory.lock_duration))
             .filter(
                 or_(
                     TaskHistory.action == "LOCKED_FOR_MAPPING",
@@ -656,7 +725,7 @@ class Project(db.Model):
         query = (
             TaskHistory.query.with_entities(
                 func.date_trunc("minute", TaskHistory.action_date).label("trn"),
-                func.max(TaskHistory.action_text).label("tm"),
+                func.max(TaskHistory.lock_duration).label("tm"),
             )
             .filter(TaskHistory.user_id == user_id)
             .filter(TaskHistory.project_id == self.id)
@@ -664,9 +733,7 @@ class Project(db.Model):
             .group_by("trn")
             .subquery()
         )
-        total_validation_time = db.session.query(
-            func.sum(cast(func.to_timestamp(query.c.tm, "HH24:MI:SS"), Time))
-        ).all()
+        total_validation_time = db.session.query(func.sum(query.c.tm)).all()
 
         for time in total_validation_time:
             total_validation_time = time[0]
@@ -709,9 +776,7 @@ class Project(db.Model):
 
         total_mapping_time, total_mapping_tasks = (
             db.session.query(
-                func.sum(
-                    cast(func.to_timestamp(TaskHistory.action_text, "HH24:MI:SS"), Time)
-                ),
+                func.sum(TaskHistory.lock_duration),
                 func.count(TaskHistory.action),
             )
             .filter(
@@ -734,9 +799,7 @@ class Project(db.Model):
 
         total_validation_time, total_validation_tasks = (
             db.session.query(
-                func.sum(
-                    cast(func.to_timestamp(TaskHistory.action_text, "HH24:MI:SS"), Time)
-                ),
+                func.sum(TaskHistory.lock_duration),
                 func.count(TaskHistory.action),
             )
             .filter(
@@ -781,9 +844,7 @@ class Project(db.Model):
             TaskHistory.query.with_entities(
                 Task.zoom,
                 TaskHistory.action,
-                (
-                    cast(func.to_timestamp(TaskHistory.action_text, "HH24:MI:SS"), Time)
-                ).label("ts"),
+                TaskHistory.lock_duration.label("ts"),
             )
             .filter(Task.is_square == is_square)
             .filter(TaskHistory.project_id == Task.project_id)
@@ -797,7 +858,7 @@ class Project(db.Model):
 
         nz = (
             db.session.query(sq.c.zoom, sq.c.action, sq.c.ts)
-            .filter(sq.c.ts > datetime.time(0))
+            .filter(sq.c.ts > datetime.timedelta(0))
             .limit(10000)
             .subquery()
         )
@@ -961,6 +1022,24 @@ class Project(db.Model):
 
         return project_contributors_count
 
+    @staticmethod
+    def get_projects_total_contributions(project_ids: List[int]) -> Dict[int, int]:
+        """Gets the count of contributors for several projects in a single grouped query"""
+        project_contributors_count = (
+            TaskHistory.query.with_entities(
+                TaskHistory.project_id,
+                func.count(distinct(TaskHistory.user_id)).label("total"),
+            )
+            .filter(
+                TaskHistory.project_id.in_(project_ids),
+                TaskHistory.action != "COMMENT",
+            )
+            .group_by(TaskHistory.project_id)
+            .all()
+        )
+
+        return {p.project_id: p.total for p in project_contributors_count}
+
     def get_aoi_geometry_as_geojson(self):
         """Helper which returns the AOI geometry as a geojson object"""
         with db.engine.connect() as conn:
@@ -982,7 +1061,9 @@ class Project(db.Model):
         return project_teams
 
     @staticmethod
-    @cached(active_mappers_cache)
+    @CacheService.cached(
+        "active_mappers", ttl=30, tags=lambda project_id: [f"project:{project_id}"]
+    )
     def get_active_mappers(project_id) -> int:
         """Get count of Locked tasks as a proxy for users who are currently active on the project"""
 
@@ -1000,11 +1081,33 @@ class Project(db.Model):
             .count()
         )
 
+    @staticmethod
+    def get_active_mappers_by_project(project_ids: List[int]) -> Dict[int, int]:
+        """Get count of active mappers for several projects in a single grouped query"""
+        active_mappers = (
+            Task.query.with_entities(
+                Task.project_id, func.count(distinct(Task.locked_by)).label("total")
+            )
+            .filter(
+                Task.task_status.in_(
+                    (
+                        TaskStatus.LOCKED_FOR_MAPPING.value,
+                        TaskStatus.LOCKED_FOR_VALIDATION.value,
+                    )
+                )
+            )
+            .filter(Task.project_id.in_(project_ids))
+            .group_by(Task.project_id)
+            .all()
+        )
+
+        return {p.project_id: p.total for p in active_mappers}
+
     def _get_project_and_base_dto(self):
         """Populates a project DTO with properties common to all roles"""
         base_dto = ProjectDTO()
         base_dto.project_id = self.id
-        base_dto.database= self.database
+        base_dto.database = self.database
         base_dto.project_status = ProjectStatus(self.status).name
         base_dto.default_locale = self.default_locale
         base_dto.project_priority = ProjectPriority(self.priority).name
@@ -1207,6 +1310,26 @@ class Project(db.Model):
 
         return campaign_list
 
+    @staticmethod
+    def get_projects_campaigns(project_ids: List[int]) -> Dict[int, List[CampaignDTO]]:
+        """Gets the campaigns of several projects in a single query"""
+        query = (
+            db.session.query(campaign_projects.c.project_id, Campaign.id, Campaign.name)
+            .join(Campaign, Campaign.id == campaign_projects.c.campaign_id)
+            .filter(campaign_projects.c.project_id.in_(project_ids))
+            .order_by(Campaign.id)
+            .all()
+        )
+        campaigns = {project_id: [] for project_id in project_ids}
+        for project_id, campaign_id, campaign_name in query:
+            campaign_dto = CampaignDTO()
+            campaign_dto.id = campaign_id
+            campaign_dto.name = campaign_name
+
+            campaigns[project_id].append(campaign_dto)
+
+        return campaigns
+
 
 # Add index on project geometry
 db.Index("idx_geometry", Project.geometry, postgresql_using="gist")
@@ -0,0 +1,167 @@
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.base import NO_VALUE
+
+from backend import db
+from backend.models.postgis.interests import project_interests
+from backend.models.postgis.project import Project
+from backend.models.postgis.statuses import ProjectStatus
+
+# Project attributes the recommendation features are computed from
+FEATURE_ATTRIBUTES = (
+    "status",
+    "default_locale",
+    "difficulty",
+    "country",
+    "mapping_types",
+    "interests",
+)
+
+
+class ProjectFeature(db.Model):
+    """
+    Features of the published projects used to recommend similar projects. Each project is a
+    sparse binary vector stored as one row per feature, kept up to date when the project changes
+    """
+
+    __tablename__ = "project_features"
+    project_id = db.Column(
+        db.Integer,
+        db.ForeignKey("projects.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    feature = db.Column(db.String, primary_key=True, index=True)
+
+    @staticmethod
+    def get_features(
+        default_locale: str,
+        difficulty: int,
+        country: list,
+        mapping_types: list,
+        interest_ids: list,
+    ) -> set:
+        """Returns the features of a project from the attributes they are computed from"""
+        features = {f"default_locale_{default_locale}", f"difficulty_{difficulty}"}
+        # Only the first country is used, as projects mostly cover a single country
+        if country:
+            features.add(f"country_{country[0]}")
+        features.update(
+            f"mapping_types_{mapping_type}" for mapping_type in mapping_types or []
+        )
+        features.update(
+            f"categories_{interest_id}"
+            for interest_id in interest_ids or []
+            if interest_id is not None
+        )
+        return features
+
+    @staticmethod
+    def replace(connection, project_id: int, features: set):
+        """
+        Replaces the features of the project, removes them if the set is empty. Features already
+        inserted by a concurrent transaction are skipped
+        """
+        connection.execute(
+            delete(ProjectFeature).where(ProjectFeature.project_id == project_id)
+        )
+        if features:
+            connection.execute(
+                insert(ProjectFeature).on_conflict_do_nothing(),
+                [
+                    {"project_id": project_id, "feature": feature}
+                    for feature in features
+                ],
+            )
+
+    @staticmethod
+    def has_features(project_id: int) -> bool:
+        return db.session.query(
+            select(ProjectFeature)
+            .where(ProjectFeature.project_id == project_id)
+            .exists()
+        ).scalar()
+
+    @staticmethod
+    def get_similarity_subquery(project_id: int):
+        """
+        Subquery of the similarity to the project of every project sharing a feature with it.
+        The similarity is the cosine similarity of the feature vectors, without the constant
+        norm of the project vector as it only ranks the other projects
+        """
+        target = aliased(ProjectFeature)
+        candidate = aliased(ProjectFeature)
+        shared_features = (
+            select(
+                candidate.project_id,
+                func.count().label("shared_features"),
+            )
+            .join(target, target.feature == candidate.feature)
+            .where(
+                target.project_id == project_id,
+                candidate.project_id != project_id,
+            )
+            .group_by(candidate.project_id)
+            .subquery()
+        )
+        feature_counts = (
+            select(
+                ProjectFeature.project_id,
+                func.count().label("feature_count"),
+            )
+            .where(ProjectFeature.project_id.in_(select(shared_features.c.project_id)))
+            .group_by(ProjectFeature.project_id)
+            .subquery()
+        )
+        return (
+            select(
+                shared_features.c.project_id,
+                (
+                    shared_features.c.shared_features
+                    / func.sqrt(feature_counts.c.feature_count)
+                ).label("similarity"),
+            )
+            .join(
+                feature_counts,
+                feature_counts.c.project_id == shared_features.c.project_id,
+            )
+            .subquery()
+        )
+
+
+@event.listens_for(Project, "after_update")
+def _update_project_features(mapper, connection, project: Project):
+    """Recomputes the features of the project when the attributes they depend on change"""
+    project_state = inspect(project)
+    if not any(
+        project_state.attrs[attribute].history.has_changes()
+        for attribute in FEATURE_ATTRIBUTES
+    ):
+        return
+
+    if project.status != ProjectStatus.PUBLISHED.value:
+        ProjectFeature.replace(connection, project.id, set())
+        return
+
+    # Interest changes are only written after the project, read them from the loaded collection
+    interests = project_state.attrs.interests.loaded_value
+    if interests is NO_VALUE:
+        interest_ids = connection.execute(
+            select(project_interests.c.interest_id).where(
+                project_interests.c.project_id == project.id
+            )
+        ).scalars()
+    else:
+        interest_ids = [interest.id for interest in interests]
+
+    ProjectFeature.replace(
+        connection,
+        project.id,
+        ProjectFeature.get_features(
+            project.default_locale,
+            project.difficulty,
+            project.country,
+            project.mapping_types,
+            interest_ids,
+        ),
+    )
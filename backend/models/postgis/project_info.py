@@ -1,6 +1,6 @@
 from flask import current_app
 from sqlalchemy.dialects.postgresql import TSVECTOR
-from typing import List
+from typing import Dict, List
 from backend import db
 from backend.models.dtos.project_dto import ProjectInfoDTO
 
@@ -91,6 +91,49 @@ class ProjectInfo(db.Model):
         # Pass thru default_locale in case of partial translation
         return project_info.get_dto(default_locale)
 
+    @staticmethod
+    def get_dtos_for_locale(
+        default_locales: Dict[int, str], locale
+    ) -> Dict[int, ProjectInfoDTO]:
+        """
+        Gets the projectInfoDTO for several projects in one query, following the same locale fallback
+        rules as get_dto_for_locale
+        :param default_locales: dict of project id to the default locale of that project
+        :param locale: locale requested by user
+        :raises: ValueError if no info found for Default Locale
+        """
+        if not default_locales:
+            return {}
+
+        locales = set(default_locales.values())
+        locales.add(locale)
+        project_infos = ProjectInfo.query.filter(
+            ProjectInfo.project_id.in_(list(default_locales.keys())),
+            ProjectInfo.locale.in_(list(locales)),
+        ).all()
+        infos_by_key = {(info.project_id, info.locale): info for info in project_infos}
+
+        project_info_dtos = {}
+        for project_id, default_locale in default_locales.items():
+            project_info = infos_by_key.get((project_id, locale))
+            default_info = infos_by_key.get((project_id, default_locale))
+
+            if project_info is None:
+                project_info_dtos[project_id] = default_info.get_dto()
+            elif locale == default_locale:
+                project_info_dtos[project_id] = project_info.get_dto()
+            elif default_info is None:
+                error_message = (
+                    f"BAD DATA: no info for project {project_id}, locale: {locale}, "
+                    f"default {default_locale}"
+                )
+                current_app.logger.critical(error_message)
+                raise ValueError(error_message)
+            else:
+                project_info_dtos[project_id] = project_info.get_dto(default_info)
+
+        return project_info_dtos
+
     def get_dto(self, default_locale=ProjectInfoDTO()) -> ProjectInfoDTO:
         """
         Get DTO for current ProjectInfo
@@ -0,0 +1,295 @@
+from sqlalchemy import delete, event, func, literal, select
+from sqlalchemy.dialects.postgresql import JSONB, insert
+
+from backend import db
+from backend.models.postgis.project import Project
+from backend.models.postgis.statuses import TaskStatus
+from backend.models.postgis.task import Task, TaskAction, TaskHistory
+from backend.models.postgis.utils import timestamp
+
+
+class ProjectStatsRollup(db.Model):
+    """Per project aggregates behind the homepage stats, recomputed by a scheduled job"""
+
+    __tablename__ = "project_stats_rollups"
+    project_id = db.Column(
+        db.Integer,
+        db.ForeignKey("projects.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    total_area = db.Column(db.Float, nullable=False, default=0)
+    mapped_area = db.Column(db.Float, nullable=False, default=0)
+    validated_area = db.Column(db.Float, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=timestamp)
+
+    @staticmethod
+    def refresh(full: bool = False) -> int:
+        """
+        Recomputes the rollups of all projects. Mapped and validated areas are summed from the
+        precomputed task areas on every run, as task states change without updating the project.
+        The area of the AOI, which doesn't change, is only computed for new projects
+        :param full: also recompute the area of the AOI of every project, to repair the rollups
+        :return: number of projects refreshed
+        """
+
+        def sum_area(status: TaskStatus):
+            return func.coalesce(
+                func.sum(Task.area).filter(Task.task_status == status.value), 0
+            )
+
+        # Area of the AOI in km2
+        aoi_area = func.coalesce(func.ST_Area(Project.geometry, True) / 1000000, 0)
+        if not full:
+            # COALESCE only evaluates the AOI area when the project has no rollup yet
+            aoi_area = func.coalesce(ProjectStatsRollup.total_area, aoi_area)
+        project_rollups = (
+            select(
+                Project.id,
+                aoi_area,
+                sum_area(TaskStatus.MAPPED),
+                sum_area(TaskStatus.VALIDATED),
+                literal(timestamp()),
+            )
+            .outerjoin(Task, Task.project_id == Project.id)
+            .outerjoin(ProjectStatsRollup, ProjectStatsRollup.project_id == Project.id)
+            .group_by(Project.id, ProjectStatsRollup.project_id)
+        )
+
+        statement = insert(ProjectStatsRollup).from_select(
+            [
+                "project_id",
+                "total_area",
+                "mapped_area",
+                "validated_area",
+                "refreshed_at",
+            ],
+            project_rollups,
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[ProjectStatsRollup.project_id],
+            set_={
+                "total_area": statement.excluded.total_area,
+                "mapped_area": statement.excluded.mapped_area,
+                "validated_area": statement.excluded.validated_area,
+                "refreshed_at": statement.excluded.refreshed_at,
+            },
+        )
+        return db.session.execute(statement).rowcount
+
+    @staticmethod
+    def get_totals():
+        """Sums the rollups of all projects"""
+        return db.session.query(
+            func.coalesce(func.sum(ProjectStatsRollup.total_area), 0).label(
+                "total_area"
+            ),
+            func.coalesce(func.sum(ProjectStatsRollup.mapped_area), 0).label(
+                "mapped_area"
+            ),
+            func.coalesce(func.sum(ProjectStatsRollup.validated_area), 0).label(
+                "validated_area"
+            ),
+        ).one()
+
+
+class StatsRollup(db.Model):
+    """Precomputed global stats, stored as JSON under a name and refreshed by a scheduled job"""
+
+    __tablename__ = "stats_rollups"
+    name = db.Column(db.String, primary_key=True)
+    data = db.Column(JSONB, nullable=False)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=timestamp)
+
+    @staticmethod
+    def get(name: str):
+        return db.session.get(StatsRollup, name)
+
+    @staticmethod
+    def save(name: str, data: dict):
+        """Creates or replaces the rollup, the caller commits"""
+        statement = insert(StatsRollup).values(
+            name=name, data=data, refreshed_at=timestamp()
+        )
+        db.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[StatsRollup.name],
+                set_={
+                    "data": statement.excluded.data,
+                    "refreshed_at": statement.excluded.refreshed_at,
+                },
+            )
+        )
+
+
+# Task states counted by the daily task stats
+DAILY_TASK_STATS_STATES = [
+    TaskStatus.MAPPED.name,
+    TaskStatus.VALIDATED.name,
+    TaskStatus.BADIMAGERY.name,
+]
+
+
+class DailyTaskStats(db.Model):
+    """
+    Number of tasks of a project reaching a state on a day. Like the task stats, only the first
+    time a task reaches a state is counted
+    """
+
+    __tablename__ = "daily_task_stats"
+    day = db.Column(db.Date, primary_key=True)
+    project_id = db.Column(
+        db.Integer,
+        db.ForeignKey("projects.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    action_text = db.Column(db.String, primary_key=True)
+    tasks = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def _state_changes(project_id, task_id, action_text):
+        return select(TaskHistory.action_date).where(
+            TaskHistory.project_id == project_id,
+            TaskHistory.task_id == task_id,
+            TaskHistory.action == TaskAction.STATE_CHANGE.name,
+            TaskHistory.action_text == action_text,
+        )
+
+    @staticmethod
+    def _add_tasks(connection, day, project_id, action_text, tasks, where=None):
+        """Adds to the count of the day, only if the where clause holds when given"""
+        counts = select(
+            literal(day), literal(project_id), literal(action_text), literal(tasks)
+        )
+        if where is not None:
+            counts = counts.where(where)
+        statement = insert(DailyTaskStats).from_select(
+            ["day", "project_id", "action_text", "tasks"], counts
+        )
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=[
+                    DailyTaskStats.day,
+                    DailyTaskStats.project_id,
+                    DailyTaskStats.action_text,
+                ],
+                set_={"tasks": DailyTaskStats.tasks + statement.excluded.tasks},
+            )
+        )
+
+    @staticmethod
+    def backfill() -> int:
+        """
+        Rebuilds the stats from the whole task history
+        :return: number of rows created
+        """
+        first_state_changes = (
+            select(
+                TaskHistory.project_id,
+                TaskHistory.action_text,
+                func.DATE(TaskHistory.action_date).label("day"),
+            )
+            .distinct(
+                TaskHistory.project_id, TaskHistory.task_id, TaskHistory.action_text
+            )
+            .where(
+                TaskHistory.action == TaskAction.STATE_CHANGE.name,
+                TaskHistory.action_text.in_(DAILY_TASK_STATS_STATES),
+            )
+            .order_by(
+                TaskHistory.project_id,
+                TaskHistory.task_id,
+                TaskHistory.action_text,
+                TaskHistory.action_date,
+            )
+            .subquery()
+        )
+        db.session.execute(delete(DailyTaskStats))
+        rows_created = db.session.execute(
+            insert(DailyTaskStats).from_select(
+                ["day", "project_id", "action_text", "tasks"],
+                select(
+                    first_state_changes.c.day,
+                    first_state_changes.c.project_id,
+                    first_state_changes.c.action_text,
+                    func.count(),
+                )
+                .where(first_state_changes.c.project_id.isnot(None))
+                .group_by(
+                    first_state_changes.c.day,
+                    first_state_changes.c.project_id,
+                    first_state_changes.c.action_text,
+                ),
+            )
+        ).rowcount
+        db.session.commit()
+        return rows_created
+
+
+def _is_counted_state_change(history: TaskHistory) -> bool:
+    return (
+        history.project_id is not None
+        and history.action == TaskAction.STATE_CHANGE.name
+        and history.action_text in DAILY_TASK_STATS_STATES
+    )
+
+
+@event.listens_for(TaskHistory, "after_insert")
+def _count_first_state_change(mapper, connection, history: TaskHistory):
+    """Counts the state change if it's the first time the task reaches that state"""
+    if not _is_counted_state_change(history):
+        return
+
+    earlier_state_change = (
+        DailyTaskStats._state_changes(
+            history.project_id, history.task_id, history.action_text
+        )
+        .where(
+            TaskHistory.id != history.id,
+            TaskHistory.action_date <= history.action_date,
+        )
+        .exists()
+    )
+    DailyTaskStats._add_tasks(
+        connection,
+        history.action_date.date(),
+        history.project_id,
+        history.action_text,
+        1,
+        where=~earlier_state_change,
+    )
+
+
+@event.listens_for(TaskHistory, "after_delete")
+def _uncount_first_state_change(mapper, connection, history: TaskHistory):
+    """If the first state change is deleted, the next one for the task is counted instead"""
+    if not _is_counted_state_change(history):
+        return
+
+    state_changes = DailyTaskStats._state_changes(
+        history.project_id, history.task_id, history.action_text
+    )
+    earlier_state_change = connection.execute(
+        state_changes.where(TaskHistory.action_date < history.action_date).limit(1)
+    ).first()
+    if earlier_state_change is not None:
+        return
+
+    DailyTaskStats._add_tasks(
+        connection,
+        history.action_date.date(),
+        history.project_id,
+        history.action_text,
+        -1,
+    )
+    next_state_change_date = connection.execute(
+        state_changes.order_by(TaskHistory.action_date).limit(1)
+    ).scalar()
+    if next_state_change_date is not None:
+        DailyTaskStats._add_tasks(
+            connection,
+            next_state_change_date.date(),
+            history.project_id,
+            history.action_text,
+            1,
+        )
@@ -2,13 +2,32 @@ import bleach
 import datetime
 import geojson
 import json
+import math
 from enum import Enum
 from flask import current_app
-from sqlalchemy.types import Float, Text
-from sqlalchemy import desc, cast, func, distinct
+from sqlalchemy.types import Float, Integer, Text
+from sqlalchemy import (
+    desc,
+    cast,
+    func,
+    distinct,
+    case,
+    event,
+    inspect,
+    select,
+    tuple_,
+    bindparam,
+    column,
+    true,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
-from sqlalchemy.orm.session import make_transient
+from sqlalchemy.orm.session import make_transient, object_session
 from geoalchemy2 import Geometry
+from geoalchemy2.elements import WKBElement
+from geoalchemy2.shape import to_shape
 from typing import List
 
 from backend import db
@@ -32,6 +51,19 @@ from backend.models.postgis.utils import (
     parse_duration,
 )
 from backend.models.postgis.task_annotation import TaskAnnotation
+from backend.services.cache_service import CacheService
+
+# Vector tiles are served up to this zoom, clients overzoom the last level
+MVT_MAX_ZOOM = 18
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+MVT_LAYER_NAME = "tasks"
+# Above this number of tiles a task change invalidates all the tiles of the project instead
+MVT_MAX_INVALIDATED_TILES = 256
+# Tasks inserted per statement when creating the tasks of a project
+TASK_INSERT_BATCH_SIZE = 1000
+# Session info key of the organisations of the projects whose tasks changed in the current flush
+FLUSHED_PROJECT_ORGANISATIONS_KEY = "flushed_project_organisations"
 
 
 class TaskAction(Enum):
@@ -47,6 +79,15 @@ class TaskAction(Enum):
     EXTENDED_FOR_VALIDATION = 8
 
 
+# History actions recording the time a task was locked for
+LOCK_DURATION_ACTIONS = [
+    TaskAction.LOCKED_FOR_MAPPING.name,
+    TaskAction.LOCKED_FOR_VALIDATION.name,
+    TaskAction.AUTO_UNLOCKED_FOR_MAPPING.name,
+    TaskAction.AUTO_UNLOCKED_FOR_VALIDATION.name,
+]
+
+
 class TaskInvalidationHistory(db.Model):
     """Describes the most recent history of task invalidation and subsequent validation"""
 
@@ -289,6 +330,8 @@ class TaskHistory(db.Model):
         index=True,
         nullable=False,
     )
+    # Time the task was locked for, set on the lock actions once the task is released
+    lock_duration = db.Column(db.Interval)
     invalidation_history = db.relationship(
         TaskInvalidationHistory, lazy="dynamic", cascade="all"
     )
@@ -302,6 +345,21 @@ class TaskHistory(db.Model):
         ),
         db.Index("idx_task_history_composite", "task_id", "project_id"),
         db.Index("idx_task_history_project_id_user_id", "user_id", "project_id"),
+        # Covering indexes of the time spent statistics
+        db.Index(
+            "idx_task_history_project_lock_duration",
+            "project_id",
+            "action",
+            postgresql_include=["lock_duration"],
+            postgresql_where=action.in_(LOCK_DURATION_ACTIONS),
+        ),
+        db.Index(
+            "idx_task_history_user_lock_duration",
+            "user_id",
+            "action",
+            postgresql_include=["action_date", "lock_duration"],
+            postgresql_where=action.in_(LOCK_DURATION_ACTIONS),
+        ),
         {},
     )
 
@@ -342,6 +400,12 @@ class TaskHistory(db.Model):
     def set_auto_unlock_action(self, task_action: TaskAction):
         self.action = task_action.name
 
+    def set_lock_duration(self, lock_duration: datetime.timedelta):
+        """Records the time the task was locked for"""
+        self.lock_duration = lock_duration
+        # Cast duration to isoformat for later transmission via api
+        self.action_text = (datetime.datetime.min + lock_duration).time().isoformat()
+
     def delete(self):
         """Deletes the current model from the DB"""
         db.session.delete(self)
@@ -400,16 +464,46 @@ class TaskHistory(db.Model):
             )
             return
 
-        duration_task_locked = datetime.datetime.utcnow() - last_locked.action_date
-        # Cast duration to isoformat for later transmission via api
-        last_locked.action_text = (
-            (datetime.datetime.min + duration_task_locked).time().isoformat()
+        last_locked.set_lock_duration(
+            datetime.datetime.utcnow() - last_locked.action_date
         )
         if local_session:
             local_session.commit()
         else:
             db.session.commit()
 
+    @staticmethod
+    def update_tasks_locked_with_duration(
+        project_id: int, task_ids: List[int], lock_action, user_id: int
+    ):
+        """
+        Bulk version of update_task_locked_with_duration, the caller commits
+        :param project_id: Project ID in scope
+        :param task_ids: Tasks in scope
+        :param lock_action: The lock action, either Mapping or Validation
+        :param user_id: Logged in user updating the tasks
+        """
+        open_locks = (
+            TaskHistory.query.filter(
+                TaskHistory.project_id == project_id,
+                TaskHistory.task_id.in_(task_ids),
+                TaskHistory.action == lock_action.name,
+                TaskHistory.action_text.is_(None),
+                TaskHistory.user_id == user_id,
+            )
+            .order_by(TaskHistory.task_id, TaskHistory.id.desc())
+            .all()
+        )
+        now = datetime.datetime.utcnow()
+        updated_tasks = set()
+        for last_locked in open_locks:
+            if last_locked.task_id in updated_tasks:
+                # Older duplicate left by a race condition, see update_task_locked_with_duration
+                db.session.delete(last_locked)
+                continue
+            last_locked.set_lock_duration(now - last_locked.action_date)
+            updated_tasks.add(last_locked.task_id)
+
     @staticmethod
     def remove_duplicate_task_history_rows(
         task_id: int, project_id: int, lock_action: TaskStatus, user_id: int
@@ -431,46 +525,6 @@ class TaskHistory(db.Model):
 
         dupe.delete()
 
-    @staticmethod
-    def update_expired_and_locked_actions(
-        project_id: int, task_id: int, expiry_date: datetime, action_text: str
-    ):
-        """
-        Sets auto unlock state to all not finished actions, that are older then the expiry date.
-        Action is considered as a not finished, when it is in locked state and doesn't have action text
-        :param project_id: Project ID in scope
-        :param task_id: Task in scope
-        :param expiry_date: Action created before this date is treated as expired
-        :param action_text: Text which will be set for all changed actions
-        :return:
-        """
-        all_expired = TaskHistory.query.filter(
-            TaskHistory.task_id == task_id,
-            TaskHistory.project_id == project_id,
-            TaskHistory.action_text.is_(None),
-            TaskHistory.action.in_(
-                [
-                    TaskAction.LOCKED_FOR_VALIDATION.name,
-                    TaskAction.LOCKED_FOR_MAPPING.name,
-                    TaskAction.EXTENDED_FOR_MAPPING.name,
-                    TaskAction.EXTENDED_FOR_VALIDATION.name,
-                ]
-            ),
-            TaskHistory.action_date <= expiry_date,
-        ).all()
-
-        for task_history in all_expired:
-            unlock_action = (
-                TaskAction.AUTO_UNLOCKED_FOR_MAPPING
-                if task_history.action in ["LOCKED_FOR_MAPPING", "EXTENDED_FOR_MAPPING"]
-                else TaskAction.AUTO_UNLOCKED_FOR_VALIDATION
-            )
-
-            task_history.set_auto_unlock_action(unlock_action)
-            task_history.action_text = action_text
-
-        db.session.commit()
-
     @staticmethod
     def get_all_comments(project_id: int) -> ProjectCommentsDTO:
         """Gets all comments for the supplied project_id"""
@@ -535,6 +589,26 @@ class TaskHistory(db.Model):
         else:
             return TaskStatus[result[0][0]]
 
+    @staticmethod
+    def get_last_statuses(project_id: int, task_ids: List[int]) -> dict:
+        """Gets the last status of each task in one query, see get_last_status"""
+        results = (
+            db.session.query(TaskHistory.task_id, TaskHistory.action_text)
+            .distinct(TaskHistory.task_id)
+            .filter(
+                TaskHistory.project_id == project_id,
+                TaskHistory.task_id.in_(task_ids),
+                TaskHistory.action == TaskAction.STATE_CHANGE.name,
+            )
+            .order_by(TaskHistory.task_id, TaskHistory.action_date.desc())
+            .all()
+        )
+        last_statuses = {task_id: TaskStatus.READY for task_id in task_ids}
+        last_statuses.update(
+            {task_id: TaskStatus[action_text] for task_id, action_text in results}
+        )
+        return last_statuses
+
     @staticmethod
     def get_last_action(project_id: int, task_id: int):
         """Gets the most recent task history record for the task"""
@@ -621,6 +695,8 @@ class Task(db.Model):
     # Tasks need to be split differently if created from an arbitrary grid or were clipped to the edge of the AOI
     is_square = db.Column(db.Boolean, default=True)
     geometry = db.Column(Geometry("MULTIPOLYGON", srid=4326))
+    # Area in km2, computed once on creation as task geometries don't change
+    area = db.Column(db.Float)
     task_status = db.Column(db.Integer, default=TaskStatus.READY.value)
     locked_by = db.Column(
         db.BigInteger, db.ForeignKey("users.id", name="fk_users_locked"), index=True
@@ -631,6 +707,18 @@ class Task(db.Model):
     validated_by = db.Column(
         db.BigInteger, db.ForeignKey("users.id", name="fk_users_validator"), index=True
     )
+    # Locks expire after the auto-unlock delta unless extended, see auto_unlock_tasks
+    lock_expires_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Partial index of the locked tasks scanned by the auto-unlock sweeper
+        db.Index(
+            "idx_tasks_lock_expires_at",
+            "lock_expires_at",
+            postgresql_where=lock_expires_at.isnot(None),
+        ),
+        {},
+    )
 
     # Mapped objects
     task_history = db.relationship(
@@ -665,6 +753,27 @@ class Task(db.Model):
         :param task_feature: A geojson feature object
         :raises InvalidGeoJson, InvalidData
         """
+        task_values = cls._get_geojson_feature_values(task_feature)
+
+        task = cls()
+        task.id = task_id
+        task.x = task_values["x"]
+        task.y = task_values["y"]
+        task.zoom = task_values["zoom"]
+        task.is_square = task_values["is_square"]
+        if task_values["extra_properties"] is not None:
+            task.extra_properties = task_values["extra_properties"]
+        task.geometry = ST_SetSRID(ST_GeomFromGeoJSON(task_values["geojson"]), 4326)
+        task.area = func.ST_Area(task.geometry, True) / 1000000
+
+        return task
+
+    @staticmethod
+    def _get_geojson_feature_values(task_feature) -> dict:
+        """
+        Validates a GeoJson feature object and returns the column values of its task
+        :raises InvalidGeoJson, InvalidData
+        """
         if type(task_feature) is not geojson.Feature:
             raise InvalidGeoJson("MustBeFeature- Invalid GeoJson should be a feature")
 
@@ -678,27 +787,69 @@ class Task(db.Model):
                 "InvalidMultiPolygon - " + ", ".join(task_geometry.errors())
             )
 
-        task = cls()
         try:
-            task.x = task_feature.properties["x"]
-            task.y = task_feature.properties["y"]
-            task.zoom = task_feature.properties["zoom"]
-            task.is_square = task_feature.properties["isSquare"]
+            task_values = {
+                "x": task_feature.properties["x"],
+                "y": task_feature.properties["y"],
+                "zoom": task_feature.properties["zoom"],
+                "is_square": task_feature.properties["isSquare"],
+            }
         except KeyError as e:
             raise InvalidData(
                 f"PropertyNotFound: Expected property not found: {str(e)}"
             )
 
+        task_values["extra_properties"] = None
         if "extra_properties" in task_feature.properties:
-            task.extra_properties = json.dumps(
+            task_values["extra_properties"] = json.dumps(
                 task_feature.properties["extra_properties"]
             )
 
-        task.id = task_id
-        task_geojson = geojson.dumps(task_geometry)
-        task.geometry = ST_SetSRID(ST_GeomFromGeoJSON(task_geojson), 4326)
+        task_values["geojson"] = geojson.dumps(task_geometry)
+        return task_values
 
-        return task
+    @staticmethod
+    def insert_from_geojson_features(
+        project_id: int, task_features, batch_size: int = TASK_INSERT_BATCH_SIZE
+    ) -> int:
+        """
+        Validates the GeoJson features one at a time and inserts their tasks in batches, without
+        loading the tasks in the session. Task ids are numbered from 1 in the order of the features
+        :param project_id: ID of the project of the tasks, flushed beforehand
+        :param task_features: iterable of GeoJson feature objects or dicts
+        :raises InvalidGeoJson, InvalidData
+        :returns the number of tasks inserted
+        """
+        task_geometry = ST_SetSRID(ST_GeomFromGeoJSON(bindparam("task_geojson")), 4326)
+        insert_tasks = Task.__table__.insert().values(
+            project_id=project_id,
+            geometry=task_geometry,
+            area=func.ST_Area(task_geometry, True) / 1000000,
+        )
+
+        task_count = 0
+        batch = []
+        for task_feature in task_features:
+            task_values = Task._get_geojson_feature_values(
+                geojson.GeoJSON.to_instance(task_feature)
+            )
+            task_count += 1
+            task_values["id"] = task_count
+            task_values["task_geojson"] = task_values.pop("geojson")
+            batch.append(task_values)
+            if len(batch) == batch_size:
+                db.session.execute(insert_tasks, batch)
+                batch = []
+                current_app.logger.debug(
+                    f"Inserted {task_count} tasks of project {project_id}"
+                )
+        if batch:
+            db.session.execute(insert_tasks, batch)
+
+        current_app.logger.info(f"Inserted {task_count} tasks of project {project_id}")
+        # Bulk inserts don't trigger the insert listener of the tasks
+        CacheService.invalidate(f"project_tiles:{project_id}", session=db.session)
+        return task_count
 
     @staticmethod
     def get(task_id: int, project_id: int, local_session=None):
@@ -724,6 +875,21 @@ class Task(db.Model):
             Task.project_id == project_id, Task.id.in_(task_ids)
         ).all()
 
+    @staticmethod
+    def get_tasks_with_history(project_id: int, task_ids: List[int]):
+        """Get all tasks that match supplied list, with everything needed to build their DTOs"""
+        task_history = selectinload(Task.task_history)
+        return (
+            Task.query.options(
+                task_history.selectinload(TaskHistory.actioned_by),
+                task_history.selectinload(TaskHistory.task_mapping_issues),
+                selectinload(Task.task_annotations),
+            )
+            .filter(Task.project_id == project_id, Task.id.in_(task_ids))
+            .order_by(Task.id)
+            .all()
+        )
+
     @staticmethod
     def get_all_tasks(project_id: int):
         """Get all tasks for a given project"""
@@ -741,54 +907,136 @@ class Task(db.Model):
         return parse_duration(current_app.config["TASK_AUTOUNLOCK_AFTER"])
 
     @staticmethod
-    def auto_unlock_tasks(project_id: int):
-        """Unlock all tasks locked for longer than the auto-unlock delta"""
+    def auto_unlock_tasks(project_id: int = None, task_id: int = None) -> int:
+        """
+        Unlocks all tasks whose lock expired, using a few set-based statements committed as one
+        transaction. Run by the scheduled sweeper, and for a single task read after its lock expired
+        :param project_id: limits the unlock to a project, all projects are processed if None
+        :param task_id: limits the unlock to a task of the project
+        :return: number of tasks unlocked
+        """
         expiry_delta = Task.auto_unlock_delta()
         lock_duration = (datetime.datetime.min + expiry_delta).time().isoformat()
-        expiry_date = datetime.datetime.utcnow() - expiry_delta
 
-        old_tasks = (
-            db.session.query(Task.id)
-            .filter(Task.id == TaskHistory.task_id)
-            .filter(Task.project_id == TaskHistory.project_id)
-            .filter(Task.task_status.in_([1, 3]))
-            .filter(
+        expired_filters = [Task.lock_expires_at <= datetime.datetime.utcnow()]
+        if project_id is not None:
+            expired_filters.append(Task.project_id == project_id)
+        if task_id is not None:
+            expired_filters.append(Task.id == task_id)
+
+        # Tasks being unlocked or extended meanwhile are left to the next sweep
+        expired_tasks = db.session.execute(
+            select(Task.project_id, Task.id)
+            .where(*expired_filters)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not expired_tasks:
+            return 0
+        expired_task_ids = [tuple(expired_task) for expired_task in expired_tasks]
+
+        # Close the open lock of every expired task, as they would be if the user had released them
+        closed_locks = db.session.execute(
+            update(TaskHistory)
+            .where(
+                tuple_(TaskHistory.project_id, TaskHistory.task_id).in_(
+                    expired_task_ids
+                ),
+                TaskHistory.action_text.is_(None),
                 TaskHistory.action.in_(
                     [
-                        "EXTENDED_FOR_MAPPING",
-                        "EXTENDED_FOR_VALIDATION",
-                        "LOCKED_FOR_VALIDATION",
-                        "LOCKED_FOR_MAPPING",
+                        TaskAction.LOCKED_FOR_MAPPING.name,
+                        TaskAction.LOCKED_FOR_VALIDATION.name,
+                        TaskAction.EXTENDED_FOR_MAPPING.name,
+                        TaskAction.EXTENDED_FOR_VALIDATION.name,
                     ]
-                )
+                ),
             )
-            .filter(TaskHistory.action_text.is_(None))
-            .filter(Task.project_id == project_id)
-            .filter(TaskHistory.action_date <= str(expiry_date))
-        )
+            .values(
+                action=case(
+                    (
+                        TaskHistory.action.in_(
+                            [
+                                TaskAction.LOCKED_FOR_MAPPING.name,
+                                TaskAction.EXTENDED_FOR_MAPPING.name,
+                            ]
+                        ),
+                        TaskAction.AUTO_UNLOCKED_FOR_MAPPING.name,
+                    ),
+                    else_=TaskAction.AUTO_UNLOCKED_FOR_VALIDATION.name,
+                ),
+                action_text=lock_duration,
+                lock_duration=expiry_delta,
+            )
+            .returning(TaskHistory.user_id, TaskHistory.action)
+            .execution_options(synchronize_session=False)
+        ).all()
 
-        if old_tasks.count() == 0:
-            # no tasks older than the delta found, return without further processing
-            return
+        # Bulk updates don't go through the TaskHistory events, count the time spent directly
+        from backend.models.postgis.user_stats import UserStats
 
-        for old_task in old_tasks:
-            task = Task.get(old_task[0], project_id)
-            task.auto_unlock_expired_tasks(expiry_date, lock_duration)
+        UserStats.add_time_spent_mapping(
+            [
+                closed_lock.user_id
+                for closed_lock in closed_locks
+                if closed_lock.action == TaskAction.AUTO_UNLOCKED_FOR_MAPPING.name
+            ],
+            expiry_delta,
+        )
 
-    def auto_unlock_expired_tasks(self, expiry_date, lock_duration):
-        """Unlock all tasks locked before expiry date. Clears task lock if needed"""
-        TaskHistory.update_expired_and_locked_actions(
-            self.project_id, self.id, expiry_date, lock_duration
+        last_status = (
+            db.session.query(TaskHistory)
+            .filter(
+                TaskHistory.project_id == Task.project_id,
+                TaskHistory.task_id == Task.id,
+                TaskHistory.action == TaskAction.STATE_CHANGE.name,
+            )
+            .with_entities(
+                case(
+                    {status.name: status.value for status in TaskStatus},
+                    value=TaskHistory.action_text,
+                )
+            )
+            .order_by(TaskHistory.action_date.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        db.session.execute(
+            update(Task)
+            .where(tuple_(Task.project_id, Task.id).in_(expired_task_ids))
+            .values(
+                task_status=func.coalesce(last_status, TaskStatus.READY.value),
+                locked_by=None,
+                lock_expires_at=None,
+            )
+            .execution_options(synchronize_session=False)
         )
 
-        last_action = TaskHistory.get_last_locked_or_auto_unlocked_action(
-            self.project_id, self.id
+        # Bulk updates don't go through the Task events, invalidate the vector tiles directly
+        CacheService.invalidate(
+            *{f"project_tiles:{project_id}" for project_id, _ in expired_task_ids},
+            session=db.session,
         )
-        if last_action.action in [
-            "AUTO_UNLOCKED_FOR_MAPPING",
-            "AUTO_UNLOCKED_FOR_VALIDATION",
-        ]:
-            self.clear_lock()
+        db.session.commit()
+        return len(expired_task_ids)
+
+    def set_lock_expiry(self):
+        """Starts the lease of the lock, from its creation or its last extension"""
+        self.lock_expires_at = datetime.datetime.utcnow() + Task.auto_unlock_delta()
+
+    def unlock_if_expired(self) -> bool:
+        """
+        Auto-unlocks the task if its lock expired and the sweeper didn't unlock it yet
+        :return: True if the task was unlocked
+        """
+        if (
+            self.lock_expires_at is None
+            or self.lock_expires_at > datetime.datetime.utcnow()
+        ):
+            return False
+        if not Task.auto_unlock_tasks(self.project_id, self.id):
+            return False
+        db.session.refresh(self)
+        return True
 
     def is_mappable(self):
         """Determines if task in scope is in suitable state for mapping"""
@@ -841,27 +1089,29 @@ class Task(db.Model):
         self.set_task_history(TaskAction.LOCKED_FOR_MAPPING, user_id)
         self.task_status = TaskStatus.LOCKED_FOR_MAPPING.value
         self.locked_by = user_id
+        self.set_lock_expiry()
         self.update()
 
-    def lock_task_for_validating(self, user_id: int):
+    def lock_task_for_validating(self, user_id: int, commit: bool = True):
         self.set_task_history(TaskAction.LOCKED_FOR_VALIDATION, user_id)
         self.task_status = TaskStatus.LOCKED_FOR_VALIDATION.value
         self.locked_by = user_id
-        self.update()
+        self.set_lock_expiry()
+        if commit:
+            self.update()
 
     def reset_task(self, user_id: int):
-        expiry_delta = Task.auto_unlock_delta()
-        lock_duration = (datetime.datetime.min + expiry_delta).time().isoformat()
         if TaskStatus(self.task_status) in [
             TaskStatus.LOCKED_FOR_MAPPING,
             TaskStatus.LOCKED_FOR_VALIDATION,
         ]:
-            self.record_auto_unlock(lock_duration)
+            self.record_auto_unlock(Task.auto_unlock_delta())
 
         self.set_task_history(TaskAction.STATE_CHANGE, user_id, None, TaskStatus.READY)
         self.mapped_by = None
         self.validated_by = None
         self.locked_by = None
+        self.lock_expires_at = None
         self.task_status = TaskStatus.READY.value
         self.update()
 
@@ -878,7 +1128,7 @@ class Task(db.Model):
         # Set locked_by to null and status to last status on task
         self.clear_lock()
 
-    def record_auto_unlock(self, lock_duration):
+    def record_auto_unlock(self, lock_duration: datetime.timedelta):
         locked_user = self.locked_by
         last_action = TaskHistory.get_last_locked_action(self.project_id, self.id)
         next_action = (
@@ -891,7 +1141,7 @@ class Task(db.Model):
 
         # Add AUTO_UNLOCKED action in the task history
         auto_unlocked = self.set_task_history(action=next_action, user_id=locked_user)
-        auto_unlocked.action_text = lock_duration
+        auto_unlocked.set_lock_duration(lock_duration)
         self.update()
 
     def unlock_task(
@@ -902,8 +1152,13 @@ class Task(db.Model):
         undo=False,
         issues=None,
         local_session=None,
+        commit: bool = True,
     ):
-        """Unlock task and ensure duration task locked is saved in History"""
+        """
+        Unlock task and ensure duration task locked is saved in History. When unlocking several
+        tasks at once pass commit=False, the caller then records the lock durations with
+        TaskHistory.update_tasks_locked_with_duration and commits
+        """
         if comment:
             self.set_task_history(
                 action=TaskAction.COMMENT,
@@ -942,7 +1197,7 @@ class Task(db.Model):
             self.mapped_by = None
             self.validated_by = None
 
-        if not undo:
+        if not undo and commit:
             # Using a slightly evil side effect of Actions and Statuses having the same name here :)
             TaskHistory.update_task_locked_with_duration(
                 self.id,
@@ -954,6 +1209,9 @@ class Task(db.Model):
 
         self.task_status = new_state.value
         self.locked_by = None
+        self.lock_expires_at = None
+        if not commit:
+            return
         if local_session:
             self.update(local_session=local_session)
         else:
@@ -977,22 +1235,21 @@ class Task(db.Model):
         """Resets to last status and removes current lock from a task"""
         self.task_status = TaskHistory.get_last_status(self.project_id, self.id).value
         self.locked_by = None
+        self.lock_expires_at = None
         self.update()
 
     @staticmethod
-    def get_tasks_as_geojson_feature_collection(
+    def _get_tasks_as_geojson_query(
         project_id,
         task_ids_str: str = None,
         order_by: str = None,
         order_by_type: str = "ASC",
         status: int = None,
+        precision: int = None,
     ):
         """
-        Creates a geoJson.FeatureCollection object for tasks related to the supplied project ID
-        :param project_id: Owning project ID
-        :order_by: sorting option: available values update_date and building_area_diff
-        :status: task status id to filter by
-        :return: geojson.FeatureCollection
+        Builds the query returning the tasks and their geometry as GeoJSON text
+        :raises NotFound: if the project has none of the requested tasks
         """
         # subquery = (
         #     db.session.query(func.max(TaskHistory.action_date))
@@ -1004,6 +1261,11 @@ class Task(db.Model):
         #     .group_by(Task.id)
         #     .label("update_date")
         # )
+        geometry_geojson = (
+            func.ST_AsGeoJSON(Task.geometry, precision)
+            if precision is not None
+            else Task.geometry.ST_AsGeoJSON()
+        )
         query = db.session.query(
             Task.id,
             Task.x,
@@ -1011,7 +1273,7 @@ class Task(db.Model):
             Task.zoom,
             Task.is_square,
             Task.task_status,
-            Task.geometry.ST_AsGeoJSON().label("geojson"),
+            geometry_geojson.label("geojson"),
             Task.locked_by,
             Task.mapped_by,
             # subquery,
@@ -1021,18 +1283,13 @@ class Task(db.Model):
 
         if task_ids_str:
             task_ids = list(map(int, task_ids_str.split(",")))
-            tasks = Task.get_tasks(project_id, task_ids)
-            if not tasks or len(tasks) == 0:
+            filters.append(Task.id.in_(task_ids))
+            if not db.session.query(Task.id).filter(*filters).first():
                 raise NotFound(
                     sub_code="TASKS_NOT_FOUND", tasks=task_ids, project_id=project_id
                 )
-            else:
-                tasks_filters = [task.id for task in tasks]
-            filters = [Task.project_id == project_id, Task.id.in_(tasks_filters)]
-        else:
-            tasks = Task.get_all_tasks(project_id)
-            if not tasks or len(tasks) == 0:
-                raise NotFound(sub_code="TASKS_NOT_FOUND", project_id=project_id)
+        elif not db.session.query(Task.id).filter(*filters).first():
+            raise NotFound(sub_code="TASKS_NOT_FOUND", project_id=project_id)
 
         if status:
             filters.append(Task.task_status == status)
@@ -1063,21 +1320,45 @@ class Task(db.Model):
         else:
             query = query.filter(*filters)
 
+        return query
+
+    @staticmethod
+    def _get_geojson_task_properties(task) -> dict:
+        return dict(
+            taskId=task.id,
+            taskX=task.x,
+            taskY=task.y,
+            taskZoom=task.zoom,
+            taskIsSquare=task.is_square,
+            taskStatus=TaskStatus(task.task_status).name,
+            lockedBy=task.locked_by,
+            mappedBy=task.mapped_by,
+        )
+
+    @staticmethod
+    def get_tasks_as_geojson_feature_collection(
+        project_id,
+        task_ids_str: str = None,
+        order_by: str = None,
+        order_by_type: str = "ASC",
+        status: int = None,
+    ):
+        """
+        Creates a geoJson.FeatureCollection object for tasks related to the supplied project ID
+        :param project_id: Owning project ID
+        :order_by: sorting option: available values update_date and building_area_diff
+        :status: task status id to filter by
+        :return: geojson.FeatureCollection
+        """
+        query = Task._get_tasks_as_geojson_query(
+            project_id, task_ids_str, order_by, order_by_type, status
+        )
         project_tasks = query.all()
 
         tasks_features = []
         for task in project_tasks:
             task_geometry = geojson.loads(task.geojson)
-            task_properties = dict(
-                taskId=task.id,
-                taskX=task.x,
-                taskY=task.y,
-                taskZoom=task.zoom,
-                taskIsSquare=task.is_square,
-                taskStatus=TaskStatus(task.task_status).name,
-                lockedBy=task.locked_by,
-                mappedBy=task.mapped_by,
-            )
+            task_properties = Task._get_geojson_task_properties(task)
 
             feature = geojson.Feature(
                 geometry=task_geometry, properties=task_properties
@@ -1086,6 +1367,168 @@ class Task(db.Model):
 
         return geojson.FeatureCollection(tasks_features)
 
+    @staticmethod
+    def stream_tasks_as_geojson_feature_collection(
+        project_id,
+        task_ids_str: str = None,
+        order_by: str = None,
+        order_by_type: str = "ASC",
+        status: int = None,
+        batch_size: int = 1000,
+    ):
+        """
+        Same FeatureCollection as get_tasks_as_geojson_feature_collection, produced as chunks of JSON text.
+        Rows are read from a server-side cursor and the GeoJSON generated by PostGIS is written out
+        as is, so memory use doesn't grow with the number of tasks
+        :param batch_size: number of features fetched and yielded at a time
+        :raises NotFound: raised before anything is yielded, so callers can still return a 404
+        :return: generator of str chunks
+        """
+        query = Task._get_tasks_as_geojson_query(
+            project_id,
+            task_ids_str,
+            order_by,
+            order_by_type,
+            status,
+            precision=geojson.geometry.DEFAULT_PRECISION,
+        )
+        return Task._stream_feature_collection(query.yield_per(batch_size), batch_size)
+
+    @staticmethod
+    def stream_tasks_outline_points(
+        project_id: int, task_ids: List[int] = None, batch_size: int = 1000
+    ):
+        """
+        Reads the vertices of the outer rings of the tasks polygons with PostGIS, from a
+        server-side cursor so memory use doesn't grow with the number of tasks
+        :param task_ids: tasks in scope, all the tasks of the project if None
+        :param batch_size: number of vertices fetched at a time
+        :return: iterable of (task_id, polygon, lon, lat) rows, ordered by task then polygon
+        """
+        points = (
+            func.ST_DumpPoints(Task.geometry)
+            .table_valued(column("path", ARRAY(Integer)), column("geom", Geometry))
+            .lateral("points")
+        )
+        filters = [Task.project_id == project_id, points.c.path[2] == 1]
+        if task_ids is not None:
+            filters.append(Task.id.in_(task_ids))
+        query = (
+            select(
+                Task.id.label("task_id"),
+                points.c.path[1].label("polygon"),
+                func.ST_X(points.c.geom).label("lon"),
+                func.ST_Y(points.c.geom).label("lat"),
+            )
+            .select_from(Task)
+            .join(points, true())
+            .where(*filters)
+            .order_by(Task.id, points.c.path[1], points.c.path[3])
+            .execution_options(yield_per=batch_size)
+        )
+        return db.session.execute(query)
+
+    @staticmethod
+    def _stream_feature_collection(project_tasks, batch_size: int):
+        yield '{"type": "FeatureCollection", "features": ['
+        separator = ""
+        features = []
+        for task in project_tasks:
+            task_properties = json.dumps(Task._get_geojson_task_properties(task))
+            features.append(
+                f'{separator}{{"type": "Feature", "geometry": {task.geojson or "null"}, '
+                f'"properties": {task_properties}}}'
+            )
+            separator = ", "
+            if len(features) >= batch_size:
+                yield "".join(features)
+                features = []
+        yield "".join(features) + "]}"
+
+    @staticmethod
+    def get_tasks_as_mvt(project_id: int, zoom: int, x: int, y: int) -> bytes:
+        """
+        Renders the tasks of the project intersecting the tile as a Mapbox Vector Tile
+        :return: the tile, empty if no task intersects it
+        """
+        tile_envelope = func.ST_TileEnvelope(zoom, x, y)
+        task_status = case(
+            {status.value: status.name for status in TaskStatus},
+            value=Task.task_status,
+        )
+        tile_tasks = (
+            select(
+                func.ST_AsMVTGeom(
+                    func.ST_Transform(Task.geometry, 3857),
+                    tile_envelope,
+                    MVT_EXTENT,
+                    MVT_BUFFER,
+                ).label("geom"),
+                Task.id.label("taskId"),
+                task_status.label("taskStatus"),
+                Task.locked_by.label("lockedBy"),
+                Task.mapped_by.label("mappedBy"),
+            )
+            .where(
+                Task.project_id == project_id,
+                Task.geometry.ST_Intersects(func.ST_Transform(tile_envelope, 4326)),
+            )
+            .subquery()
+        )
+        tile = db.session.execute(
+            select(
+                func.ST_AsMVT(
+                    tile_tasks.table_valued(), MVT_LAYER_NAME, MVT_EXTENT, "geom"
+                )
+            )
+        ).scalar()
+        return bytes(tile) if tile is not None else b""
+
+    @staticmethod
+    def get_tile_tags(project_id: int, zoom: int, x: int, y: int) -> list:
+        """Cache tags of a vector tile, invalidated when the project or the tile changes"""
+        return [
+            f"project_tiles:{project_id}",
+            f"project_tiles:{project_id}:{zoom}/{x}/{y}",
+        ]
+
+    @staticmethod
+    def _lon_lat_to_tile(lon: float, lat: float, zoom: int):
+        """Fractional Web Mercator tile coordinates of a point"""
+        lat = max(min(lat, 85.0511287798), -85.0511287798)
+        tiles_count = 2**zoom
+        lat_rad = math.radians(lat)
+        x = (lon + 180.0) / 360.0 * tiles_count
+        y = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * tiles_count
+        return x, y
+
+    @staticmethod
+    def get_tiles_covering_bounds(bounds, max_tiles: int = MVT_MAX_INVALIDATED_TILES):
+        """
+        Lists the vector tiles, tile buffer included, the bounds are rendered in
+        :param bounds: (min_lon, min_lat, max_lon, max_lat)
+        :return: list of (zoom, x, y), None if there are more than max_tiles
+        """
+        min_lon, min_lat, max_lon, max_lat = bounds
+        buffer = MVT_BUFFER / MVT_EXTENT
+        tiles = []
+        for zoom in range(MVT_MAX_ZOOM + 1):
+            last_tile = 2**zoom - 1
+            left, top = Task._lon_lat_to_tile(min_lon, max_lat, zoom)
+            right, bottom = Task._lon_lat_to_tile(max_lon, min_lat, zoom)
+            min_x = max(math.floor(left - buffer), 0)
+            max_x = min(math.floor(right + buffer), last_tile)
+            min_y = max(math.floor(top - buffer), 0)
+            max_y = min(math.floor(bottom + buffer), last_tile)
+            if len(tiles) + (max_x - min_x + 1) * (max_y - min_y + 1) > max_tiles:
+                return None
+            tiles.extend(
+                (zoom, x, y)
+                for x in range(min_x, max_x + 1)
+                for y in range(min_y, max_y + 1)
+            )
+        return tiles
+
     @staticmethod
     def get_tasks_as_geojson_feature_collection_no_geom(project_id):
         """
@@ -1281,6 +1724,13 @@ class Task(db.Model):
 
         return copies
 
+    @staticmethod
+    def user_has_locked_tasks(user_id: int) -> bool:
+        """Checks if the user has a task locked on any project"""
+        return db.session.query(
+            Task.query.filter(Task.locked_by == user_id).exists()
+        ).scalar()
+
     def get_locked_tasks_for_user(user_id: int):
         """Gets tasks on project owned by specified user id"""
         tasks = Task.query.filter_by(locked_by=user_id)
@@ -1298,3 +1748,84 @@ class Task(db.Model):
         locked_tasks = [task for task in tasks]
 
         return locked_tasks
+
+
+def _get_task_bounds(connection, task: Task):
+    """Bounds of the task geometry, read from the loaded geometry when possible"""
+    geometry = inspect(task).attrs.geometry.loaded_value
+    if isinstance(geometry, WKBElement):
+        return to_shape(geometry).bounds
+    return connection.execute(
+        select(
+            func.ST_XMin(Task.geometry),
+            func.ST_YMin(Task.geometry),
+            func.ST_XMax(Task.geometry),
+            func.ST_YMax(Task.geometry),
+        ).where(Task.id == task.id, Task.project_id == task.project_id)
+    ).one()
+
+
+@event.listens_for(Task, "after_update")
+def _invalidate_task_tiles(mapper, connection, task: Task):
+    """Invalidates the cached vector tiles showing the task once its changes are committed"""
+    task_state = inspect(task)
+    if not any(
+        task_state.attrs[attribute].history.has_changes()
+        for attribute in ("task_status", "locked_by", "mapped_by", "geometry")
+    ):
+        return
+
+    tiles = None
+    if not task_state.attrs.geometry.history.has_changes():
+        tiles = Task.get_tiles_covering_bounds(_get_task_bounds(connection, task))
+    if tiles is None:
+        tags = [f"project_tiles:{task.project_id}"]
+    else:
+        tags = [
+            f"project_tiles:{task.project_id}:{zoom}/{x}/{y}" for zoom, x, y in tiles
+        ]
+    CacheService.invalidate(*tags, session=object_session(task))
+
+
+@event.listens_for(Task, "after_update")
+def _invalidate_organisation_stats(mapper, connection, task: Task):
+    """
+    Invalidates the cached stats of the project organisation when the task status changes. The
+    organisation is only looked up once per project for all the tasks of a flush
+    """
+    if not inspect(task).attrs.task_status.history.has_changes():
+        return
+
+    from backend.models.postgis.project import Project
+
+    session = object_session(task)
+    project_organisations = session.info.setdefault(
+        FLUSHED_PROJECT_ORGANISATIONS_KEY, {}
+    )
+    if task.project_id in project_organisations:
+        return
+
+    organisation_id = connection.execute(
+        select(Project.organisation_id).where(Project.id == task.project_id)
+    ).scalar()
+    project_organisations[task.project_id] = organisation_id
+    if organisation_id is not None:
+        CacheService.invalidate(
+            f"organisation_stats:{organisation_id}", session=session
+        )
+
+
+@event.listens_for(Session, "after_flush")
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_flushed_project_organisations(session, flush_context_or_transaction):
+    """Projects may move to another organisation before the next flush, or fail to flush"""
+    session.info.pop(FLUSHED_PROJECT_ORGANISATIONS_KEY, None)
+
+
+@event.listens_for(Task, "after_insert")
+@event.listens_for(Task, "after_delete")
+def _invalidate_project_tiles(mapper, connection, task: Task):
+    """Invalidates all the cached vector tiles of the project when its grid changes"""
+    CacheService.invalidate(
+        f"project_tiles:{task.project_id}", session=object_session(task)
+    )
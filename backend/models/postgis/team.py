@@ -1,3 +1,6 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased, joinedload
+
 from backend import db
 from backend.exceptions import NotFound
 from backend.models.dtos.team_dto import (
@@ -287,3 +290,69 @@ class Team(db.Model):
         return TeamMembers.query.filter_by(
             team_id=self.id, function=role.value, active=True
         ).count()
+
+    @staticmethod
+    def get_members_of_teams(team_ids: list, count: int = None) -> dict:
+        """
+        Returns the members of several teams at once, with their users loaded
+        --------------------------------
+        :param team_ids: teams in scope
+        :param count: number of active members and of active managers to return per team, all
+        the members are returned if None
+        :return: lists of team members by team id
+        """
+        if count:
+            ranked_members = (
+                select(
+                    TeamMembers,
+                    func.row_number()
+                    .over(
+                        partition_by=(TeamMembers.team_id, TeamMembers.function),
+                        order_by=TeamMembers.user_id,
+                    )
+                    .label("rank"),
+                )
+                .where(
+                    TeamMembers.team_id.in_(team_ids),
+                    TeamMembers.active.is_(True),
+                    TeamMembers.function.in_(
+                        [
+                            TeamMemberFunctions.MEMBER.value,
+                            TeamMemberFunctions.MANAGER.value,
+                        ]
+                    ),
+                )
+                .subquery()
+            )
+            member = aliased(TeamMembers, ranked_members)
+            query = db.session.query(member).filter(ranked_members.c.rank <= count)
+        else:
+            member = TeamMembers
+            query = db.session.query(member).filter(member.team_id.in_(team_ids))
+
+        # Members are listed before managers
+        members = (
+            query.options(joinedload(member.member))
+            .order_by(member.team_id, member.function.desc(), member.user_id)
+            .all()
+        )
+        members_by_team = {team_id: [] for team_id in team_ids}
+        for team_member in members:
+            members_by_team[team_member.team_id].append(team_member)
+        return members_by_team
+
+    @staticmethod
+    def get_members_count_by_team(team_ids: list) -> dict:
+        """
+        Returns the number of active members of several teams at once
+        --------------------------------
+        :param team_ids: teams in scope
+        :return: number of active members by team id and member function
+        """
+        counts = (
+            db.session.query(TeamMembers.team_id, TeamMembers.function, func.count())
+            .filter(TeamMembers.team_id.in_(team_ids), TeamMembers.active.is_(True))
+            .group_by(TeamMembers.team_id, TeamMembers.function)
+            .all()
+        )
+        return {(team_id, function): count for team_id, function, count in counts}
@@ -0,0 +1,603 @@
+import datetime
+from collections import Counter
+
+from sqlalchemy import (
+    Integer,
+    and_,
+    case,
+    cast,
+    event,
+    func,
+    inspect,
+    literal,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.orm import Session, aliased, object_session
+
+from backend import db
+from backend.models.dtos.user_dto import (
+    UserContributionDTO,
+    UserCountriesContributed,
+    UserCountryContributed,
+)
+from backend.models.postgis.project import Project
+from backend.models.postgis.statuses import TaskStatus
+from backend.models.postgis.task import TaskAction, TaskHistory
+from backend.models.postgis.user import User
+
+# States counted as the tasks mapped, validated and invalidated by the user
+CONTRIBUTION_STATES = [
+    TaskStatus.MAPPED.name,
+    TaskStatus.VALIDATED.name,
+    TaskStatus.INVALIDATED.name,
+]
+# States counted when set by others on the tasks the user contributed to
+REVIEW_STATES = [TaskStatus.VALIDATED.name, TaskStatus.INVALIDATED.name]
+# States counted per country, bad imagery counts as mapped
+COUNTRY_MAPPED_STATES = [TaskStatus.MAPPED.name, TaskStatus.BADIMAGERY.name]
+COUNTRY_STATES = COUNTRY_MAPPED_STATES + [TaskStatus.VALIDATED.name]
+MAPPING_TIME_ACTIONS = [
+    TaskAction.LOCKED_FOR_MAPPING.name,
+    TaskAction.AUTO_UNLOCKED_FOR_MAPPING.name,
+]
+# Days of contributions shown on the profile
+CONTRIBUTION_DAYS = 365
+# Namespace of the advisory locks held on the profiles, see _lock_user_stats
+USER_STATS_LOCK = 1
+# Session info key of the users whose task history was deleted in the current flush
+DELETED_HISTORY_USERS_KEY = "user_stats_deleted_history_users"
+
+
+class UserStats(db.Model):
+    """
+    Contribution profile of a user, updated on every task state change so the profile doesn't
+    have to be computed from the whole task history of the user
+    """
+
+    __tablename__ = "user_stats"
+    user_id = db.Column(
+        db.BigInteger,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    tasks_mapped = db.Column(db.Integer, nullable=False, default=0)
+    tasks_validated = db.Column(db.Integer, nullable=False, default=0)
+    tasks_invalidated = db.Column(db.Integer, nullable=False, default=0)
+    tasks_validated_by_others = db.Column(db.Integer, nullable=False, default=0)
+    tasks_invalidated_by_others = db.Column(db.Integer, nullable=False, default=0)
+    time_spent_mapping = db.Column(
+        db.Interval, nullable=False, default=datetime.timedelta()
+    )
+    time_spent_validating = db.Column(
+        db.Interval, nullable=False, default=datetime.timedelta()
+    )
+    # Tasks mapped and validated per country of their project
+    countries_mapped = db.Column(JSONB, nullable=False, default=dict)
+    countries_validated = db.Column(JSONB, nullable=False, default=dict)
+    # State changes per day, days older than CONTRIBUTION_DAYS are dropped on rebuild
+    contributions_by_day = db.Column(JSONB, nullable=False, default=dict)
+
+    @staticmethod
+    def get(user_id: int):
+        return db.session.get(UserStats, user_id)
+
+    def get_countries_contributed(self) -> UserCountriesContributed:
+        countries = []
+        for name in sorted(self.countries_mapped.keys() | self.countries_validated):
+            mapped = self.countries_mapped.get(name, 0)
+            validated = self.countries_validated.get(name, 0)
+            countries.append(
+                UserCountryContributed(
+                    dict(
+                        name=name,
+                        mapped=mapped,
+                        validated=validated,
+                        total=mapped + validated,
+                    )
+                )
+            )
+
+        countries_dto = UserCountriesContributed()
+        countries_dto.countries_contributed = sorted(
+            countries, reverse=True, key=lambda country: country.total
+        )
+        countries_dto.total = len(countries)
+        return countries_dto
+
+    def get_contributions_by_day(self) -> list:
+        """Contributions of the last CONTRIBUTION_DAYS days, latest first"""
+        first_day = str(
+            datetime.date.today() - datetime.timedelta(days=CONTRIBUTION_DAYS)
+        )
+        return [
+            UserContributionDTO(dict(date=day, count=count))
+            for day, count in sorted(self.contributions_by_day.items(), reverse=True)
+            if day > first_day
+        ]
+
+    @staticmethod
+    def rebuild(user_ids: list = None, session=None) -> int:
+        """
+        Recomputes the profiles from the task history, the caller commits
+        :param user_ids: only rebuilds the profiles of these users, all users are rebuilt if None
+        :param session: session of the transaction, defaults to the app session
+        :return: number of profiles rebuilt
+        """
+        session = session or db.session
+
+        def of_user(query):
+            if user_ids is None:
+                return query
+            return query.where(TaskHistory.user_id.in_(user_ids))
+
+        if user_ids is not None:
+            _lock_user_stats(session, user_ids)
+        state_changes = TaskHistory.action == TaskAction.STATE_CHANGE.name
+
+        def count_states(tasks, states):
+            return select(
+                tasks.c.user_id,
+                *[
+                    func.count().filter(tasks.c.action_text == state).label(state)
+                    for state in states
+                ],
+            ).group_by(tasks.c.user_id)
+
+        contributions = of_user(
+            select(
+                TaskHistory.user_id,
+                TaskHistory.project_id,
+                TaskHistory.task_id,
+                TaskHistory.action_text,
+            )
+            .distinct()
+            .where(state_changes, TaskHistory.action_text.in_(CONTRIBUTION_STATES))
+        ).subquery()
+        task_counts = count_states(contributions, CONTRIBUTION_STATES).subquery()
+
+        # Tasks the user contributed to that others validated or invalidated
+        reviews = (
+            select(
+                TaskHistory.user_id,
+                TaskHistory.project_id,
+                TaskHistory.task_id,
+                TaskHistory.action_text,
+            )
+            .distinct()
+            .where(state_changes, TaskHistory.action_text.in_(REVIEW_STATES))
+        )
+        if user_ids is not None:
+            # Only read the reviews of the tasks the users contributed to
+            reviews = reviews.where(
+                tuple_(TaskHistory.project_id, TaskHistory.task_id).in_(
+                    select(contributions.c.project_id, contributions.c.task_id)
+                )
+            )
+        reviews = reviews.subquery()
+        reviewed_tasks = (
+            select(
+                contributions.c.user_id,
+                reviews.c.project_id,
+                reviews.c.task_id,
+                reviews.c.action_text,
+            )
+            .distinct()
+            .join(
+                reviews,
+                and_(
+                    reviews.c.project_id == contributions.c.project_id,
+                    reviews.c.task_id == contributions.c.task_id,
+                    reviews.c.user_id != contributions.c.user_id,
+                ),
+            )
+            .subquery()
+        )
+        review_counts = count_states(reviewed_tasks, REVIEW_STATES).subquery()
+
+        country_contributions = of_user(
+            select(
+                TaskHistory.user_id,
+                func.unnest(Project.country).label("country"),
+                TaskHistory.action_text,
+            )
+            .join(Project, Project.id == TaskHistory.project_id)
+            .where(state_changes, TaskHistory.action_text.in_(COUNTRY_STATES))
+        ).subquery()
+        country_counts = (
+            select(
+                country_contributions.c.user_id,
+                country_contributions.c.country,
+                func.count()
+                .filter(country_contributions.c.action_text.in_(COUNTRY_MAPPED_STATES))
+                .label("mapped"),
+                func.count()
+                .filter(
+                    country_contributions.c.action_text == TaskStatus.VALIDATED.name
+                )
+                .label("validated"),
+            )
+            .group_by(country_contributions.c.user_id, country_contributions.c.country)
+            .subquery()
+        )
+        countries = (
+            select(
+                country_counts.c.user_id,
+                func.jsonb_object_agg(
+                    country_counts.c.country, country_counts.c.mapped
+                ).label("mapped"),
+                func.jsonb_object_agg(
+                    country_counts.c.country, country_counts.c.validated
+                ).label("validated"),
+            )
+            .group_by(country_counts.c.user_id)
+            .subquery()
+        )
+
+        first_day = datetime.date.today() - datetime.timedelta(days=CONTRIBUTION_DAYS)
+        daily_contributions = of_user(
+            select(
+                TaskHistory.user_id,
+                func.DATE(TaskHistory.action_date).label("day"),
+                func.count().label("contributions"),
+            )
+            .where(state_changes, func.DATE(TaskHistory.action_date) > first_day)
+            .group_by(TaskHistory.user_id, "day")
+        ).subquery()
+        days = (
+            select(
+                daily_contributions.c.user_id,
+                func.jsonb_object_agg(
+                    func.to_char(daily_contributions.c.day, "YYYY-MM-DD"),
+                    daily_contributions.c.contributions,
+                ).label("contributions"),
+            )
+            .group_by(daily_contributions.c.user_id)
+            .subquery()
+        )
+
+        mapping_time = of_user(
+            select(
+                TaskHistory.user_id,
+                func.sum(TaskHistory.lock_duration).label("time_spent"),
+            )
+            .where(TaskHistory.action.in_(MAPPING_TIME_ACTIONS))
+            .group_by(TaskHistory.user_id)
+        ).subquery()
+        # Validations of several tasks at once are locked together, count each minute once
+        validation_minutes = of_user(
+            select(
+                TaskHistory.user_id,
+                func.max(TaskHistory.lock_duration).label("time_spent"),
+            )
+            .where(TaskHistory.action == TaskAction.LOCKED_FOR_VALIDATION.name)
+            .group_by(
+                TaskHistory.user_id,
+                func.date_trunc("minute", TaskHistory.action_date),
+            )
+        ).subquery()
+        validation_time = (
+            select(
+                validation_minutes.c.user_id,
+                func.sum(validation_minutes.c.time_spent).label("time_spent"),
+            )
+            .group_by(validation_minutes.c.user_id)
+            .subquery()
+        )
+
+        def count_or_zero(count):
+            return func.coalesce(count, 0)
+
+        def duration_or_zero(duration):
+            return func.coalesce(duration, literal(datetime.timedelta(), db.Interval))
+
+        def json_or_empty(counts):
+            return func.coalesce(counts, cast("{}", JSONB))
+
+        profiles = (
+            select(
+                User.id,
+                count_or_zero(task_counts.c[TaskStatus.MAPPED.name]),
+                count_or_zero(task_counts.c[TaskStatus.VALIDATED.name]),
+                count_or_zero(task_counts.c[TaskStatus.INVALIDATED.name]),
+                count_or_zero(review_counts.c[TaskStatus.VALIDATED.name]),
+                count_or_zero(review_counts.c[TaskStatus.INVALIDATED.name]),
+                duration_or_zero(mapping_time.c.time_spent),
+                duration_or_zero(validation_time.c.time_spent),
+                json_or_empty(countries.c.mapped),
+                json_or_empty(countries.c.validated),
+                json_or_empty(days.c.contributions),
+            )
+            .outerjoin(task_counts, task_counts.c.user_id == User.id)
+            .outerjoin(review_counts, review_counts.c.user_id == User.id)
+            .outerjoin(countries, countries.c.user_id == User.id)
+            .outerjoin(days, days.c.user_id == User.id)
+            .outerjoin(mapping_time, mapping_time.c.user_id == User.id)
+            .outerjoin(validation_time, validation_time.c.user_id == User.id)
+        )
+        if user_ids is not None:
+            profiles = profiles.where(User.id.in_(user_ids))
+
+        columns = [
+            "user_id",
+            "tasks_mapped",
+            "tasks_validated",
+            "tasks_invalidated",
+            "tasks_validated_by_others",
+            "tasks_invalidated_by_others",
+            "time_spent_mapping",
+            "time_spent_validating",
+            "countries_mapped",
+            "countries_validated",
+            "contributions_by_day",
+        ]
+        statement = insert(UserStats).from_select(columns, profiles)
+        statement = statement.on_conflict_do_update(
+            index_elements=[UserStats.user_id],
+            set_={column: statement.excluded[column] for column in columns[1:]},
+        )
+        return session.execute(statement).rowcount
+
+    @staticmethod
+    def add_time_spent_mapping(user_ids: list, lock_duration: datetime.timedelta):
+        """Adds the duration once per user id, for lock durations set by bulk updates"""
+        locks = Counter(user_ids)
+        _lock_user_stats(db.session, locks)
+        db.session.execute(
+            update(UserStats)
+            .where(UserStats.user_id.in_(list(locks)))
+            .values(
+                time_spent_mapping=UserStats.time_spent_mapping
+                + literal(lock_duration, db.Interval)
+                * case(locks, value=UserStats.user_id)
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _lock_user_stats(connection, user_ids):
+    """
+    Holds the profiles of the users until the transaction ends, so a profile rebuilt from the task
+    history doesn't miss the updates of the transactions adding history meanwhile. Ids past the
+    integer range share locks, which only serializes them
+    """
+    for user_id in sorted(set(user_ids)):
+        connection.execute(
+            select(func.pg_advisory_xact_lock(USER_STATS_LOCK, user_id % 2**31))
+        )
+
+
+def _add_to_counts(counts, keys):
+    """Increments the counts of the keys in a JSONB column"""
+    return counts.op("||", return_type=JSONB)(
+        func.jsonb_build_object(
+            *[
+                value
+                for key in keys
+                for value in (
+                    key,
+                    func.coalesce(counts[key].astext.cast(Integer), 0) + 1,
+                )
+            ]
+        )
+    )
+
+
+def _count_state_change(connection, history: TaskHistory) -> dict:
+    """Returns the updates of the user profile for a new state change"""
+    user_updates = {
+        "contributions_by_day": _add_to_counts(
+            UserStats.contributions_by_day, [str(history.action_date.date())]
+        )
+    }
+
+    if history.action_text in COUNTRY_STATES:
+        countries = connection.execute(
+            select(Project.country).where(Project.id == history.project_id)
+        ).scalar()
+        counts = (
+            UserStats.countries_validated
+            if history.action_text == TaskStatus.VALIDATED.name
+            else UserStats.countries_mapped
+        )
+        if countries:
+            user_updates[counts.key] = _add_to_counts(counts, countries)
+
+    if history.action_text not in CONTRIBUTION_STATES:
+        return user_updates
+
+    earlier_contributions = select(TaskHistory.id).where(
+        TaskHistory.project_id == history.project_id,
+        TaskHistory.task_id == history.task_id,
+        TaskHistory.action == TaskAction.STATE_CHANGE.name,
+        TaskHistory.action_text.in_(CONTRIBUTION_STATES),
+        TaskHistory.id != history.id,
+    )
+    user_contributions = connection.execute(
+        earlier_contributions.with_only_columns(TaskHistory.action_text)
+        .distinct()
+        .where(TaskHistory.user_id == history.user_id)
+    ).scalars()
+    user_contributions = set(user_contributions)
+
+    if history.action_text not in user_contributions:
+        counted = getattr(UserStats, f"tasks_{history.action_text.lower()}")
+        user_updates[counted.key] = counted + 1
+
+    if not user_contributions:
+        # First contribution of the user to the task, count the earlier reviews of others
+        reviews = connection.execute(
+            earlier_contributions.with_only_columns(TaskHistory.action_text)
+            .distinct()
+            .where(
+                TaskHistory.action_text.in_(REVIEW_STATES),
+                TaskHistory.user_id != history.user_id,
+            )
+        ).scalars()
+        for review in reviews:
+            counted = getattr(UserStats, f"tasks_{review.lower()}_by_others")
+            user_updates[counted.key] = counted + 1
+
+    if history.action_text in REVIEW_STATES:
+        # Count the review for the other contributors of the task, unless already reviewed
+        # the same way by someone other than them
+        other_review = aliased(TaskHistory)
+        other_contributors = (
+            earlier_contributions.with_only_columns(TaskHistory.user_id)
+            .where(TaskHistory.user_id != history.user_id)
+            .where(
+                ~select(other_review.id)
+                .where(
+                    other_review.project_id == history.project_id,
+                    other_review.task_id == history.task_id,
+                    other_review.action == TaskAction.STATE_CHANGE.name,
+                    other_review.action_text == history.action_text,
+                    other_review.user_id != TaskHistory.user_id,
+                    other_review.id != history.id,
+                )
+                .exists()
+            )
+        )
+        counted = getattr(UserStats, f"tasks_{history.action_text.lower()}_by_others")
+        connection.execute(
+            update(UserStats)
+            .where(UserStats.user_id.in_(other_contributors))
+            .values({counted: counted + 1})
+        )
+
+    return user_updates
+
+
+def _count_lock_duration(
+    connection, history: TaskHistory, previous_duration: datetime.timedelta
+) -> dict:
+    """Returns the updates of the user profile for a lock duration set on the history"""
+    previous_duration = previous_duration or datetime.timedelta()
+    if history.action in MAPPING_TIME_ACTIONS:
+        return {
+            "time_spent_mapping": UserStats.time_spent_mapping
+            + (history.lock_duration - previous_duration)
+        }
+    if history.action != TaskAction.LOCKED_FOR_VALIDATION.name:
+        return {}
+
+    # Only the longest validation lock of each minute is counted, see UserStats.rebuild
+    minute = history.action_date.replace(second=0, microsecond=0)
+    longest_lock = (
+        connection.execute(
+            select(func.max(TaskHistory.lock_duration)).where(
+                TaskHistory.user_id == history.user_id,
+                TaskHistory.action == TaskAction.LOCKED_FOR_VALIDATION.name,
+                TaskHistory.action_date >= minute,
+                TaskHistory.action_date < minute + datetime.timedelta(minutes=1),
+                TaskHistory.id != history.id,
+            )
+        ).scalar()
+        or datetime.timedelta()
+    )
+    added_duration = max(longest_lock, history.lock_duration) - max(
+        longest_lock, previous_duration
+    )
+    if not added_duration:
+        return {}
+    return {"time_spent_validating": UserStats.time_spent_validating + added_duration}
+
+
+def _update_user_stats(connection, user_id: int, user_updates: dict):
+    # Users without a profile yet get it rebuilt from the whole history on first use, the lock
+    # taken before the flush makes that rebuild wait for this transaction
+    if user_updates:
+        connection.execute(
+            update(UserStats).where(UserStats.user_id == user_id).values(user_updates)
+        )
+
+
+@event.listens_for(TaskHistory, "after_insert")
+def _count_new_history(mapper, connection, history: TaskHistory):
+    user_updates = {}
+    if history.action == TaskAction.STATE_CHANGE.name:
+        user_updates.update(_count_state_change(connection, history))
+    if history.lock_duration is not None:
+        user_updates.update(_count_lock_duration(connection, history, None))
+    _update_user_stats(connection, history.user_id, user_updates)
+
+
+@event.listens_for(TaskHistory, "after_update")
+def _count_updated_lock_duration(mapper, connection, history: TaskHistory):
+    lock_duration_history = inspect(history).attrs.lock_duration.history
+    if not lock_duration_history.added or history.lock_duration is None:
+        return
+    previous_duration = (
+        lock_duration_history.deleted[0] if lock_duration_history.deleted else None
+    )
+    _update_user_stats(
+        connection,
+        history.user_id,
+        _count_lock_duration(connection, history, previous_duration),
+    )
+
+
+@event.listens_for(TaskHistory, "after_delete")
+def _collect_deleted_history_user(mapper, connection, history: TaskHistory):
+    """Deleted history, as when a project is deleted, is removed from the profiles after flush"""
+    session = object_session(history)
+    session.info.setdefault(DELETED_HISTORY_USERS_KEY, set()).add(history.user_id)
+
+
+@event.listens_for(Session, "before_flush")
+def _lock_flushed_user_stats(session, flush_context, instances):
+    """
+    Takes the locks of all the profiles the flush updates at once, in the same order in every
+    transaction, so transactions updating the same profiles don't deadlock
+    """
+    new_history = [
+        history for history in session.new if isinstance(history, TaskHistory)
+    ]
+    user_ids = {history.user_id for history in new_history}
+    user_ids.update(
+        history.user_id
+        for history in session.dirty
+        if isinstance(history, TaskHistory)
+        and inspect(history).attrs.lock_duration.history.has_changes()
+    )
+    # Reviews are also counted for the earlier contributors of the task
+    reviewed_tasks = {
+        (history.project_id, history.task_id)
+        for history in new_history
+        if history.action == TaskAction.STATE_CHANGE.name
+        and history.action_text in REVIEW_STATES
+    }
+    if reviewed_tasks:
+        with session.no_autoflush:
+            user_ids.update(
+                session.execute(
+                    select(TaskHistory.user_id)
+                    .distinct()
+                    .where(
+                        tuple_(TaskHistory.project_id, TaskHistory.task_id).in_(
+                            list(reviewed_tasks)
+                        ),
+                        TaskHistory.action == TaskAction.STATE_CHANGE.name,
+                        TaskHistory.action_text.in_(CONTRIBUTION_STATES),
+                    )
+                ).scalars()
+            )
+    user_ids.discard(None)
+    if user_ids:
+        _lock_user_stats(session, user_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _rebuild_deleted_history_users(session, flush_context):
+    """Counters are only incremented, so the profiles of users losing history are rebuilt"""
+    user_ids = session.info.pop(DELETED_HISTORY_USERS_KEY, None)
+    user_ids = [user_id for user_id in user_ids or () if user_id is not None]
+    if user_ids:
+        UserStats.rebuild(user_ids, session=session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_deleted_history_users(session, previous_transaction):
+    session.info.pop(DELETED_HISTORY_USERS_KEY, None)
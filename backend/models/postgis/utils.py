@@ -4,6 +4,7 @@ import re
 from flask import current_app
 from geoalchemy2 import Geometry
 from geoalchemy2.functions import GenericFunction
+from sqlalchemy.types import Float
 
 
 class NotFound(Exception):
@@ -119,7 +120,7 @@ class ST_X(GenericFunction):
 
     inherit_cache = False
     name = "ST_X"
-    type = Geometry
+    type = Float
 
 
 class ST_Y(GenericFunction):
@@ -127,7 +128,7 @@ class ST_Y(GenericFunction):
 
     inherit_cache = False
     name = "ST_Y"
-    type = Geometry
+    type = Float
 
 
 def timestamp():
@@ -0,0 +1,285 @@
+import hashlib
+import io
+import json
+import logging
+import pickle
+import threading
+import time
+from functools import wraps
+
+from cachetools import TLRUCache
+from schematics import Model
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.config import EnvironmentConfig
+
+# Tag versions outlive the entries depending on them, a missing version is treated as invalidated
+TAG_TTL = 60 * 60 * 24
+SESSION_INVALIDATIONS_KEY = "cache_invalidations"
+
+
+def _rebuild_model(model_class, native_data):
+    """Recreates a DTO from the native data it was pickled with"""
+    model = model_class.__new__(model_class)
+    Model.__init__(model, native_data)
+    return model
+
+
+class _CachePickler(pickle.Pickler):
+    """Pickler that also handles DTOs, which can't be pickled by default"""
+
+    def reducer_override(self, obj):
+        if isinstance(obj, Model):
+            return _rebuild_model, (type(obj), obj.to_native())
+        return NotImplemented
+
+
+class CacheBackend:
+    """Interface of the key/value stores the cache service can use"""
+
+    def get_many(self, keys: list) -> list:
+        """Returns the values of the keys, None for missing keys"""
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: int):
+        raise NotImplementedError
+
+    def add(self, key: str, value, ttl: int) -> bool:
+        """Sets the key only if it doesn't exist yet, returns True if it was set"""
+        raise NotImplementedError
+
+    def delete_many(self, keys: list):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalCacheBackend(CacheBackend):
+    """In-process store, each worker keeps its own copy. Values are kept as they are"""
+
+    def __init__(self, maxsize: int = 4096):
+        self._lock = threading.RLock()
+        self._cache = TLRUCache(
+            maxsize=maxsize, ttu=lambda key, value, now: now + value[0]
+        )
+
+    def get_many(self, keys: list) -> list:
+        with self._lock:
+            entries = [self._cache.get(key) for key in keys]
+        return [entry[1] if entry is not None else None for entry in entries]
+
+    def set(self, key: str, value, ttl: int):
+        with self._lock:
+            self._cache[key] = (ttl, value)
+
+    def add(self, key: str, value, ttl: int) -> bool:
+        with self._lock:
+            if key in self._cache:
+                return False
+            self._cache[key] = (ttl, value)
+            return True
+
+    def delete_many(self, keys: list):
+        with self._lock:
+            for key in keys:
+                self._cache.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Store shared by all workers, values are pickled"""
+
+    def __init__(self, client, prefix: str = "tm:cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str):
+        import redis
+
+        return cls(redis.Redis.from_url(url))
+
+    def get_many(self, keys: list) -> list:
+        values = self.client.mget([self.prefix + key for key in keys])
+        return [pickle.loads(value) if value is not None else None for value in values]
+
+    @staticmethod
+    def _dumps(value) -> bytes:
+        buffer = io.BytesIO()
+        _CachePickler(buffer, pickle.HIGHEST_PROTOCOL).dump(value)
+        return buffer.getvalue()
+
+    def set(self, key: str, value, ttl: int):
+        self.client.set(self.prefix + key, self._dumps(value), ex=ttl)
+
+    def add(self, key: str, value, ttl: int) -> bool:
+        return bool(
+            self.client.set(self.prefix + key, self._dumps(value), ex=ttl, nx=True)
+        )
+
+    def delete_many(self, keys: list):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+def create_backend(backend_name: str) -> CacheBackend:
+    """Creates the configured backend, falling back to the in-process one if redis is unavailable"""
+    if backend_name == "redis":
+        try:
+            return RedisCacheBackend.from_url(EnvironmentConfig.CACHE_REDIS_URL)
+        except ImportError as e:
+            logging.warning("Redis cache backend requested but redis is not installed")
+            logging.info(e)
+    return LocalCacheBackend(EnvironmentConfig.CACHE_LOCAL_MAXSIZE)
+
+
+class CacheService:
+    """
+    Caches function results with a TTL. Entries can be tagged, e.g. with the project they were
+    computed from, so that writes to that project invalidate them before the TTL runs out
+    """
+
+    backend = None
+
+    @staticmethod
+    def get_backend() -> CacheBackend:
+        if CacheService.backend is None:
+            CacheService.backend = create_backend(EnvironmentConfig.CACHE_BACKEND)
+        return CacheService.backend
+
+    @staticmethod
+    def _make_key(namespace: str, key_data) -> str:
+        serialized = json.dumps(key_data, sort_keys=True, default=str)
+        return f"{namespace}:{hashlib.sha1(serialized.encode()).hexdigest()}"
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"tag:{tag}"
+
+    @staticmethod
+    def _get_tag_versions(tags: list, create: bool = False) -> list:
+        """Gets the current version of the tags, creating missing ones if requested"""
+        if not tags:
+            return []
+        backend = CacheService.get_backend()
+        tag_keys = [CacheService._tag_key(tag) for tag in tags]
+        versions = backend.get_many(tag_keys)
+        if create:
+            for index, version in enumerate(versions):
+                if version is None:
+                    backend.add(tag_keys[index], time.time_ns(), TAG_TTL)
+            if None in versions:
+                versions = backend.get_many(tag_keys)
+        return versions
+
+    @staticmethod
+    def get(key: str):
+        """Returns (True, value) for a valid entry, (False, None) otherwise"""
+        entry = CacheService.get_backend().get_many([key])[0]
+        if entry is None:
+            return False, None
+
+        tags, versions, value = entry
+        if tags and CacheService._get_tag_versions(tags) != versions:
+            return False, None
+        return True, value
+
+    @staticmethod
+    def set(key: str, value, ttl: int, tags: list = None, versions: list = None):
+        """
+        Stores the value. Pass the tag versions read before computing the value, otherwise an
+        invalidation happening during the computation would be missed
+        """
+        tags = list(tags or [])
+        if versions is None:
+            versions = CacheService._get_tag_versions(tags, create=True)
+        CacheService.get_backend().set(key, (tags, versions, value), ttl)
+
+    @staticmethod
+    def get_many(namespace: str, keys_data: list) -> dict:
+        """Returns the valid untagged entries of the namespace found, by key data"""
+        entries = CacheService.get_backend().get_many(
+            [CacheService._make_key(namespace, key_data) for key_data in keys_data]
+        )
+        return {
+            key_data: entry[2]
+            for key_data, entry in zip(keys_data, entries)
+            if entry is not None and not entry[0]
+        }
+
+    @staticmethod
+    def set_many(namespace: str, values: dict, ttl: int):
+        """Stores untagged values of the namespace, by key data"""
+        backend = CacheService.get_backend()
+        for key_data, value in values.items():
+            backend.set(
+                CacheService._make_key(namespace, key_data), ([], [], value), ttl
+            )
+
+    @staticmethod
+    def invalidate(*tags, session: Session = None):
+        """
+        Invalidates every entry carrying one of the tags. If a session is given, the invalidation
+        is delayed until it commits so other workers can't cache the uncommitted state
+        """
+        if session is not None:
+            session.info.setdefault(SESSION_INVALIDATIONS_KEY, set()).update(tags)
+            return
+        CacheService.get_backend().delete_many(
+            [CacheService._tag_key(tag) for tag in tags]
+        )
+
+    @staticmethod
+    def clear():
+        CacheService.get_backend().clear()
+
+    @staticmethod
+    def cached(namespace: str, ttl: int, key=None, tags=None):
+        """
+        Decorator caching the result of the function
+        :param namespace: name of the cache, prefixes the keys
+        :param ttl: seconds an entry stays valid
+        :param key: optional callable building the key from the function arguments, required when
+        arguments aren't JSON serializable
+        :param tags: optional callable returning the tags of an entry from the function arguments
+        """
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                key_data = key(*args, **kwargs) if key else [args, kwargs]
+                cache_key = CacheService._make_key(namespace, key_data)
+                found, value = CacheService.get(cache_key)
+                if found:
+                    return value
+
+                entry_tags = tags(*args, **kwargs) if tags else []
+                versions = CacheService._get_tag_versions(entry_tags, create=True)
+                value = func(*args, **kwargs)
+                CacheService.set(cache_key, value, ttl, entry_tags, versions)
+                return value
+
+            return wrapper
+
+        return decorator
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    tags = session.info.pop(SESSION_INVALIDATIONS_KEY, None)
+    if tags:
+        CacheService.invalidate(*tags)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop(SESSION_INVALIDATIONS_KEY, None)
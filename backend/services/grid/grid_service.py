@@ -1,5 +1,7 @@
 import geojson
 import json
+import numpy
+import shapely
 from shapely.geometry import MultiPolygon, mapping
 from shapely.ops import unary_union
 import shapely.geometry
@@ -7,6 +9,11 @@ from flask import current_app
 from backend.models.dtos.grid_dto import GridDTO
 from backend.models.postgis.utils import InvalidGeoJson
 
+# Half the side of the OSM tile grid in EPSG:3857 meters, from its maximum resolution
+TILE_GRID_MAX = 156543.0339 * 256 / 2
+# Radius of the sphere of the EPSG:3857 projection
+WEB_MERCATOR_RADIUS = 6378137.0
+
 
 class GridServiceError(Exception):
     """Custom Exception to notify callers an error occurred when handling projects"""
@@ -25,26 +32,49 @@ class GridService:
         :param grid_dto: the dto containing
         :return: geojson.FeatureCollection trimmed task grid
         """
-        # get items out of the dto
-        grid = geojson.loads(geojson.dumps(grid_dto.grid))
+        grid_features = grid_dto.grid["features"]
         aoi = geojson.loads(geojson.dumps(grid_dto.area_of_interest))
         clip_to_aoi = grid_dto.clip_to_aoi
 
-        # create a shapely shape from the aoi
+        # create a shapely shape from the aoi, prepared as it is tested against every tile
         aoi_multi_polygon_geojson = GridService.merge_to_multi_polygon(
             aoi, dissolve=True
         )
-
         aoi_multi_polygon = shapely.geometry.shape(aoi_multi_polygon_geojson)
+        shapely.prepare(aoi_multi_polygon)
+
+        # create the shapely shapes of the tiles, rounded like geojson rounds coordinates
+        tiles = shapely.transform(
+            shapely.from_geojson(
+                [json.dumps(feature["geometry"]) for feature in grid_features]
+            ),
+            lambda coordinates: numpy.round(
+                coordinates, geojson.geometry.DEFAULT_PRECISION
+            ),
+        )
+        # tiles completely within the aoi are used as is, only the others are intersected
+        contained = shapely.contains(aoi_multi_polygon, tiles)
+        partial = ~contained & shapely.intersects(aoi_multi_polygon, tiles)
+        intersections = numpy.empty(len(tiles), dtype=object)
+        intersections[partial] = shapely.intersection(aoi_multi_polygon, tiles[partial])
+
+        kept = contained | partial
+        kept_geometries = iter(shapely.to_geojson(tiles[kept]))
         intersecting_features = []
-        for feature in grid["features"]:
-            # create a shapely shape for the tile
-            tile = shapely.geometry.shape(feature["geometry"])
-            if aoi_multi_polygon.contains(tile):
+        for index, grid_feature in enumerate(grid_features):
+            if not kept[index]:
+                continue  # tile is completely outside aoi
+            # copy the feature, the grid of the dto is left unchanged
+            feature = dict(
+                grid_feature,
+                geometry=json.loads(next(kept_geometries)),
+                properties=dict(grid_feature["properties"]),
+            )
+            if contained[index]:
                 # tile is completely within aoi, use as is
                 intersecting_features.append(feature)
             else:
-                intersection = aoi_multi_polygon.intersection(tile)
+                intersection = intersections[index]
                 if intersection.is_empty or intersection.geom_type not in [
                     "Polygon",
                     "MultiPolygon",
@@ -127,6 +157,61 @@ class GridService:
 
         return aoi_multi_polygon_geojson
 
+    @staticmethod
+    def get_tiles_bounds(xs, ys, zoom: int) -> numpy.ndarray:
+        """
+        Computes the EPSG:4326 bounds of OSM tile grid squares, as PostGIS transforms their
+        EPSG:3857 extent. The y axis of the grid points north
+        :param xs: x of each square, a sequence or array of any length
+        :param ys: y of each square
+        :param zoom: osm tile grid zoom level of the squares
+        :return: array of (min_lon, min_lat, max_lon, max_lat) rows
+        """
+        step = TILE_GRID_MAX / (2 ** (zoom - 1))
+        xs = numpy.asarray(xs, dtype=float)
+        ys = numpy.asarray(ys, dtype=float)
+        x_bounds = numpy.stack([xs * step, (xs + 1) * step], axis=-1) - TILE_GRID_MAX
+        y_bounds = numpy.stack([ys * step, (ys + 1) * step], axis=-1) - TILE_GRID_MAX
+
+        # Inverse of the spherical Mercator projection
+        lon_bounds = numpy.degrees(x_bounds / WEB_MERCATOR_RADIUS)
+        lat_bounds = numpy.degrees(
+            numpy.arctan(numpy.sinh(y_bounds / WEB_MERCATOR_RADIUS))
+        )
+        return numpy.stack(
+            [lon_bounds[:, 0], lat_bounds[:, 0], lon_bounds[:, 1], lat_bounds[:, 1]],
+            axis=-1,
+        )
+
+    @staticmethod
+    def tiles_to_multi_polygons(xs, ys, zoom: int) -> list:
+        """
+        Creates the geojson.MultiPolygon of OSM tile grid squares
+        :param xs: x of each square
+        :param ys: y of each square
+        :param zoom: osm tile grid zoom level of the squares
+        :return: list of geojson.MultiPolygon in EPSG:4326
+        """
+        # Rounded to the 9 decimals of ST_AsGeoJSON before geojson rounds them to 6, so tile edges
+        # halfway between two 6 decimals values round as they did when PostGIS made the squares
+        bounds = numpy.round(GridService.get_tiles_bounds(xs, ys, zoom), 9)
+        return [
+            geojson.MultiPolygon(
+                [
+                    [
+                        [
+                            (min_lon, min_lat),
+                            (max_lon, min_lat),
+                            (max_lon, max_lat),
+                            (min_lon, max_lat),
+                            (min_lon, min_lat),
+                        ]
+                    ]
+                ]
+            )
+            for min_lon, min_lat, max_lon, max_lat in bounds.tolist()
+        ]
+
     @staticmethod
     def _update_feature(clip_to_aoi: bool, feature: dict, new_shape) -> dict:
         """
@@ -1,5 +1,7 @@
 import geojson
-from shapely.geometry import Polygon, MultiPolygon, LineString, shape as shapely_shape
+import numpy
+import shapely
+from shapely.geometry import MultiPolygon, LineString, mapping, shape as shapely_shape
 from shapely.ops import split
 from backend import db
 from flask import current_app
@@ -8,10 +10,11 @@ from geoalchemy2 import shape
 from backend.exceptions import NotFound
 from backend.models.dtos.grid_dto import SplitTaskDTO
 from backend.models.dtos.mapping_dto import TaskDTOs
-from backend.models.postgis.utils import ST_Transform, ST_Area, ST_GeogFromWKB
+from backend.models.postgis.utils import ST_Area, ST_GeogFromWKB
 from backend.models.postgis.task import Task, TaskStatus, TaskAction
 from backend.models.postgis.project import Project
 from backend.models.postgis.utils import InvalidGeoJson
+from backend.services.grid.grid_service import GridService
 
 
 class SplitServiceError(Exception):
@@ -36,65 +39,34 @@ class SplitService:
             return SplitService._create_split_tasks_from_geometry(task)
 
         try:
-            split_geoms = []
-            for i in range(0, 2):
-                for j in range(0, 2):
-                    new_x = x * 2 + i
-                    new_y = y * 2 + j
-                    new_zoom = zoom + 1
-                    new_square = SplitService._create_square(new_x, new_y, new_zoom)
-                    feature = geojson.Feature()
-                    feature.geometry = new_square
-                    feature.properties = {
-                        "x": new_x,
-                        "y": new_y,
-                        "zoom": new_zoom,
-                        "isSquare": True,
-                    }
+            new_zoom = zoom + 1
+            new_tiles = [
+                (x * 2 + i, y * 2 + j) for i in range(0, 2) for j in range(0, 2)
+            ]
+            new_squares = GridService.tiles_to_multi_polygons(
+                [new_x for new_x, _ in new_tiles],
+                [new_y for _, new_y in new_tiles],
+                new_zoom,
+            )
 
-                    if len(feature.geometry.coordinates) > 0:
-                        split_geoms.append(feature)
+            split_geoms = []
+            for (new_x, new_y), new_square in zip(new_tiles, new_squares):
+                feature = geojson.Feature()
+                feature.geometry = new_square
+                feature.properties = {
+                    "x": new_x,
+                    "y": new_y,
+                    "zoom": new_zoom,
+                    "isSquare": True,
+                }
+
+                if len(feature.geometry.coordinates) > 0:
+                    split_geoms.append(feature)
 
             return split_geoms
         except Exception as e:
             raise SplitServiceError(f"unhandled error splitting tile: {str(e)}")
 
-    @staticmethod
-    def _create_square(x, y, zoom) -> geojson.MultiPolygon:
-        """
-        Function for creating a geojson.MultiPolygon square representing a single OSM tile grid square
-        :param x: osm tile grid x
-        :param y: osm tile grid y
-        :param zoom: osm tile grid zoom level
-        :return: geojson.MultiPolygon in EPSG:4326
-        """
-        # Maximum resolution
-        MAXRESOLUTION = 156543.0339
-
-        # X/Y axis limit
-        max = MAXRESOLUTION * 256 / 2
-
-        # calculate extents
-        step = max / (2 ** (zoom - 1))
-        xmin = x * step - max
-        ymin = y * step - max
-        xmax = (x + 1) * step - max
-        ymax = (y + 1) * step - max
-
-        # make a shapely multipolygon
-        multipolygon = MultiPolygon(
-            [Polygon([(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)])]
-        )
-
-        # use the database to transform the geometry from 3857 to 4326
-        transformed_geometry = ST_Transform(shape.from_shape(multipolygon, 3857), 4326)
-
-        # use DB to get the geometry as geojson
-        with db.engine.connect() as conn:
-            return geojson.loads(
-                conn.execute(transformed_geometry.ST_AsGeoJSON()).scalar()
-            )
-
     @staticmethod
     def _create_split_tasks_from_geometry(task) -> list:
         """
@@ -102,12 +74,8 @@ class SplitService:
         an OSM tile identified by x, y, zoom
         :return: list of {geojson.Feature}
         """
-        # Load the task's geometry and calculate its centroid and bbox
-        query = db.session.query(
-            Task.id, Task.geometry.ST_AsGeoJSON().label("geometry")
-        ).filter(Task.id == task.id, Task.project_id == task.project_id)
-        task_geojson = geojson.loads(query[0].geometry)
-        geometry = shapely_shape(task_geojson)
+        # Calculate the centroid and bbox of the task's geometry
+        geometry = shape.to_shape(task.geometry)
         centroid = geometry.centroid
         minx, miny, maxx, maxy = geometry.bounds
 
@@ -128,12 +96,13 @@ class SplitService:
         split_features = []
         for split_geometry in split_geometries:
             feature = geojson.Feature()
-            # Tasks expect multipolygons. Convert and use the database to get as GeoJSON
-            multipolygon_geometry = shape.from_shape(split_geometry, 4326)
-            with db.engine.connect() as conn:
-                feature.geometry = geojson.loads(
-                    conn.execute(multipolygon_geometry.ST_AsGeoJSON()).scalar()
-                )
+            # Tasks expect multipolygons, rounded to the 9 decimals of ST_AsGeoJSON as above
+            rounded_geometry = shapely.transform(
+                split_geometry, lambda coordinates: numpy.round(coordinates, 9)
+            )
+            feature.geometry = geojson.MultiPolygon(
+                mapping(rounded_geometry)["coordinates"]
+            )
             feature.properties["x"] = None
             feature.properties["y"] = None
             feature.properties["zoom"] = None
@@ -177,11 +146,14 @@ class SplitService:
 
         original_geometry = shape.to_shape(original_task.geometry)
 
-        # Fetch the task geometry in meters
-        with db.engine.connect() as conn:
-            original_task_area_m = conn.execute(
-                ST_Area(ST_GeogFromWKB(original_task.geometry))
-            ).scalar()
+        # The task area is stored in km2 on creation, compute it for tasks created before
+        if original_task.area is not None:
+            original_task_area_m = original_task.area * 1000000
+        else:
+            with db.engine.connect() as conn:
+                original_task_area_m = conn.execute(
+                    ST_Area(ST_GeogFromWKB(original_task.geometry))
+                ).scalar()
 
         if (
             original_task.zoom and original_task.zoom >= 18
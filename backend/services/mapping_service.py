@@ -1,8 +1,9 @@
 import datetime
-import xml.etree.ElementTree as ET
+import io
+import itertools
+from xml.sax.saxutils import XMLGenerator
 
 from flask import current_app
-from geoalchemy2 import shape
 
 from backend.exceptions import NotFound
 from backend.models.dtos.mapping_dto import (
@@ -21,6 +22,11 @@ from backend.services.project_service import ProjectService
 from backend.services.stats_service import StatsService
 
 
+# Bytes of XML buffered before a chunk of a GPX or OSM XML export is yielded
+XML_CHUNK_SIZE = 64 * 1024
+GPX_NAMESPACE = "http://www.topografix.com/GPX/1/1"
+
+
 class MappingServiceError(Exception):
     """Custom Exception to notify callers an error occurred when handling mapping"""
 
@@ -53,6 +59,7 @@ class MappingService:
     ) -> TaskDTO:
         """Get task as DTO for transmission over API"""
         task = MappingService.get_task(task_id, project_id)
+        task.unlock_if_expired()
         task_dto = task.as_dto_with_instructions(preferred_local)
         return task_dto
 
@@ -85,6 +92,7 @@ class MappingService:
         :return: Updated task, or None if not found
         """
         task = MappingService.get_task(lock_task_dto.task_id, lock_task_dto.project_id)
+        task.unlock_if_expired()
 
         if task.locked_by != lock_task_dto.user_id:
             if not task.is_mappable():
@@ -225,119 +233,158 @@ class MappingService:
         Creates a GPX file for supplied tasks.  Timestamp is for unit testing only.
         You can use the following URL to test locally:
         http://www.openstreetmap.org/edit?editor=id&#map=11/31.50362930069913/34.628906243797054&comment=CHANGSET_COMMENT&gpx=http://localhost:8000/api/v2/projects/{project_id}/tasks/queries/gpx%3Ftasks=2
+        :raises NotFound: raised before anything is generated, so callers can still return a 404
+        :return: generator of bytes chunks
         """
 
         if timestamp is None:
             timestamp = datetime.datetime.utcnow()
 
-        root = ET.Element(
+        task_ids = MappingService._get_export_task_ids(project_id, task_ids_str)
+        return MappingService._stream_gpx(project_id, task_ids, timestamp)
+
+    @staticmethod
+    def _stream_gpx(project_id: int, task_ids: list, timestamp):
+        buffer = io.BytesIO()
+        gpx = XMLGenerator(buffer, encoding="utf-8", short_empty_elements=True)
+        gpx.startDocument()
+        gpx.startElement(
             "gpx",
-            attrib=dict(
-                version="1.1",
-                creator="HOT Tasking Manager",
-                xmlns="http://www.topografix.com/GPX/1/1",
-            ),
+            dict(version="1.1", creator="HOT Tasking Manager", xmlns=GPX_NAMESPACE),
         )
 
         # Create GPX Metadata element
-        metadata = ET.Element("metadata")
-        link = ET.SubElement(
-            metadata,
-            "link",
-            attrib=dict(href="https://github.com/hotosm/tasking-manager"),
+        gpx.startElement("metadata", {})
+        gpx.startElement("link", dict(href="https://github.com/hotosm/tasking-manager"))
+        MappingService._write_text_element(gpx, "text", "HOT Tasking Manager")
+        gpx.endElement("link")
+        MappingService._write_text_element(gpx, "time", timestamp.isoformat())
+        gpx.endElement("metadata")
+
+        # Create trk element with a trkseg element per polygon of the tasks
+        gpx.startElement("trk", {})
+        MappingService._write_text_element(
+            gpx,
+            "name",
+            f"Task for project {project_id}. Do not edit outside of this area!",
         )
-        ET.SubElement(link, "text").text = "HOT Tasking Manager"
-        ET.SubElement(metadata, "time").text = timestamp.isoformat()
-        root.append(metadata)
-
-        # Create trk element
-        trk = ET.Element("trk")
-        root.append(trk)
-        ET.SubElement(
-            trk, "name"
-        ).text = f"Task for project {project_id}. Do not edit outside of this area!"
-
-        # Construct trkseg elements
-        if task_ids_str is not None:
-            task_ids = list(map(int, task_ids_str.split(",")))
-            tasks = Task.get_tasks(project_id, task_ids)
-            if not tasks or len(tasks) == 0:
-                raise NotFound(
-                    sub_code="TASKS_NOT_FOUND", project_id=project_id, task_ids=task_ids
-                )
-        else:
-            tasks = Task.get_all_tasks(project_id)
-            if not tasks or len(tasks) == 0:
-                raise NotFound(sub_code="TASKS_NOT_FOUND", project_id=project_id)
-
-        for task in tasks:
-            task_geom = shape.to_shape(task.geometry)
-            for poly in task_geom.geoms:
-                trkseg = ET.SubElement(trk, "trkseg")
-                for point in poly.exterior.coords:
-                    ET.SubElement(
-                        trkseg,
-                        "trkpt",
-                        attrib=dict(lon=str(point[0]), lat=str(point[1])),
-                    )
-
-                    # Append wpt elements to end of doc
-                    wpt = ET.Element(
-                        "wpt", attrib=dict(lon=str(point[0]), lat=str(point[1]))
-                    )
-                    root.append(wpt)
-
-        xml_gpx = ET.tostring(root, encoding="utf8")
-        return xml_gpx
+        points = Task.stream_tasks_outline_points(project_id, task_ids)
+        for _, polygon_points in itertools.groupby(
+            points, key=lambda point: (point.task_id, point.polygon)
+        ):
+            gpx.startElement("trkseg", {})
+            for point in polygon_points:
+                MappingService._write_point(gpx, "trkpt", point)
+            gpx.endElement("trkseg")
+            if buffer.tell() >= XML_CHUNK_SIZE:
+                yield MappingService._drain(buffer)
+        gpx.endElement("trk")
+
+        # wpt elements come after the track, read the points again rather than keeping them
+        for point in Task.stream_tasks_outline_points(project_id, task_ids):
+            MappingService._write_point(gpx, "wpt", point)
+            if buffer.tell() >= XML_CHUNK_SIZE:
+                yield MappingService._drain(buffer)
+
+        gpx.endElement("gpx")
+        gpx.endDocument()
+        yield MappingService._drain(buffer)
 
     @staticmethod
-    def generate_osm_xml(project_id: int, task_ids_str: str) -> str:
+    def generate_osm_xml(project_id: int, task_ids_str: str):
         """Generate xml response suitable for loading into JOSM.  A sample output file is in
-        /backend/helpers/testfiles/osm-sample.xml"""
+        /backend/helpers/testfiles/osm-sample.xml
+        :raises NotFound: raised before anything is generated, so callers can still return a 404
+        :return: generator of bytes chunks
+        """
+        task_ids = MappingService._get_export_task_ids(project_id, task_ids_str)
+        return MappingService._stream_osm_xml(project_id, task_ids)
+
+    @staticmethod
+    def _stream_osm_xml(project_id: int, task_ids: list):
+        buffer = io.BytesIO()
+        osm = XMLGenerator(buffer, encoding="utf-8", short_empty_elements=True)
+        osm.startDocument()
         # Note XML created with upload No to ensure it will be rejected by OSM if uploaded by mistake
-        root = ET.Element(
+        osm.startElement(
             "osm",
-            attrib=dict(version="0.6", upload="never", creator="HOT Tasking Manager"),
+            dict(version="0.6", upload="never", creator="HOT Tasking Manager"),
         )
 
+        fake_id = -1  # We use fake-ids to ensure XML will not be validated by OSM
+        points = Task.stream_tasks_outline_points(project_id, task_ids)
+        for task_id, task_points in itertools.groupby(
+            points, key=lambda point: point.task_id
+        ):
+            # Only the points of one task are kept, the way lists them before the nodes
+            task_points = list(task_points)
+            node_ids = range(fake_id, fake_id - len(task_points), -1)
+            osm.startElement(
+                "way",
+                dict(id=str((task_id * -1)), action="modify", visible="true"),
+            )
+            for node_id in node_ids:
+                osm.startElement("nd", dict(ref=str(node_id)))
+                osm.endElement("nd")
+            osm.endElement("way")
+            for node_id, point in zip(node_ids, task_points):
+                osm.startElement(
+                    "node",
+                    dict(
+                        action="modify",
+                        visible="true",
+                        id=str(node_id),
+                        lon=str(point.lon),
+                        lat=str(point.lat),
+                    ),
+                )
+                osm.endElement("node")
+            fake_id -= len(task_points)
+            if buffer.tell() >= XML_CHUNK_SIZE:
+                yield MappingService._drain(buffer)
+
+        osm.endElement("osm")
+        osm.endDocument()
+        yield MappingService._drain(buffer)
+
+    @staticmethod
+    def _get_export_task_ids(project_id: int, task_ids_str: str):
+        """
+        Parses the requested task ids, None requesting all the tasks of the project
+        :raises NotFound: if the project has none of the requested tasks
+        """
+        filters = [Task.project_id == project_id]
+        task_ids = None
         if task_ids_str:
             task_ids = list(map(int, task_ids_str.split(",")))
-            tasks = Task.get_tasks(project_id, task_ids)
-            if not tasks or len(tasks) == 0:
-                raise NotFound(
-                    sub_code="TASKS_NOT_FOUND", project_id=project_id, task_ids=task_ids
-                )
-        else:
-            tasks = Task.get_all_tasks(project_id)
-            if not tasks or len(tasks) == 0:
-                raise NotFound(sub_code="TASKS_NOT_FOUND", project_id=project_id)
+            filters.append(Task.id.in_(task_ids))
 
-        fake_id = -1  # We use fake-ids to ensure XML will not be validated by OSM
-        for task in tasks:
-            task_geom = shape.to_shape(task.geometry)
-            way = ET.SubElement(
-                root,
-                "way",
-                attrib=dict(id=str((task.id * -1)), action="modify", visible="true"),
+        if Task.query.with_entities(Task.id).filter(*filters).first() is None:
+            if task_ids is None:
+                raise NotFound(sub_code="TASKS_NOT_FOUND", project_id=project_id)
+            raise NotFound(
+                sub_code="TASKS_NOT_FOUND", project_id=project_id, task_ids=task_ids
             )
-            for poly in task_geom.geoms:
-                for point in poly.exterior.coords:
-                    ET.SubElement(
-                        root,
-                        "node",
-                        attrib=dict(
-                            action="modify",
-                            visible="true",
-                            id=str(fake_id),
-                            lon=str(point[0]),
-                            lat=str(point[1]),
-                        ),
-                    )
-                    ET.SubElement(way, "nd", attrib=dict(ref=str(fake_id)))
-                    fake_id -= 1
+        return task_ids
 
-        xml_gpx = ET.tostring(root, encoding="utf8")
-        return xml_gpx
+    @staticmethod
+    def _write_text_element(writer: XMLGenerator, name: str, text: str):
+        writer.startElement(name, {})
+        writer.characters(text)
+        writer.endElement(name)
+
+    @staticmethod
+    def _write_point(writer: XMLGenerator, name: str, point):
+        writer.startElement(name, dict(lon=str(point.lon), lat=str(point.lat)))
+        writer.endElement(name)
+
+    @staticmethod
+    def _drain(buffer: io.BytesIO) -> bytes:
+        """Returns the XML written to the buffer so far and empties it"""
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
 
     @staticmethod
     def undo_mapping(
@@ -478,4 +525,5 @@ class MappingService:
                 extend_dto.user_id,
             )
             task.set_task_history(action, extend_dto.user_id)
+            task.set_lock_expiry()
             task.update()
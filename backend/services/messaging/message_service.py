@@ -1,9 +1,7 @@
 import re
-import time
 import datetime
 import bleach
 
-from cachetools import TTLCache, cached
 from typing import List
 from flask import current_app
 from sqlalchemy import text, func
@@ -29,9 +27,6 @@ from backend.services.organisation_service import OrganisationService
 from backend.services.users.user_service import UserService, User
 
 
-message_cache = TTLCache(maxsize=512, ttl=30)
-
-
 class MessageServiceError(Exception):
     """Custom Exception to notify callers an error occurred when handling mapping"""
 
@@ -70,50 +65,79 @@ class MessageService:
         status: int, validated_by: int, mapped_by: int, task_id: int, project_id: int
     ):
         """Sends mapper a notification after their task has been marked valid or invalid"""
-        if validated_by == mapped_by:
-            return  # No need to send a notification if you've verified your own task
+        MessageService.send_messages_after_validation(
+            validated_by, project_id, [(status, mapped_by, task_id)]
+        )
+
+    @staticmethod
+    def send_messages_after_validation(
+        validated_by: int, project_id: int, validated_tasks: list
+    ):
+        """
+        Sends mappers a notification after their tasks have been marked valid or invalid, pushed
+        as a single batch
+        :param validated_tasks: list of (status, mapped_by, task_id) tuples, one per notification
+        """
+        # No need to send a notification if you've verified your own task
+        validated_tasks = [
+            validated_task
+            for validated_task in validated_tasks
+            if validated_task[1] != validated_by
+        ]
+        if not validated_tasks:
+            return
+
         project = Project.get(project_id)
         project_name = ProjectInfo.get_dto_for_locale(
             project_id, project.default_locale
         ).name
-        user = UserService.get_user_by_id(mapped_by)
-        text_template = get_txt_template(
-            "invalidation_message_en.txt"
-            if status == TaskStatus.INVALIDATED
-            else "validation_message_en.txt"
-        )
-        status_text = (
-            "marked invalid" if status == TaskStatus.INVALIDATED else "validated"
-        )
-        task_link = MessageService.get_task_link(project_id, task_id, highlight=True)
         project_link = MessageService.get_project_link(project_id, project_name)
-
-        replace_list = [
-            ["[USERNAME]", user.username],
-            ["[TASK_LINK]", task_link],
-            ["[ORG_NAME]", current_app.config["ORG_NAME"]],
-        ]
-        text_template = template_var_replacing(text_template, replace_list)
+        mapper_ids = {mapped_by for _, mapped_by, _ in validated_tasks}
+        mappers = {
+            user.id: user for user in User.query.filter(User.id.in_(mapper_ids)).all()
+        }
+        invalidation_template = get_txt_template("invalidation_message_en.txt")
+        validation_template = get_txt_template("validation_message_en.txt")
 
         messages = []
-        validation_message = Message()
-        validation_message.message_type = (
-            MessageType.INVALIDATION_NOTIFICATION.value
-            if status == TaskStatus.INVALIDATED
-            else MessageType.VALIDATION_NOTIFICATION.value
-        )
-        validation_message.project_id = project_id
-        validation_message.task_id = task_id
-        validation_message.from_user_id = validated_by
-        validation_message.to_user_id = mapped_by
-        validation_message.subject = (
-            f"{task_link} mapped by you in Project "
-            + f"{project_link} has been {status_text}"
-        )
-        validation_message.message = text_template
-        messages.append(
-            dict(message=validation_message, user=user, project_name=project_name)
-        )
+        for status, mapped_by, task_id in validated_tasks:
+            user = mappers.get(mapped_by)
+            if user is None:
+                continue
+            is_invalidation = status == TaskStatus.INVALIDATED
+            status_text = "marked invalid" if is_invalidation else "validated"
+            task_link = MessageService.get_task_link(
+                project_id, task_id, highlight=True
+            )
+
+            replace_list = [
+                ["[USERNAME]", user.username],
+                ["[TASK_LINK]", task_link],
+                ["[ORG_NAME]", current_app.config["ORG_NAME"]],
+            ]
+            text_template = template_var_replacing(
+                invalidation_template if is_invalidation else validation_template,
+                replace_list,
+            )
+
+            validation_message = Message()
+            validation_message.message_type = (
+                MessageType.INVALIDATION_NOTIFICATION.value
+                if is_invalidation
+                else MessageType.VALIDATION_NOTIFICATION.value
+            )
+            validation_message.project_id = project_id
+            validation_message.task_id = task_id
+            validation_message.from_user_id = validated_by
+            validation_message.to_user_id = mapped_by
+            validation_message.subject = (
+                f"{task_link} mapped by you in Project "
+                + f"{project_link} has been {status_text}"
+            )
+            validation_message.message = text_template
+            messages.append(
+                dict(message=validation_message, user=user, project_name=project_name)
+            )
 
         # For email alerts
         MessageService._push_messages(messages)
@@ -142,27 +166,46 @@ class MessageService:
             )
 
             messages = []
-            for contributor in contributors:
-                message = Message.from_dto(contributor[0], message_dto)
+            for user in MessageService._get_recipients(
+                user_ids=[contributor[0] for contributor in contributors]
+            ):
+                message = Message.from_dto(user.id, message_dto)
                 message.message_type = MessageType.BROADCAST.value
                 message.project_id = project_id
-                user = UserService.get_user_by_id(contributor[0])
                 messages.append(
                     dict(message=message, user=user, project_name=project_name)
                 )
 
             MessageService._push_messages(messages)
 
+    @staticmethod
+    def _get_recipients(user_ids: list = None, usernames: list = None) -> List[User]:
+        """
+        Gets the users to notify, with their notification preferences, in a single query. Users
+        that can't be found are left out
+        """
+        if user_ids:
+            recipients_filter = User.id.in_(user_ids)
+        elif usernames:
+            recipients_filter = User.username.in_(usernames)
+        else:
+            return []
+        return User.query.filter(recipients_filter).all()
+
     @staticmethod
     def _push_messages(messages):
+        """
+        Stores the messages and queues the email alerts in a single transaction, the emails are
+        sent by the outbox worker. The messages are inserted together with a single statement
+        """
         if len(messages) == 0:
             return
 
         messages_objs = []
-        for i, message in enumerate(messages):
+        email_alerts = []
+        for message in messages:
             user = message.get("user")
             obj = message.get("message")
-            project_name = message.get("project_name")
             # Store message in the database only if mentions option are disabled.
             if (
                 user.mentions_notifications is False
@@ -203,28 +246,37 @@ class MessageService:
                 messages_objs.append(obj)
                 continue
             messages_objs.append(obj)
+            email_alerts.append(message)
+
+        if len(messages_objs) == 0:
+            return
+
+        # Insert the messages first so the alerts can link to them
+        Message.insert_messages(messages_objs)
+
+        sender_ids = {message["message"].from_user_id for message in email_alerts}
+        sender_usernames = dict(
+            db.session.query(User.id, User.username)
+            .filter(User.id.in_(sender_ids))
+            .all()
+        )
+        for message in email_alerts:
+            user = message["user"]
+            obj = message["message"]
             SMTPService.send_email_alert(
                 user.email_address,
                 user.username,
                 user.is_email_verified,
-                message["message"].id,
-                UserService.get_user_by_id(message["message"].from_user_id).username,
-                message["message"].project_id,
-                message["message"].task_id,
-                clean_html(message["message"].subject),
-                message["message"].message,
+                obj.id,
+                sender_usernames.get(obj.from_user_id),
+                obj.project_id,
+                obj.task_id,
+                clean_html(obj.subject),
+                obj.message,
                 obj.message_type,
-                project_name,
+                message.get("project_name"),
             )
-
-            if i + 1 % 10 == 0:
-                time.sleep(0.5)
-
-        # Flush messages to the database.
-        if len(messages_objs) > 0:
-            db.session.add_all(messages_objs)
-            db.session.flush()
-            db.session.commit()
+        db.session.commit()
 
     @staticmethod
     def send_message_after_comment(
@@ -273,12 +325,8 @@ class MessageService:
             clean_comment = bleach.linkify(clean_comment)
 
             messages = []
-            for username in usernames:
-                try:
-                    user = UserService.get_user_by_username(username)
-                except NotFound:
-                    continue  # If we can't find the user, keep going no need to fail
-
+            # Users that can't be found are left out, no need to fail
+            for user in MessageService._get_recipients(usernames=usernames):
                 message = Message()
                 message.message_type = MessageType.MENTION_NOTIFICATION.value
                 message.project_id = project_id
@@ -308,24 +356,17 @@ class MessageService:
         contributed_users = [r[0] for r in results]
 
         if len(contributed_users) != 0:
-            user_from = User.query.get(comment_from)
-            if user_from is None:
-                raise ValueError("Username not found")
-            user_link = MessageService.get_user_link(user_from.username)
+            user_link = MessageService.get_user_link(comment_from_user.username)
 
             task_link = MessageService.get_task_link(project_id, task_id)
             project_link = MessageService.get_project_link(project_id, project_name)
 
             messages = []
-            for user_id in contributed_users:
-                try:
-                    user = UserService.get_user_by_id(user_id)
-                    # if user was mentioned, a message has already been sent to them,
-                    # so we can skip
-                    if user.username in usernames:
-                        break
-                except NotFound:
-                    continue  # If we can't find the user, keep going no need to fail
+            for user in MessageService._get_recipients(user_ids=contributed_users):
+                # if user was mentioned, a message has already been sent to them,
+                # so we can skip
+                if user.username in usernames:
+                    continue
 
                 message = Message()
                 message.message_type = MessageType.TASK_COMMENT_NOTIFICATION.value
@@ -509,14 +550,11 @@ class MessageService:
                     project_id, project_name, include_chat_section=True
                 )
                 messages = []
-                for username in usernames:
-                    current_app.logger.debug(f"Searching for {username}")
-                    try:
-                        user = UserService.get_user_by_username(username)
-                    except NotFound:
-                        current_app.logger.error(f"Username {username} not found")
-                        continue  # If we can't find the user, keep going no need to fail
-
+                recipients = MessageService._get_recipients(usernames=usernames)
+                # If we can't find a user, keep going no need to fail
+                for username in set(usernames) - {user.username for user in recipients}:
+                    current_app.logger.error(f"Username {username} not found")
+                for user in recipients:
                     message = Message()
                     message.message_type = MessageType.MENTION_NOTIFICATION.value
                     message.project_id = project_id
@@ -554,11 +592,8 @@ class MessageService:
                     project_id, project_name, include_chat_section=True
                 )
                 messages = []
-                for user_id in users_to_notify:
-                    try:
-                        user = UserService.get_user_by_id(user_id)
-                    except NotFound:
-                        continue  # If we can't find the user, keep going no need to fail
+                # Users that can't be found are left out, no need to fail
+                for user in MessageService._get_recipients(user_ids=users_to_notify):
                     message = Message()
                     message.message_type = MessageType.PROJECT_CHAT_NOTIFICATION.value
                     message.project_id = project_id
@@ -699,9 +734,8 @@ class MessageService:
         return usernames
 
     @staticmethod
-    @cached(message_cache)
     def has_user_new_messages(user_id: int) -> dict:
-        """Determines if the user has any unread messages"""
+        """Determines if the user has any unread messages, from their unread counters"""
         count = Notification.get_unread_message_count(user_id)
 
         new_messages = False
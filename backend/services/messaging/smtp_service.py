@@ -1,9 +1,11 @@
+import time
 import urllib.parse
 from itsdangerous import URLSafeTimedSerializer
 from flask import current_app
 from flask_mail import Message
 
-from backend import mail, create_app
+from backend import db, mail, create_app
+from backend.models.postgis.email_outbox import EmailOutbox
 from backend.models.postgis.message import Message as PostgisMessage
 from backend.models.postgis.statuses import EncouragingEmailType
 from backend.services.messaging.template_service import (
@@ -137,7 +139,10 @@ class SMTPService:
         message_type: int,
         project_name: str,
     ):
-        """Send an email to user to alert that they have a new message."""
+        """
+        Queue an email to user to alert that they have a new message. The email is sent by the
+        outbox worker once the caller commits
+        """
 
         if not user_email_verified:
             return False
@@ -171,27 +176,96 @@ class SMTPService:
             "MESSAGE_TYPE": message_type,
         }
         html_template = get_template("message_alert_en.html", values)
-        SMTPService._send_message(to_address, subject, html_template)
+        SMTPService.queue_message(to_address, subject, html_template)
 
         return True
 
+    @staticmethod
+    def queue_message(
+        to_address: str, subject: str, html_message: str, text_message: str = None
+    ):
+        """Adds the message to the outbox, the caller commits"""
+        db.session.add(EmailOutbox(to_address, subject, html_message, text_message))
+
+    @staticmethod
+    def send_queued_emails(batch_size: int = None) -> int:
+        """
+        Sends the emails of the outbox in batches, each over a single SMTP connection and rate
+        limited. Emails failing to send are retried later with an exponential backoff
+        :return: number of emails sent
+        """
+        batch_size = batch_size or current_app.config["MAIL_OUTBOX_BATCH_SIZE"]
+        max_attempts = current_app.config["MAIL_OUTBOX_MAX_ATTEMPTS"]
+        emails_sent = 0
+        while True:
+            emails = EmailOutbox.get_due(batch_size, max_attempts)
+            if emails:
+                emails_sent += SMTPService._send_batch(emails)
+            # Releases the row locks
+            db.session.commit()
+            if len(emails) < batch_size:
+                return emails_sent
+
+    @staticmethod
+    def _send_batch(emails: list) -> int:
+        """Sends the emails, sent emails are removed from the outbox"""
+        if current_app.config["LOG_LEVEL"] == "DEBUG":
+            for email in emails:
+                msg = SMTPService._build_message(
+                    email.to_address,
+                    email.subject,
+                    email.html_message,
+                    email.text_message,
+                )
+                current_app.logger.debug(msg.as_string())
+                db.session.delete(email)
+            return len(emails)
+
+        rate_limit = current_app.config["MAIL_OUTBOX_RATE_LIMIT"]
+        send_interval = 1 / rate_limit if rate_limit else 0
+        emails_sent = 0
+        pending = list(emails)
+        try:
+            with mail.connect() as connection:
+                while pending:
+                    email = pending.pop(0)
+                    started = time.monotonic()
+                    try:
+                        connection.send(
+                            SMTPService._build_message(
+                                email.to_address,
+                                email.subject,
+                                email.html_message,
+                                email.text_message,
+                            )
+                        )
+                    except Exception as e:
+                        current_app.logger.error(
+                            f"{e}: Sending email failed. Please check SMTP configuration"
+                        )
+                        email.record_failure(str(e))
+                        continue
+                    db.session.delete(email)
+                    emails_sent += 1
+                    # Rate limit
+                    time.sleep(max(send_interval - (time.monotonic() - started), 0))
+        except Exception as e:
+            # ERROR level logs are automatically captured by sentry so that admins are notified
+            current_app.logger.error(
+                f"{e}: Connecting to the SMTP server failed. Please check SMTP configuration"
+            )
+            for email in pending:
+                email.record_failure(str(e))
+        return emails_sent
+
     @staticmethod
     def _send_message(
         to_address: str, subject: str, html_message: str, text_message: str = None
     ):
         """Helper sends SMTP message"""
-        from_address = current_app.config["MAIL_DEFAULT_SENDER"]
-        if from_address is None:
-            raise ValueError("Missing TM_EMAIL_FROM_ADDRESS environment variable")
-        msg = Message()
-        msg.subject = subject
-        msg.sender = "{} Tasking Manager <{}>".format(
-            current_app.config["ORG_CODE"], from_address
+        msg = SMTPService._build_message(
+            to_address, subject, html_message, text_message
         )
-        msg.add_recipient(to_address)
-
-        msg.body = text_message
-        msg.html = html_message
 
         current_app.logger.debug(f"Sending email via SMTP {to_address}")
         if current_app.config["LOG_LEVEL"] == "DEBUG":
@@ -206,6 +280,24 @@ class SMTPService:
                     f"{e}: Sending email failed. Please check SMTP configuration"
                 )
 
+    @staticmethod
+    def _build_message(
+        to_address: str, subject: str, html_message: str, text_message: str = None
+    ) -> Message:
+        from_address = current_app.config["MAIL_DEFAULT_SENDER"]
+        if from_address is None:
+            raise ValueError("Missing TM_EMAIL_FROM_ADDRESS environment variable")
+        msg = Message()
+        msg.subject = subject
+        msg.sender = "{} Tasking Manager <{}>".format(
+            current_app.config["ORG_CODE"], from_address
+        )
+        msg.add_recipient(to_address)
+
+        msg.body = text_message
+        msg.html = html_message
+        return msg
+
     @staticmethod
     def _generate_email_verification_url(email_address: str, user_name: str):
         """Generate email verification url with unique token"""
@@ -1,8 +1,89 @@
-from backend.models.postgis.notification import Notification
+import json
+import queue
+import select
+import threading
+import time
+
+from flask import current_app
+
+from backend import db
+from backend.models.postgis.notification import Notification, UNREAD_COUNTERS_CHANNEL
 from backend.exceptions import NotFound
 
+# Seconds between the keep-alive comments sent on idle streams of unread counters
+UNREAD_STREAM_KEEPALIVE = 25
+# Seconds a stream of unread counters stays open, clients reconnect once it closes
+UNREAD_STREAM_DURATION = 600
+# Seconds waited before listening again after losing the listening connection
+UNREAD_LISTEN_RETRY_DELAY = 5
+
+
+class UnreadCountersListener:
+    """
+    Listens to the unread counters published by PostgreSQL on a single connection per worker
+    and dispatches them to the streams of the users
+    """
+
+    def __init__(self, engine, logger):
+        self.engine = engine
+        self.logger = logger
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def subscribe(self, user_id: int) -> queue.Queue:
+        """Returns a queue receiving the unread counts of the user, starts listening if needed"""
+        user_queue = queue.Queue()
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add(user_queue)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._listen, daemon=True)
+                self.thread.start()
+        return user_queue
+
+    def unsubscribe(self, user_id: int, user_queue: queue.Queue):
+        with self.lock:
+            user_queues = self.subscribers.get(user_id, set())
+            user_queues.discard(user_queue)
+            if not user_queues:
+                self.subscribers.pop(user_id, None)
+
+    def dispatch(self, payload: str):
+        counters = json.loads(payload)
+        with self.lock:
+            user_queues = list(self.subscribers.get(counters["userId"], ()))
+        for user_queue in user_queues:
+            user_queue.put(counters["unread"])
+
+    def _listen(self):
+        while True:
+            try:
+                self._listen_on_connection()
+            except Exception as e:
+                self.logger.error(f"Stopped listening to unread counters: {e}")
+                time.sleep(UNREAD_LISTEN_RETRY_DELAY)
+
+    def _listen_on_connection(self):
+        # The connection is kept out of the pool as it stays in autocommit mode
+        connection = self.engine.raw_connection()
+        connection.detach()
+        try:
+            dbapi_connection = connection.dbapi_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {UNREAD_COUNTERS_CHANNEL}")
+            while True:
+                select.select([dbapi_connection], [], [], UNREAD_STREAM_KEEPALIVE)
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    self.dispatch(dbapi_connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
 
 class NotificationService:
+    unread_counters_listener = None
+
     @staticmethod
     def update(user_id: int):
         notifications = Notification.query.filter(
@@ -18,3 +99,53 @@ class NotificationService:
     @staticmethod
     def get_unread_message_count(user_id: int):
         return Notification.get_unread_message_count(user_id)
+
+    @staticmethod
+    def get_unread_counters_listener() -> UnreadCountersListener:
+        if NotificationService.unread_counters_listener is None:
+            NotificationService.unread_counters_listener = UnreadCountersListener(
+                db.engine, current_app.logger
+            )
+        return NotificationService.unread_counters_listener
+
+    @staticmethod
+    def stream_unread_counters(user_id: int):
+        """
+        Streams the unread counts of the user as server-sent events, starting with the current
+        count and followed by its changes as they are committed. Nothing is queried once the
+        stream has started
+        """
+        listener = NotificationService.get_unread_counters_listener()
+        # Subscribed first so changes made while reading the current count aren't missed
+        user_queue = listener.subscribe(user_id)
+        try:
+            unread = Notification.get_unread_message_count(user_id)
+        except Exception:
+            listener.unsubscribe(user_id, user_queue)
+            raise
+        return NotificationService._stream_unread_events(
+            listener, user_id, user_queue, unread
+        )
+
+    @staticmethod
+    def _stream_unread_events(
+        listener: UnreadCountersListener, user_id: int, user_queue, unread: int
+    ):
+        try:
+            yield NotificationService._get_unread_event(unread)
+            closes_at = time.monotonic() + UNREAD_STREAM_DURATION
+            while time.monotonic() < closes_at:
+                try:
+                    unread = user_queue.get(timeout=UNREAD_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield NotificationService._get_unread_event(unread)
+        finally:
+            listener.unsubscribe(user_id, user_queue)
+
+    @staticmethod
+    def _get_unread_event(unread: int) -> bytes:
+        """Server-sent event with the same data as the count-unread endpoint"""
+        data = json.dumps(dict(newMessages=unread > 0, unread=unread))
+        return f"data: {data}\n\n".encode()
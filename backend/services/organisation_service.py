@@ -24,6 +24,7 @@ from backend.models.postgis.project import Project, ProjectInfo
 from backend.models.postgis.task import Task
 from backend.models.postgis.team import TeamVisibility
 from backend.models.postgis.statuses import ProjectStatus, TaskStatus
+from backend.services.cache_service import CacheService
 from backend.services.users.user_service import UserService
 
 
@@ -205,66 +206,78 @@ class OrganisationService:
         return projects
 
     @staticmethod
+    @CacheService.cached(
+        "organisation_stats",
+        ttl=300,
+        key=lambda organisation_id, year=None: [
+            organisation_id,
+            int(year) if year else None,
+        ],
+        tags=lambda organisation_id, year=None: [
+            f"organisation_stats:{organisation_id}"
+        ],
+    )
     def get_organisation_stats(
         organisation_id: int, year: int = None
     ) -> OrganizationStatsDTO:
-        projects = db.session.query(
-            Project.id, Project.status, Project.last_updated, Project.created
-        ).filter(Project.organisation_id == organisation_id)
+        project_filters = [Project.organisation_id == organisation_id]
         if year:
             start_date = f"{year}/01/01"
-            projects = projects.filter(Project.created.between(start_date, func.now()))
-
-        published_projects = projects.filter(
-            Project.status == ProjectStatus.PUBLISHED.value
-        )
-        active_tasks = db.session.query(
-            Task.id, Task.project_id, Task.task_status
-        ).filter(Task.project_id.in_([i.id for i in published_projects.all()]))
+            project_filters.append(Project.created.between(start_date, func.now()))
 
         # populate projects stats
-        projects_dto = OrganizationProjectsStatsDTO()
-        projects_dto.draft = projects.filter(
-            Project.status == ProjectStatus.DRAFT.value
-        ).count()
-        projects_dto.published = published_projects.count()
-        projects_dto.archived = projects.filter(
-            Project.status == ProjectStatus.ARCHIVED.value
-        ).count()
-        projects_dto.recent = projects.filter(
-            Project.status.in_(
-                [ProjectStatus.ARCHIVED.value, ProjectStatus.PUBLISHED.value]
-            ),
-            extract("year", Project.created) == datetime.now().year,
-        ).count()
-        projects_dto.stale = projects.filter(
-            Project.status == ProjectStatus.PUBLISHED.value,
-            func.DATE(Project.last_updated) < datetime.now() + relativedelta(months=-6),
-        ).count()
-
-        # populate tasks stats
+        projects = (
+            db.session.query(
+                func.count()
+                .filter(Project.status == ProjectStatus.DRAFT.value)
+                .label("draft"),
+                func.count()
+                .filter(Project.status == ProjectStatus.PUBLISHED.value)
+                .label("published"),
+                func.count()
+                .filter(Project.status == ProjectStatus.ARCHIVED.value)
+                .label("archived"),
+                func.count()
+                .filter(
+                    Project.status.in_(
+                        [ProjectStatus.ARCHIVED.value, ProjectStatus.PUBLISHED.value]
+                    ),
+                    extract("year", Project.created) == datetime.now().year,
+                )
+                .label("recent"),
+                func.count()
+                .filter(
+                    Project.status == ProjectStatus.PUBLISHED.value,
+                    func.DATE(Project.last_updated)
+                    < datetime.now() + relativedelta(months=-6),
+                )
+                .label("stale"),
+            )
+            .filter(*project_filters)
+            .one()
+        )
+        projects_dto = OrganizationProjectsStatsDTO(projects._asdict())
+
+        # populate tasks stats of the published projects
+        tasks_by_status = dict(
+            db.session.query(Task.task_status, func.count())
+            .join(Project, Project.id == Task.project_id)
+            .filter(Project.status == ProjectStatus.PUBLISHED.value, *project_filters)
+            .group_by(Task.task_status)
+            .all()
+        )
         tasks_dto = OrganizationTasksStatsDTO()
-        tasks_dto.ready = active_tasks.filter(
-            Task.task_status == TaskStatus.READY.value
-        ).count()
-        tasks_dto.locked_for_mapping = active_tasks.filter(
-            Task.task_status == TaskStatus.LOCKED_FOR_MAPPING.value
-        ).count()
-        tasks_dto.mapped = active_tasks.filter(
-            Task.task_status == TaskStatus.MAPPED.value
-        ).count()
-        tasks_dto.locked_for_validation = active_tasks.filter(
-            Task.task_status == TaskStatus.LOCKED_FOR_VALIDATION.value
-        ).count()
-        tasks_dto.validated = active_tasks.filter(
-            Task.task_status == TaskStatus.VALIDATED.value
-        ).count()
-        tasks_dto.invalidated = active_tasks.filter(
-            Task.task_status == TaskStatus.INVALIDATED.value
-        ).count()
-        tasks_dto.badimagery = active_tasks.filter(
-            Task.task_status == TaskStatus.BADIMAGERY.value
-        ).count()
+        tasks_dto.ready = tasks_by_status.get(TaskStatus.READY.value, 0)
+        tasks_dto.locked_for_mapping = tasks_by_status.get(
+            TaskStatus.LOCKED_FOR_MAPPING.value, 0
+        )
+        tasks_dto.mapped = tasks_by_status.get(TaskStatus.MAPPED.value, 0)
+        tasks_dto.locked_for_validation = tasks_by_status.get(
+            TaskStatus.LOCKED_FOR_VALIDATION.value, 0
+        )
+        tasks_dto.validated = tasks_by_status.get(TaskStatus.VALIDATED.value, 0)
+        tasks_dto.invalidated = tasks_by_status.get(TaskStatus.INVALIDATED.value, 0)
+        tasks_dto.badimagery = tasks_by_status.get(TaskStatus.BADIMAGERY.value, 0)
 
         # populate and return main dto
         stats_dto = OrganizationStatsDTO()
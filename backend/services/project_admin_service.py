@@ -1,6 +1,4 @@
-import json
 import threading
-import geojson
 from flask import current_app
 
 from backend.exceptions import NotFound
@@ -14,7 +12,8 @@ from backend.models.postgis.project import Project, Task, ProjectStatus
 from backend.models.postgis.statuses import TaskCreationMode, TeamRoles
 from backend.models.postgis.task import TaskHistory, TaskStatus, TaskAction
 from backend.models.postgis.user import User
-from backend.models.postgis.utils import InvalidData, InvalidGeoJson
+from backend.models.postgis.utils import InvalidGeoJson
+from backend.services.cache_service import CacheService
 from backend.services.grid.grid_service import GridService
 from backend.services.license_service import LicenseService
 from backend.services.messaging.message_service import MessageService
@@ -94,6 +93,7 @@ class ProjectAdminService:
 
         draft_project.set_default_changeset_comment()
         draft_project.set_country_info()
+        CacheService.invalidate(f"organisation_stats:{draft_project.organisation_id}")
         return draft_project.id
 
     @staticmethod
@@ -135,7 +135,14 @@ class ProjectAdminService:
             authenticated_user_id, project_id
         ):
             project = ProjectAdminService._get_project_by_id(project_id)
+            previous_organisation_id = project.organisation_id
             project.update(project_dto)
+            CacheService.invalidate(
+                f"project:{project_id}",
+                "project_search",
+                f"organisation_stats:{previous_organisation_id}",
+                f"organisation_stats:{project.organisation_id}",
+            )
         else:
             raise ValueError(
                 str(project_id)
@@ -167,7 +174,13 @@ class ProjectAdminService:
 
         if is_admin or is_org_manager:
             if project.can_be_deleted():
+                organisation_id = project.organisation_id
                 project.delete()
+                CacheService.invalidate(
+                    f"project:{project_id}",
+                    "project_search",
+                    f"organisation_stats:{organisation_id}",
+                )
             else:
                 raise ProjectAdminServiceError(
                     "HasMappedTasks- Project has mapped tasks, cannot be deleted"
@@ -197,6 +210,7 @@ class ProjectAdminService:
         project.tasks_validated = 0
         project.tasks_bad_imagery = 0
         project.save()
+        CacheService.invalidate(f"project:{project_id}")
 
     @staticmethod
     def get_all_comments(project_id: int) -> ProjectCommentsDTO:
@@ -211,35 +225,26 @@ class ProjectAdminService:
     @staticmethod
     def _attach_tasks_to_project(draft_project: Project, tasks_geojson):
         """
-        Validates then iterates over the array of tasks and attach them to the draft project
+        Validates the feature collection of tasks then inserts its tasks in batches, validating
+        each feature as it goes
         :param draft_project: Draft project in scope
         :param tasks_geojson: GeoJSON feature collection of mapping tasks
         :raises InvalidGeoJson, InvalidData
         """
-        tasks = geojson.loads(json.dumps(tasks_geojson))
-
-        if type(tasks) is not geojson.FeatureCollection:
+        if (
+            not isinstance(tasks_geojson, dict)
+            or tasks_geojson.get("type") != "FeatureCollection"
+        ):
             raise InvalidGeoJson(
                 "MustBeFeatureCollection- Invalid: GeoJson must be FeatureCollection"
             )
 
-        if not tasks.is_valid:
+        if not isinstance(tasks_geojson.get("features"), list):
             raise InvalidGeoJson(
-                "InvalidFeatureCollection - " + ", ".join(tasks.errors())
+                "InvalidFeatureCollection - Feature collection must have a list of features"
             )
 
-        task_count = 1
-        for feature in tasks["features"]:
-            try:
-                task = Task.from_geojson_feature(task_count, feature)
-            except (InvalidData, InvalidGeoJson) as e:
-                raise e
-
-            draft_project.tasks.append(task)
-            task_count += 1
-
-        task_count -= 1  # Remove last increment before falling out loop
-        draft_project.total_tasks = task_count
+        draft_project.create_tasks(tasks_geojson["features"])
 
     @staticmethod
     def _validate_default_locale(default_locale, project_info_locales):
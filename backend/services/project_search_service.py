@@ -1,10 +1,10 @@
 from flask import current_app
 import math
+from typing import List
 import geojson
 from geoalchemy2 import shape
-from sqlalchemy import func, distinct, desc, or_, and_
+from sqlalchemy import func, desc, or_, and_
 from shapely.geometry import Polygon, box
-from cachetools import TTLCache, cached
 
 from backend import db
 from backend.exceptions import NotFound
@@ -30,7 +30,6 @@ from backend.models.postgis.statuses import (
 )
 from backend.models.postgis.campaign import Campaign
 from backend.models.postgis.organisation import Organisation
-from backend.models.postgis.task import TaskHistory
 from backend.models.postgis.utils import (
     ST_Intersects,
     ST_MakeEnvelope,
@@ -39,10 +38,9 @@ from backend.models.postgis.utils import (
 )
 from backend.models.postgis.interests import project_interests
 from backend.services.users.user_service import UserService
+from backend.services.cache_service import CacheService
 
 
-search_cache = TTLCache(maxsize=128, ttl=300)
-
 # max area allowed for passed in bbox, calculation shown to help future maintenance
 # client resolution (mpp)* arbitrary large map size on a large screen in pixels * 50% buffer, all squared
 MAX_AREA = math.pow(1250 * 4275 * 1.5, 2)
@@ -117,62 +115,65 @@ class ProjectSearchService:
         return query
 
     @staticmethod
-    def create_result_dto(project, preferred_locale, total_contributors):
-        project_info_dto = ProjectInfo.get_dto_for_locale(
-            project.id, preferred_locale, project.default_locale
-        )
-        project_obj = Project.get(project.id)
-        list_dto = ListSearchResultDTO()
-        list_dto.project_id = project.id
-        list_dto.locale = project_info_dto.locale
-        list_dto.name = project_info_dto.name
-        list_dto.priority = ProjectPriority(project.priority).name
-        list_dto.database = project.database
-        list_dto.difficulty = ProjectDifficulty(project.difficulty).name
-        list_dto.short_description = project_info_dto.short_description
-        list_dto.last_updated = project.last_updated
-        list_dto.due_date = project.due_date
-        list_dto.percent_mapped = project_obj.calculate_tasks_percent(
-            "mapped",
-        )
-        list_dto.percent_validated = project_obj.calculate_tasks_percent(
-            "validated",
+    def create_result_dtos(projects, preferred_locale) -> List[ListSearchResultDTO]:
+        """
+        Creates the result DTOs for a page of projects. Locale info, campaigns, contributor and
+        active mapper counts are loaded for all projects at once, so the number of queries does
+        not grow with the number of projects
+        :param projects: rows returned by a query built with create_search_query
+        :param preferred_locale: locale requested by user
+        """
+        if not projects:
+            return []
+
+        project_ids = [project.id for project in projects]
+        project_infos = ProjectInfo.get_dtos_for_locale(
+            {project.id: project.default_locale for project in projects},
+            preferred_locale,
         )
-        list_dto.status = ProjectStatus(project.status).name
-        list_dto.active_mappers = Project.get_active_mappers(project.id)
-        list_dto.total_contributors = total_contributors
-        list_dto.country = project.country
-        list_dto.organisation_name = project.organisation_name
-        list_dto.organisation_logo = project.organisation_logo
-        list_dto.campaigns = Project.get_project_campaigns(project.id)
-
-        return list_dto
-
-    @staticmethod
-    def get_total_contributions(paginated_results):
-        paginated_projects_ids = [p.id for p in paginated_results]
-
-        # We need to make a join to return projects without contributors.
-        project_contributors_count = (
-            Project.query.with_entities(
-                Project.id, func.count(distinct(TaskHistory.user_id)).label("total")
-            )
-            .filter(Project.id.in_(paginated_projects_ids))
-            .outerjoin(
-                TaskHistory,
-                and_(
-                    TaskHistory.project_id == Project.id,
-                    TaskHistory.action != "COMMENT",
-                ),
+        campaigns = Project.get_projects_campaigns(project_ids)
+        total_contributors = Project.get_projects_total_contributions(project_ids)
+        active_mappers = Project.get_active_mappers_by_project(project_ids)
+
+        results = []
+        for project in projects:
+            project_info_dto = project_infos[project.id]
+            list_dto = ListSearchResultDTO()
+            list_dto.project_id = project.id
+            list_dto.locale = project_info_dto.locale
+            list_dto.name = project_info_dto.name
+            list_dto.priority = ProjectPriority(project.priority).name
+            list_dto.database = project.database
+            list_dto.difficulty = ProjectDifficulty(project.difficulty).name
+            list_dto.short_description = project_info_dto.short_description
+            list_dto.last_updated = project.last_updated
+            list_dto.due_date = project.due_date
+            # Search rows carry the task counters, so the percentages need no extra lookup
+            list_dto.percent_mapped = Project.calculate_tasks_percent(project, "mapped")
+            list_dto.percent_validated = Project.calculate_tasks_percent(
+                project, "validated"
             )
-            .group_by(Project.id)
-            .all()
-        )
+            list_dto.status = ProjectStatus(project.status).name
+            list_dto.active_mappers = active_mappers.get(project.id, 0)
+            list_dto.total_contributors = total_contributors.get(project.id, 0)
+            list_dto.country = project.country
+            list_dto.organisation_name = project.organisation_name
+            list_dto.organisation_logo = project.organisation_logo
+            list_dto.campaigns = campaigns[project.id]
+            results.append(list_dto)
 
-        return [p.total for p in project_contributors_count]
+        return results
 
     @staticmethod
-    @cached(search_cache)
+    @CacheService.cached(
+        "project_search",
+        ttl=300,
+        key=lambda search_dto, user: [
+            search_dto.to_primitive(),
+            user.id if user else None,
+        ],
+        tags=lambda search_dto, user: ["project_search"],
+    )
     def search_projects(search_dto: ProjectSearchDTO, user) -> ProjectSearchResultsDTO:
         """Searches all projects for matches to the criteria provided by the user"""
         all_results, paginated_results = ProjectSearchService._filter_projects(
@@ -182,14 +183,9 @@ class ProjectSearchService:
             raise NotFound(sub_code="PROJECTS_NOT_FOUND")
 
         dto = ProjectSearchResultsDTO()
-        dto.results = [
-            ProjectSearchService.create_result_dto(
-                p,
-                search_dto.preferred_locale,
-                Project.get_project_total_contributions(p[0]),
-            )
-            for p in paginated_results.items
-        ]
+        dto.results = ProjectSearchService.create_result_dtos(
+            paginated_results.items, search_dto.preferred_locale
+        )
         dto.pagination = Pagination(paginated_results)
         if search_dto.omit_map_results:
             return dto
@@ -1,9 +1,11 @@
 import threading
-from cachetools import TTLCache, cached
+from itertools import groupby
+from operator import itemgetter
 from flask import current_app
 import geojson
 from datetime import datetime, timedelta
 
+from backend import db
 from backend.exceptions import NotFound
 
 from backend.models.dtos.mapping_dto import TaskDTOs
@@ -28,6 +30,7 @@ from backend.models.postgis.statuses import (
     TeamRoles,
     EncouragingEmailType,
     MappingLevel,
+    UserRole,
 )
 from backend.models.postgis.task import Task, TaskHistory
 from backend.services.messaging.smtp_service import SMTPService
@@ -35,10 +38,13 @@ from backend.services.users.user_service import UserService
 from backend.services.project_search_service import ProjectSearchService
 from backend.services.project_admin_service import ProjectAdminService
 from backend.services.team_service import TeamService
-from sqlalchemy import func, or_
+from backend.services.cache_service import CacheService
+from sqlalchemy import desc, event, func, or_
+from sqlalchemy.orm import Session
 from sqlalchemy.sql.expression import true
 
-summary_cache = TTLCache(maxsize=1024, ttl=600)
+# Session info key of the permission contexts loaded in the current transaction
+PERMISSION_CONTEXTS_KEY = "project_permission_contexts"
 
 
 class ProjectServiceError(Exception):
@@ -73,10 +79,6 @@ class ProjectService:
 
         return project
 
-    @staticmethod
-    def auto_unlock_tasks(project_id: int):
-        Task.auto_unlock_tasks(project_id)
-
     @staticmethod
     def delete_tasks(project_id: int, tasks_ids):
         # Validate project exists.
@@ -95,11 +97,17 @@ class ProjectService:
         [t["obj"].delete() for t in tasks]
 
     @staticmethod
+    @CacheService.cached(
+        "project_contribs_by_day",
+        ttl=600,
+        tags=lambda project_id: [f"project:{project_id}"],
+    )
     def get_contribs_by_day(project_id: int) -> ProjectContribsDTO:
         # Validate that project exists
         project = ProjectService.get_project_by_id(project_id)
 
-        # Fetch all state change with date and task ID
+        # Fetch all state change with date and task ID, ordered as they are replayed: by day and
+        # within a day validations first, then mappings and invalidations
         stats = (
             TaskHistory.query.with_entities(
                 TaskHistory.action_text.label("action_text"),
@@ -116,83 +124,67 @@ class ProjectService:
                 ),
             )
             .group_by("action_text", "day", "task_id")
-            .order_by("day")
+            .order_by("day", desc("action_text"), desc("task_id"))
         ).all()
 
         contribs_dto = ProjectContribsDTO()
-        # Filter and store unique dates
-        dates = list(set(r[1] for r in stats))
-        dates.sort(
-            reverse=False
-        )  # Why was this reversed? To have the dates in ascending order
-        dates_list = []
-        cumulative_mapped = 0
-        cumulative_validated = 0
-        # A hashmap to track task state change updates
-        tasks = {
-            "MAPPED": {"total": 0},
-            "VALIDATED": {"total": 0},
-            "INVALIDATED": {"total": 0},
-        }
-
-        for date in dates:
-            dto = ProjectContribDTO(
-                {
-                    "date": date,
-                    "mapped": 0,
-                    "validated": 0,
-                    "total_tasks": project.total_tasks,
-                }
-            )
-            # s -> ('LOCKED_FOR_MAPPING', datetime.date(2019, 4, 23), 1)
-            # s[0] -> action, s[1] -> date, s[2] -> task_id
-            values = [(s[0], s[2]) for s in stats if date == s[1]]
-            values.sort(reverse=True)  # Most recent action comes first
-            for val in values:
-                task_id = val[1]
-                task_status = val[0]
+        contribs_dto.stats = ProjectService._get_contribs_timeline(
+            stats, project.total_tasks
+        )
+        return contribs_dto
 
+    @staticmethod
+    def _get_contribs_timeline(stats, total_tasks: int) -> list:
+        """
+        Replays the state changes in a single pass
+        :param stats: (action_text, day, task_id) rows ordered by day, action_text desc, task_id desc
+        :return: one ProjectContribDTO per day
+        """
+        # Tasks currently counted in each state
+        mapped = set()
+        validated = set()
+        invalidated = set()
+
+        dates_list = []
+        for date, day_stats in groupby(stats, key=itemgetter(1)):
+            day_mapped = 0
+            day_validated = 0
+            for task_status, _, task_id in day_stats:
                 if task_status == "MAPPED":
-                    if task_id not in tasks["MAPPED"]:
-                        tasks["MAPPED"][task_id] = 1
-                        tasks["MAPPED"]["total"] += 1
-                        dto.mapped += 1
+                    if task_id not in mapped:
+                        mapped.add(task_id)
+                        day_mapped += 1
                 elif task_status == "VALIDATED":
-                    if task_id not in tasks["VALIDATED"]:
-                        tasks["VALIDATED"][task_id] = 1
-                        tasks["VALIDATED"]["total"] += 1
-                        dto.validated += 1
-                        if task_id in tasks["INVALIDATED"]:
-                            del tasks["INVALIDATED"][task_id]
-                            tasks["INVALIDATED"]["total"] -= 1
-                        if task_id not in tasks["MAPPED"]:
-                            tasks["MAPPED"][task_id] = 1
-                            tasks["MAPPED"]["total"] += 1
-                            dto.mapped += 1
-                else:
-                    if task_id not in tasks["INVALIDATED"]:
-                        tasks["INVALIDATED"][task_id] = 1
-                        tasks["INVALIDATED"]["total"] += 1
-                        if task_id in tasks["MAPPED"]:
-                            del tasks["MAPPED"][task_id]
-                            tasks["MAPPED"]["total"] -= 1
-                            if dto.mapped > 0:
-                                dto.mapped -= 1
-                        if task_id in tasks["VALIDATED"]:
-                            del tasks["VALIDATED"][task_id]
-                            tasks["VALIDATED"]["total"] -= 1
-                            if dto.validated > 0:
-                                dto.validated -= 1
-
-                cumulative_mapped = tasks["MAPPED"]["total"]
-                cumulative_validated = tasks["VALIDATED"]["total"]
-                dto.cumulative_mapped = cumulative_mapped
-                dto.cumulative_validated = cumulative_validated
-            dates_list.append(dto)
-
-        contribs_dto.stats = dates_list
+                    if task_id not in validated:
+                        validated.add(task_id)
+                        day_validated += 1
+                        invalidated.discard(task_id)
+                        if task_id not in mapped:
+                            mapped.add(task_id)
+                            day_mapped += 1
+                elif task_id not in invalidated:
+                    invalidated.add(task_id)
+                    if task_id in mapped:
+                        mapped.remove(task_id)
+                        day_mapped = max(day_mapped - 1, 0)
+                    if task_id in validated:
+                        validated.remove(task_id)
+                        day_validated = max(day_validated - 1, 0)
+
+            dates_list.append(
+                ProjectContribDTO(
+                    {
+                        "date": date,
+                        "mapped": day_mapped,
+                        "validated": day_validated,
+                        "cumulative_mapped": len(mapped),
+                        "cumulative_validated": len(validated),
+                        "total_tasks": total_tasks,
+                    }
+                )
+            )
 
-        return contribs_dto
+        return dates_list
 
     @staticmethod
     def get_project_dto_for_mapper(
@@ -269,6 +261,27 @@ class ProjectService:
         project = ProjectService.get_project_by_id(project_id)
         return project.tasks_as_geojson(task_ids_str, order_by, order_by_type, status)
 
+    @staticmethod
+    def stream_project_tasks(
+        project_id,
+        task_ids_str: str,
+        order_by: str = None,
+        order_by_type: str = "ASC",
+        status: int = None,
+    ):
+        """Gets the project tasks as a generator of GeoJSON text chunks"""
+        ProjectService.exists(project_id)
+        return Task.stream_tasks_as_geojson_feature_collection(
+            project_id, task_ids_str, order_by, order_by_type, status
+        )
+
+    @staticmethod
+    @CacheService.cached("project_tasks_tile", ttl=600, tags=Task.get_tile_tags)
+    def get_project_tasks_tile(project_id: int, zoom: int, x: int, y: int) -> bytes:
+        """Gets the project tasks in the tile as a Mapbox Vector Tile"""
+        ProjectService.exists(project_id)
+        return Task.get_tasks_as_mvt(project_id, zoom, x, y)
+
     @staticmethod
     def get_project_aoi(project_id):
         project = ProjectService.get_project_by_id(project_id)
@@ -316,16 +329,47 @@ class ProjectService:
         )
 
     @staticmethod
-    def evaluate_mapping_permission(
-        project_id: int, user_id: int, mapping_permission: int
-    ):
+    def get_permission_context(project_id: int, user_id: int):
+        """
+        Gets the project and user attributes deciding if the user can map or validate, loaded
+        once per transaction
+        :raises NotFound
+        """
+        permission_contexts = db.session.info.setdefault(PERMISSION_CONTEXTS_KEY, {})
+        if (project_id, user_id) not in permission_contexts:
+            context = Project.get_permission_context(project_id, user_id)
+            if context is None:
+                raise NotFound(sub_code="PROJECT_NOT_FOUND", project_id=project_id)
+            if context.user_role is None:
+                raise NotFound(sub_code="USER_NOT_FOUND", user_id=user_id)
+            permission_contexts[(project_id, user_id)] = context
+        return permission_contexts[(project_id, user_id)]
+
+    @staticmethod
+    def _is_manager_permission(context, user_id: int) -> bool:
+        """Same rules as ProjectAdminService.is_user_action_permitted_on_project"""
+        if context.user_role == UserRole.ADMIN.value or context.author_id == user_id:
+            return True
+        if not context.organisation_id:
+            return False
+        return context.is_org_manager or ProjectService._is_team_member(
+            context, [TeamRoles.PROJECT_MANAGER.value]
+        )
+
+    @staticmethod
+    def _is_team_member(context, allowed_roles: list) -> bool:
+        return any(role in allowed_roles for role in context.team_roles or [])
+
+    @staticmethod
+    def evaluate_mapping_permission(context, mapping_permission: int):
         allowed_roles = [
             TeamRoles.MAPPER.value,
             TeamRoles.VALIDATOR.value,
             TeamRoles.PROJECT_MANAGER.value,
         ]
-        is_team_member = TeamService.check_team_membership(
-            project_id, allowed_roles, user_id
+        is_team_member = ProjectService._is_team_member(context, allowed_roles)
+        is_intermediate_or_advanced = ProjectService._is_user_intermediate_or_advanced(
+            context.mapping_level
         )
 
         # mapping_permission = 1(level),2(teams),3(teamsAndLevel)
@@ -334,11 +378,11 @@ class ProjectService:
                 return False, MappingNotAllowed.USER_NOT_TEAM_MEMBER
 
         elif mapping_permission == MappingPermission.LEVEL.value:
-            if not ProjectService._is_user_intermediate_or_advanced(user_id):
+            if not is_intermediate_or_advanced:
                 return False, MappingNotAllowed.USER_NOT_CORRECT_MAPPING_LEVEL
 
         elif mapping_permission == MappingPermission.TEAMS_LEVEL.value:
-            if not ProjectService._is_user_intermediate_or_advanced(user_id):
+            if not is_intermediate_or_advanced:
                 return False, MappingNotAllowed.USER_NOT_CORRECT_MAPPING_LEVEL
             if not is_team_member:
                 return False, MappingNotAllowed.USER_NOT_TEAM_MEMBER
@@ -346,24 +390,20 @@ class ProjectService:
     @staticmethod
     def is_user_permitted_to_map(project_id: int, user_id: int):
         """Check if the user is allowed to map the on the project in scope"""
-        if UserService.is_user_blocked(user_id):
+        context = ProjectService.get_permission_context(project_id, user_id)
+        if context.user_role == UserRole.READ_ONLY.value:
             return False, MappingNotAllowed.USER_NOT_ON_ALLOWED_LIST
 
-        project = ProjectService.get_project_by_id(project_id)
-        if project.license_id:
-            if not UserService.has_user_accepted_license(user_id, project.license_id):
-                return False, MappingNotAllowed.USER_NOT_ACCEPTED_LICENSE
-        mapping_permission = project.mapping_permission
+        if context.license_id and not context.license_accepted:
+            return False, MappingNotAllowed.USER_NOT_ACCEPTED_LICENSE
+        mapping_permission = context.mapping_permission
 
-        is_manager_permission = (
-            False  # is_admin or is_author or is_org_manager or is_manager_team
-        )
-        if ProjectAdminService.is_user_action_permitted_on_project(user_id, project_id):
-            is_manager_permission = True
+        # is_admin or is_author or is_org_manager or is_manager_team
+        is_manager_permission = ProjectService._is_manager_permission(context, user_id)
 
         # Draft (public/private) accessible only for is_manager_permission
         if (
-            ProjectStatus(project.status) == ProjectStatus.DRAFT
+            ProjectStatus(context.status) == ProjectStatus.DRAFT
             and not is_manager_permission
         ):
             return False, MappingNotAllowed.PROJECT_NOT_PUBLISHED
@@ -371,25 +411,22 @@ class ProjectService:
         is_restriction = None
         if not is_manager_permission and mapping_permission:
             is_restriction = ProjectService.evaluate_mapping_permission(
-                project_id, user_id, mapping_permission
+                context, mapping_permission
             )
 
-        tasks = Task.get_locked_tasks_for_user(user_id)
-        if len(tasks.locked_tasks) > 0:
+        if Task.user_has_locked_tasks(user_id):
             return False, MappingNotAllowed.USER_ALREADY_HAS_TASK_LOCKED
 
         is_allowed_user = None
-        if project.private and not is_manager_permission:
+        if context.private and not is_manager_permission:
             # Check if user is in allowed user list
-            is_allowed_user = ProjectService.is_user_in_the_allowed_list(
-                project.allowed_users, user_id
-            )
+            is_allowed_user = context.is_allowed_user
             if is_allowed_user:
                 return True, "User allowed to map"
 
         if not is_manager_permission and is_restriction:
             return is_restriction
-        elif project.private and not (
+        elif context.private and not (
             is_manager_permission or is_allowed_user or not is_restriction
         ):
             return False, MappingNotAllowed.USER_NOT_ON_ALLOWED_LIST
@@ -397,21 +434,22 @@ class ProjectService:
         return True, "User allowed to map"
 
     @staticmethod
-    def _is_user_intermediate_or_advanced(user_id):
+    def _is_user_intermediate_or_advanced(mapping_level: int):
         """Helper method to determine if user level is not beginner"""
-        user_mapping_level = UserService.get_mapping_level(user_id)
-        if user_mapping_level not in [MappingLevel.INTERMEDIATE, MappingLevel.ADVANCED]:
+        if MappingLevel(mapping_level) not in [
+            MappingLevel.INTERMEDIATE,
+            MappingLevel.ADVANCED,
+        ]:
             return False
 
         return True
 
     @staticmethod
-    def evaluate_validation_permission(
-        project_id: int, user_id: int, validation_permission: int
-    ):
+    def evaluate_validation_permission(context, validation_permission: int):
         allowed_roles = [TeamRoles.VALIDATOR.value, TeamRoles.PROJECT_MANAGER.value]
-        is_team_member = TeamService.check_team_membership(
-            project_id, allowed_roles, user_id
+        is_team_member = ProjectService._is_team_member(context, allowed_roles)
+        is_intermediate_or_advanced = ProjectService._is_user_intermediate_or_advanced(
+            context.mapping_level
         )
         # validation_permission = 1(level),2(teams),3(teamsAndLevel)
         if validation_permission == ValidationPermission.TEAMS.value:
@@ -419,11 +457,11 @@ class ProjectService:
                 return False, ValidatingNotAllowed.USER_NOT_TEAM_MEMBER
 
         elif validation_permission == ValidationPermission.LEVEL.value:
-            if not ProjectService._is_user_intermediate_or_advanced(user_id):
+            if not is_intermediate_or_advanced:
                 return False, ValidatingNotAllowed.USER_IS_BEGINNER
 
         elif validation_permission == ValidationPermission.TEAMS_LEVEL.value:
-            if not ProjectService._is_user_intermediate_or_advanced(user_id):
+            if not is_intermediate_or_advanced:
                 return False, ValidatingNotAllowed.USER_IS_BEGINNER
             if not is_team_member:
                 return False, ValidatingNotAllowed.USER_NOT_TEAM_MEMBER
@@ -431,23 +469,20 @@ class ProjectService:
     @staticmethod
     def is_user_permitted_to_validate(project_id, user_id):
         """Check if the user is allowed to validate on the project in scope"""
-        if UserService.is_user_blocked(user_id):
+        context = ProjectService.get_permission_context(project_id, user_id)
+        if context.user_role == UserRole.READ_ONLY.value:
             return False, ValidatingNotAllowed.USER_NOT_ON_ALLOWED_LIST
 
-        project = ProjectService.get_project_by_id(project_id)
-        if project.license_id:
-            if not UserService.has_user_accepted_license(user_id, project.license_id):
-                return False, ValidatingNotAllowed.USER_NOT_ACCEPTED_LICENSE
-        validation_permission = project.validation_permission
+        if context.license_id and not context.license_accepted:
+            return False, ValidatingNotAllowed.USER_NOT_ACCEPTED_LICENSE
+        validation_permission = context.validation_permission
 
         # is_admin or is_author or is_org_manager or is_manager_team
-        is_manager_permission = False
-        if ProjectAdminService.is_user_action_permitted_on_project(user_id, project_id):
-            is_manager_permission = True
+        is_manager_permission = ProjectService._is_manager_permission(context, user_id)
 
         # Draft (public/private) accessible only for is_manager_permission
         if (
-            ProjectStatus(project.status) == ProjectStatus.DRAFT
+            ProjectStatus(context.status) == ProjectStatus.DRAFT
             and not is_manager_permission
         ):
             return False, ValidatingNotAllowed.PROJECT_NOT_PUBLISHED
@@ -455,26 +490,23 @@ class ProjectService:
         is_restriction = None
         if not is_manager_permission and validation_permission:
             is_restriction = ProjectService.evaluate_validation_permission(
-                project_id, user_id, validation_permission
+                context, validation_permission
             )
 
-        tasks = Task.get_locked_tasks_for_user(user_id)
-        if len(tasks.locked_tasks) > 0:
+        if Task.user_has_locked_tasks(user_id):
             return False, ValidatingNotAllowed.USER_ALREADY_HAS_TASK_LOCKED
 
         is_allowed_user = None
-        if project.private and not is_manager_permission:
+        if context.private and not is_manager_permission:
             # Check if user is in allowed user list
-            is_allowed_user = ProjectService.is_user_in_the_allowed_list(
-                project.allowed_users, user_id
-            )
+            is_allowed_user = context.is_allowed_user
 
             if is_allowed_user:
                 return True, "User allowed to validate"
 
         if not is_manager_permission and is_restriction:
             return is_restriction
-        elif project.private and not (
+        elif context.private and not (
             is_manager_permission or is_allowed_user or not is_restriction
         ):
             return False, ValidatingNotAllowed.USER_NOT_ON_ALLOWED_LIST
@@ -482,7 +514,11 @@ class ProjectService:
         return True, "User allowed to validate"
 
     @staticmethod
-    @cached(summary_cache)
+    @CacheService.cached(
+        "project_summary",
+        ttl=600,
+        tags=lambda project_id, preferred_locale="en": [f"project:{project_id}"],
+    )
     def get_cached_project_summary(
         project_id: int, preferred_locale: str = "en"
     ) -> ProjectSummary:
@@ -524,15 +560,10 @@ class ProjectService:
         query = ProjectSearchService.create_search_query()
         projects = query.filter(Project.featured == true()).group_by(Project.id).all()
 
-        # Get total contributors.
-        contrib_counts = ProjectSearchService.get_total_contributions(projects)
-        zip_items = zip(projects, contrib_counts)
-
         dto = ProjectSearchResultsDTO()
-        dto.results = [
-            ProjectSearchService.create_result_dto(p, preferred_locale, t)
-            for p, t in zip_items
-        ]
+        dto.results = ProjectSearchService.create_result_dtos(
+            projects, preferred_locale
+        )
 
         return dto
 
@@ -559,7 +590,11 @@ class ProjectService:
         return project.get_project_title(preferred_locale)
 
     @staticmethod
-    @cached(TTLCache(maxsize=1024, ttl=600))
+    @CacheService.cached(
+        "project_stats",
+        ttl=600,
+        tags=lambda project_id: [f"project:{project_id}"],
+    )
     def get_project_stats(project_id: int) -> ProjectStatsDTO:
         """Gets the project stats DTO"""
         project = ProjectService.get_project_by_id(project_id)
@@ -661,3 +696,10 @@ class ProjectService:
             )
             features.append(feature)
         return geojson.FeatureCollection(features)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_permission_contexts(session):
+    """Permission contexts may change once the transaction ends"""
+    session.info.pop(PERMISSION_CONTEXTS_KEY, None)
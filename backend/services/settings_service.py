@@ -1,13 +1,11 @@
-from cachetools import TTLCache, cached
 from flask import current_app
 from backend.models.dtos.settings_dto import SupportedLanguage, SettingsDTO
-
-settings_cache = TTLCache(maxsize=4, ttl=300)
+from backend.services.cache_service import CacheService
 
 
 class SettingsService:
     @staticmethod
-    @cached(settings_cache)
+    @CacheService.cached("settings", ttl=300)
     def get_settings():
         """Gets all settings required by the client"""
         settings_dto = SettingsDTO()
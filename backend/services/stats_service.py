@@ -1,6 +1,5 @@
-from cachetools import TTLCache, cached
 from datetime import date, timedelta
-from sqlalchemy import func, desc, cast, extract, or_
+from sqlalchemy import func, desc, cast, extract, or_, update
 from sqlalchemy.sql.functions import coalesce
 from sqlalchemy.types import Time
 
@@ -28,15 +27,29 @@ from backend.models.postgis.campaign import Campaign, campaign_projects
 from backend.models.postgis.organisation import Organisation
 from backend.models.postgis.project import Project
 from backend.models.postgis.statuses import TaskStatus, MappingLevel, UserGender
+from backend.models.postgis.stats_rollup import (
+    DailyTaskStats,
+    ProjectStatsRollup,
+    StatsRollup,
+)
 from backend.models.postgis.task import TaskHistory, User, Task, TaskAction
 from backend.models.postgis.utils import timestamp  # noqa: F401
 from backend.services.project_service import ProjectService
 from backend.services.project_search_service import ProjectSearchService
 from backend.services.users.user_service import UserService
+from backend.services.cache_service import CacheService
 from backend.services.organisation_service import OrganisationService
 from backend.services.campaign_service import CampaignService
 
-homepage_stats_cache = TTLCache(maxsize=4, ttl=30)
+# Project columns counting tasks, updated incrementally on each task state change
+PROJECT_TASK_COUNTERS = [
+    "total_tasks",
+    "tasks_mapped",
+    "tasks_validated",
+    "tasks_bad_imagery",
+]
+
+HOMEPAGE_STATS_ROLLUP = "homepage"
 
 
 class StatsService:
@@ -50,23 +63,53 @@ class StatsService:
         local_session=None,
     ):
         """Update stats when a task has had a state change"""
+        return StatsService.update_stats_after_task_state_changes(
+            project_id,
+            user_id,
+            [(last_state, new_state)],
+            action=action,
+            local_session=local_session,
+        )
 
-        if new_state in [
+    @staticmethod
+    def update_stats_after_task_state_changes(
+        project_id: int,
+        user_id: int,
+        state_changes: list,
+        action="change",
+        local_session=None,
+    ):
+        """
+        Update stats when several tasks of a project have had a state change by the same user
+        :param state_changes: list of (last_state, new_state) tuples, one per task
+        """
+        # No stats to record for locked states
+        locked_states = [
             TaskStatus.LOCKED_FOR_VALIDATION,
             TaskStatus.LOCKED_FOR_MAPPING,
-        ]:
-            return  # No stats to record for these states
+        ]
+        state_changes = [
+            (last_state, new_state)
+            for last_state, new_state in state_changes
+            if new_state not in locked_states
+        ]
+        if not state_changes:
+            return
 
         project = ProjectService.get_project_by_id(project_id)
         user = UserService.get_user_by_id(user_id)
 
-        project, user = StatsService._update_tasks_stats(
-            project, user, last_state, new_state, action
-        )
+        for last_state, new_state in state_changes:
+            project, user = StatsService._update_tasks_stats(
+                project, user, last_state, new_state, action
+            )
         UserService.upsert_mapped_projects(
             user_id, project_id, local_session=local_session
         )
         project.last_updated = timestamp()
+        CacheService.invalidate(
+            f"project:{project_id}", session=local_session or db.session
+        )
 
         # Transaction will be saved when task is saved
         return project, user
@@ -186,14 +229,8 @@ class StatsService:
 
         projects_query = ProjectSearchService.create_search_query()
         projects = projects_query.filter(Project.id == query.c.id).all()
-        # Get total contributors.
-        contrib_counts = ProjectSearchService.get_total_contributions(projects)
-        zip_items = zip(projects, contrib_counts)
-
         dto = ProjectSearchResultsDTO()
-        dto.results = [
-            ProjectSearchService.create_result_dto(p, "en", t) for p, t in zip_items
-        ]
+        dto.results = ProjectSearchService.create_result_dtos(projects, "en")
 
         return dto
 
@@ -363,7 +400,7 @@ class StatsService:
         return contrib_dto
 
     @staticmethod
-    @cached(homepage_stats_cache)
+    @CacheService.cached("homepage_stats", ttl=30)
     def get_homepage_stats(abbrev=True) -> HomePageStatsDTO:
         """Get overall TM stats to give community a feel for progress that's being made"""
         dto = HomePageStatsDTO()
@@ -386,99 +423,24 @@ class StatsService:
             .scalar()
         )
         if not abbrev:
-            dto.total_validators = (
-                Task.query.filter(Task.task_status == TaskStatus.VALIDATED.value)
-                .distinct(Task.validated_by)
-                .count()
-            )
-            dto.tasks_validated = Task.query.filter(
-                Task.task_status == TaskStatus.VALIDATED.value
-            ).count()
-
-            dto.total_area = Project.query.with_entities(
-                func.coalesce(func.sum(func.ST_Area(Project.geometry, True) / 1000000))
-            ).scalar()
-
-            dto.total_mapped_area = (
-                Task.query.with_entities(
-                    func.coalesce(func.sum(func.ST_Area(Task.geometry, True) / 1000000))
-                )
-                .filter(Task.task_status == TaskStatus.MAPPED.value)
-                .scalar()
-            )
-
-            dto.total_validated_area = (
-                Task.query.with_entities(
-                    func.coalesce(func.sum(func.ST_Area(Task.geometry, True) / 1000000))
-                )
-                .filter(Task.task_status == TaskStatus.VALIDATED.value)
-                .scalar()
-            )
-
-            unique_campaigns = Campaign.query.with_entities(
-                func.count(Campaign.id)
-            ).scalar()
-
-            linked_campaigns_count = (
-                Campaign.query.join(
-                    campaign_projects, Campaign.id == campaign_projects.c.campaign_id
-                )
-                .with_entities(
-                    Campaign.name, func.count(campaign_projects.c.campaign_id)
-                )
-                .group_by(Campaign.id)
-                .all()
-            )
-
-            subquery = (
-                db.session.query(campaign_projects.c.project_id.distinct())
-                .order_by(campaign_projects.c.project_id)
-                .subquery()
-            )
-            no_campaign_count = (
-                Project.query.with_entities(func.count())
-                .filter(~Project.id.in_(subquery))
-                .scalar()
-            )
-            dto.campaigns = [CampaignStatsDTO(row) for row in linked_campaigns_count]
-            if no_campaign_count:
-                dto.campaigns.append(
-                    CampaignStatsDTO(("Unassociated", no_campaign_count))
-                )
-
-            dto.total_campaigns = unique_campaigns
-            unique_orgs = Organisation.query.with_entities(
-                func.count(Organisation.id)
-            ).scalar()
-
-            linked_orgs_count = (
-                db.session.query(Organisation.name, func.count(Project.organisation_id))
-                .join(Project.organisation)
-                .group_by(Organisation.id)
-                .all()
-            )
-
-            subquery = (
-                db.session.query(Project.organisation_id.distinct())
-                .order_by(Project.organisation_id)
-                .subquery()
-            )
-            no_org_project_count = (
-                Organisation.query.with_entities(func.count())
-                .filter(~Organisation.id.in_(subquery))
-                .scalar()
-            )
+            # The global stats are precomputed by refresh_homepage_stats
+            rollup = StatsRollup.get(HOMEPAGE_STATS_ROLLUP)
+            if rollup is None:
+                StatsService.refresh_homepage_stats()
+                rollup = StatsRollup.get(HOMEPAGE_STATS_ROLLUP)
+
+            stats = rollup.data
+            dto.total_validators = stats["total_validators"]
+            dto.tasks_validated = stats["tasks_validated"]
+            dto.total_area = stats["total_area"]
+            dto.total_mapped_area = stats["total_mapped_area"]
+            dto.total_validated_area = stats["total_validated_area"]
+            dto.campaigns = [CampaignStatsDTO(row) for row in stats["campaigns"]]
+            dto.total_campaigns = stats["total_campaigns"]
             dto.organisations = [
-                OrganizationListStatsDTO(row) for row in linked_orgs_count
+                OrganizationListStatsDTO(row) for row in stats["organisations"]
             ]
-
-            if no_org_project_count:
-                no_org_proj = OrganizationListStatsDTO(
-                    ("Unassociated", no_org_project_count)
-                )
-                dto.organisations.append(no_org_proj)
-
-            dto.total_organisations = unique_orgs
+            dto.total_organisations = stats["total_organisations"]
         else:
             # Clear null attributes for abbreviated call
             clear_attrs = [
@@ -499,27 +461,198 @@ class StatsService:
         return dto
 
     @staticmethod
-    def update_all_project_stats():
-        projects = db.session.query(Project.id)
-        for project_id in projects.all():
-            StatsService.update_project_stats(project_id)
+    def refresh_homepage_stats(full: bool = False):
+        """
+        Recomputes the global stats shown with the full homepage stats. Areas are summed from the
+        project rollups, which are refreshed first
+        :param full: also recompute the area of the AOI of every project, to repair the rollups
+        """
+        ProjectStatsRollup.refresh(full)
+        area_totals = ProjectStatsRollup.get_totals()
+
+        total_validators = (
+            Task.query.with_entities(func.count(Task.validated_by.distinct()))
+            .filter(Task.task_status == TaskStatus.VALIDATED.value)
+            .scalar()
+        )
+        tasks_validated = Task.query.filter(
+            Task.task_status == TaskStatus.VALIDATED.value
+        ).count()
+
+        unique_campaigns = Campaign.query.with_entities(
+            func.count(Campaign.id)
+        ).scalar()
+        linked_campaigns_count = (
+            Campaign.query.join(
+                campaign_projects, Campaign.id == campaign_projects.c.campaign_id
+            )
+            .with_entities(Campaign.name, func.count(campaign_projects.c.campaign_id))
+            .group_by(Campaign.id)
+            .all()
+        )
+        subquery = (
+            db.session.query(campaign_projects.c.project_id.distinct())
+            .order_by(campaign_projects.c.project_id)
+            .subquery()
+        )
+        no_campaign_count = (
+            Project.query.with_entities(func.count())
+            .filter(~Project.id.in_(subquery))
+            .scalar()
+        )
+        campaigns = [list(row) for row in linked_campaigns_count]
+        if no_campaign_count:
+            campaigns.append(["Unassociated", no_campaign_count])
+
+        unique_orgs = Organisation.query.with_entities(
+            func.count(Organisation.id)
+        ).scalar()
+        linked_orgs_count = (
+            db.session.query(Organisation.name, func.count(Project.organisation_id))
+            .join(Project.organisation)
+            .group_by(Organisation.id)
+            .all()
+        )
+        subquery = (
+            db.session.query(Project.organisation_id.distinct())
+            .order_by(Project.organisation_id)
+            .subquery()
+        )
+        no_org_project_count = (
+            Organisation.query.with_entities(func.count())
+            .filter(~Organisation.id.in_(subquery))
+            .scalar()
+        )
+        organisations = [list(row) for row in linked_orgs_count]
+        if no_org_project_count:
+            organisations.append(["Unassociated", no_org_project_count])
+
+        StatsRollup.save(
+            HOMEPAGE_STATS_ROLLUP,
+            {
+                "total_validators": total_validators,
+                "tasks_validated": tasks_validated,
+                "total_area": area_totals.total_area,
+                "total_mapped_area": area_totals.mapped_area,
+                "total_validated_area": area_totals.validated_area,
+                "campaigns": campaigns,
+                "total_campaigns": unique_campaigns,
+                "organisations": organisations,
+                "total_organisations": unique_orgs,
+            },
+        )
+        db.session.commit()
+
+    @staticmethod
+    def _get_project_task_counts(project_id: int = None):
+        """
+        Recounts the tasks behind the project counters, for all projects in one grouped pass.
+        Projects without tasks are outer joined so their counters are recounted as 0
+        """
+
+        def count_tasks(status: TaskStatus = None):
+            if status is None:
+                return func.count(Task.id)
+            return func.count(Task.id).filter(Task.task_status == status.value)
+
+        query = (
+            db.session.query(
+                Project.id.label("project_id"),
+                count_tasks().label("total_tasks"),
+                count_tasks(TaskStatus.MAPPED).label("tasks_mapped"),
+                count_tasks(TaskStatus.VALIDATED).label("tasks_validated"),
+                count_tasks(TaskStatus.BADIMAGERY).label("tasks_bad_imagery"),
+            )
+            .outerjoin(Task, Task.project_id == Project.id)
+            .group_by(Project.id)
+        )
+        if project_id is not None:
+            query = query.filter(Project.id == project_id)
+        return query.subquery()
+
+    @staticmethod
+    def _project_counters_differ(task_counts):
+        return or_(
+            *[
+                getattr(Project, counter).is_distinct_from(task_counts.c[counter])
+                for counter in PROJECT_TASK_COUNTERS
+            ]
+        )
+
+    @staticmethod
+    def update_all_project_stats(project_id: int = None) -> int:
+        """
+        Recomputes the task counters of all projects, or of a single one, with a bulk UPDATE
+        :return: number of projects whose counters were corrected
+        """
+        task_counts = StatsService._get_project_task_counts(project_id)
+        updated_projects = (
+            db.session.execute(
+                update(Project)
+                .where(
+                    Project.id == task_counts.c.project_id,
+                    StatsService._project_counters_differ(task_counts),
+                )
+                .values(
+                    {
+                        counter: task_counts.c[counter]
+                        for counter in PROJECT_TASK_COUNTERS
+                    }
+                )
+                .returning(Project.id)
+                .execution_options(synchronize_session=False)
+            )
+            .scalars()
+            .all()
+        )
+        CacheService.invalidate(
+            *[f"project:{updated_id}" for updated_id in updated_projects],
+            session=db.session,
+        )
+        db.session.commit()
+        return len(updated_projects)
 
     @staticmethod
     def update_project_stats(project_id: int):
-        project = ProjectService.get_project_by_id(project_id)
-        tasks = Task.query.filter(Task.project_id == project_id)
+        ProjectService.exists(project_id)
+        StatsService.update_all_project_stats(project_id)
 
-        project.total_tasks = tasks.count()
-        project.tasks_mapped = tasks.filter(
-            Task.task_status == TaskStatus.MAPPED.value
-        ).count()
-        project.tasks_validated = tasks.filter(
-            Task.task_status == TaskStatus.VALIDATED.value
-        ).count()
-        project.tasks_bad_imagery = tasks.filter(
-            Task.task_status == TaskStatus.BADIMAGERY.value
-        ).count()
-        project.save()
+    @staticmethod
+    def get_project_stats_drift() -> list:
+        """
+        Compares the counters maintained on each task state change with a recount of the tasks
+        :return: a dict per project whose counters diverged, mapping the counters to (stored, actual)
+        """
+        task_counts = StatsService._get_project_task_counts()
+        diverged_projects = (
+            db.session.query(
+                Project.id,
+                *[getattr(Project, counter) for counter in PROJECT_TASK_COUNTERS],
+                *[
+                    task_counts.c[counter].label(f"actual_{counter}")
+                    for counter in PROJECT_TASK_COUNTERS
+                ],
+            )
+            .join(task_counts, task_counts.c.project_id == Project.id)
+            .filter(StatsService._project_counters_differ(task_counts))
+            .order_by(Project.id)
+            .all()
+        )
+
+        drift = []
+        for row in diverged_projects:
+            counters = row._mapping
+            drift.append(
+                {
+                    "project_id": row.id,
+                    **{
+                        counter: (counters[counter], counters[f"actual_{counter}"])
+                        for counter in PROJECT_TASK_COUNTERS
+                        if counters[counter] != counters[f"actual_{counter}"]
+                    },
+                }
+            )
+        return drift
 
     @staticmethod
     def get_all_users_statistics(start_date: date, end_date: date):
@@ -577,34 +710,23 @@ class StatsService:
     ):
         """Creates tasks stats for a period using the TaskStatsDTO"""
 
-        query = (
-            db.session.query(
-                TaskHistory.task_id,
-                TaskHistory.project_id,
-                TaskHistory.action_text,
-                func.DATE(TaskHistory.action_date).label("day"),
-            )
-            .distinct(
-                TaskHistory.project_id, TaskHistory.task_id, TaskHistory.action_text
-            )
-            .filter(
-                TaskHistory.action == "STATE_CHANGE",
-                or_(
-                    TaskHistory.action_text == "MAPPED",
-                    TaskHistory.action_text == "VALIDATED",
-                    TaskHistory.action_text == "BADIMAGERY",
+        def count_tasks(status: TaskStatus):
+            return func.coalesce(
+                func.sum(DailyTaskStats.tasks).filter(
+                    DailyTaskStats.action_text == status.name
                 ),
+                0,
             )
-            .order_by(
-                TaskHistory.project_id,
-                TaskHistory.task_id,
-                TaskHistory.action_text,
-                TaskHistory.action_date,
-            )
-        )
+
+        query = db.session.query(
+            func.to_char(DailyTaskStats.day, "YYYY-MM-DD"),
+            count_tasks(TaskStatus.MAPPED).label("mapped"),
+            count_tasks(TaskStatus.VALIDATED).label("validated"),
+            count_tasks(TaskStatus.BADIMAGERY).label("badimagery"),
+        ).filter(DailyTaskStats.day.between(start_date, end_date))
 
         if org_id:
-            query = query.join(Project, Project.id == TaskHistory.project_id).filter(
+            query = query.join(Project, Project.id == DailyTaskStats.project_id).filter(
                 Project.organisation_id == org_id
             )
         if org_name:
@@ -614,7 +736,7 @@ class StatsService:
                 ).id
             except NotFound:
                 organisation_id = None
-            query = query.join(Project, Project.id == TaskHistory.project_id).filter(
+            query = query.join(Project, Project.id == DailyTaskStats.project_id).filter(
                 Project.organisation_id == organisation_id
             )
         if campaign:
@@ -624,77 +746,28 @@ class StatsService:
                 campaign_id = None
             query = query.join(
                 campaign_projects,
-                campaign_projects.c.project_id == TaskHistory.project_id,
+                campaign_projects.c.project_id == DailyTaskStats.project_id,
             ).filter(campaign_projects.c.campaign_id == campaign_id)
         if project_id:
-            query = query.filter(TaskHistory.project_id.in_(project_id))
+            query = query.filter(DailyTaskStats.project_id.in_(project_id))
         if country:
             # Unnest country column array.
             sq = Project.query.with_entities(
                 Project.id, func.unnest(Project.country).label("country")
             ).subquery()
 
-            query = query.filter(sq.c.country.ilike("%{}%".format(country))).filter(
-                TaskHistory.project_id == sq.c.id
-            )
-
-        query = query.subquery()
-
-        date_query = db.session.query(
-            func.DATE(
-                func.generate_series(start_date, end_date, timedelta(days=1))
-            ).label("d_day")
-        ).subquery()
-
-        grouped_dates = (
-            db.session.query(
-                date_query.c.d_day,
-                query.c.action_text,
-                func.count(query.c.action_text).label("cnt"),
-            )
-            .join(date_query, date_query.c.d_day == query.c.day)
-            .group_by(date_query.c.d_day, query.c.action_text)
-            .order_by(date_query.c.d_day)
-        ).subquery()
-
-        mapped = (
-            db.session.query(
-                grouped_dates.c.d_day, grouped_dates.c.action_text, grouped_dates.c.cnt
-            )
-            .select_from(grouped_dates)
-            .filter(grouped_dates.c.action_text == "MAPPED")
-            .subquery()
-        )
-        validated = (
-            db.session.query(
-                grouped_dates.c.d_day, grouped_dates.c.action_text, grouped_dates.c.cnt
-            )
-            .select_from(grouped_dates)
-            .filter(grouped_dates.c.action_text == "VALIDATED")
-            .subquery()
-        )
-        badimagery = (
-            db.session.query(
-                grouped_dates.c.d_day, grouped_dates.c.action_text, grouped_dates.c.cnt
+            query = query.filter(
+                DailyTaskStats.project_id.in_(
+                    db.session.query(sq.c.id).filter(
+                        sq.c.country.ilike("%{}%".format(country))
+                    )
+                )
             )
-            .select_from(grouped_dates)
-            .filter(grouped_dates.c.action_text == "BADIMAGERY")
-            .subquery()
-        )
 
         result = (
-            db.session.query(
-                func.to_char(grouped_dates.c.d_day, "YYYY-MM-DD"),
-                func.coalesce(mapped.c.cnt, 0).label("mapped"),
-                func.coalesce(validated.c.cnt, 0).label("validated"),
-                func.coalesce(badimagery.c.cnt, 0).label("badimagery"),
-            )
-            .select_from(grouped_dates)
-            .distinct(grouped_dates.c.d_day)
-            .filter(grouped_dates.c.d_day is not None)
-            .outerjoin(mapped, mapped.c.d_day == grouped_dates.c.d_day)
-            .outerjoin(validated, validated.c.d_day == grouped_dates.c.d_day)
-            .outerjoin(badimagery, badimagery.c.d_day == grouped_dates.c.d_day)
+            query.group_by(DailyTaskStats.day)
+            .having(func.sum(DailyTaskStats.tasks) > 0)
+            .order_by(DailyTaskStats.day)
         )
 
         day_stats_dto = list(map(StatsService.set_task_stats, result))
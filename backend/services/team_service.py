@@ -16,6 +16,7 @@ from backend.models.dtos.team_dto import (
 from backend.models.dtos.message_dto import MessageDTO
 from backend.models.dtos.stats_dto import Pagination
 from backend.models.postgis.message import Message, MessageType
+from backend.models.postgis.organisation import Organisation
 from backend.models.postgis.team import Team, TeamMembers
 from backend.models.postgis.project import ProjectTeams
 from backend.models.postgis.project_info import ProjectInfo
@@ -299,33 +300,43 @@ class TeamService:
             teams_list = paginated.items
         else:
             teams_list = query.all()
+        # Load what the team DTOs need for the whole page at once
+        team_ids = [team.id for team in teams_list]
+        organisations = {
+            organisation.id: organisation
+            for organisation in Organisation.query.filter(
+                Organisation.id.in_({team.organisation_id for team in teams_list})
+            )
+        }
+        if not search_dto.omit_members:
+            members_by_team = Team.get_members_of_teams(
+                team_ids, None if search_dto.full_members_list else 10
+            )
+            members_count = Team.get_members_count_by_team(team_ids)
+
         for team in teams_list:
+            organisation = organisations[team.organisation_id]
             team_dto = TeamDTO()
             team_dto.team_id = team.id
             team_dto.name = team.name
             team_dto.join_method = TeamJoinMethod(team.join_method).name
             team_dto.visibility = TeamVisibility(team.visibility).name
             team_dto.description = team.description
-            team_dto.logo = team.organisation.logo
-            team_dto.organisation = team.organisation.name
-            team_dto.organisation_id = team.organisation.id
+            team_dto.logo = organisation.logo
+            team_dto.organisation = organisation.name
+            team_dto.organisation_id = organisation.id
             team_dto.members = []
             # Skip if members are not included
             if not search_dto.omit_members:
-                if search_dto.full_members_list:
-                    team_members = team.members
-                else:
-                    team_managers = team.get_team_managers(10)
-                    team_members = team.get_team_members(10)
-                    team_members.extend(team_managers)
                 team_dto.members = [
-                    team.as_dto_team_member(member) for member in team_members
+                    team.as_dto_team_member(member)
+                    for member in members_by_team[team.id]
                 ]
-                team_dto.members_count = team.get_members_count_by_role(
-                    TeamMemberFunctions.MEMBER
+                team_dto.members_count = members_count.get(
+                    (team.id, TeamMemberFunctions.MEMBER.value), 0
                 )
-                team_dto.managers_count = team.get_members_count_by_role(
-                    TeamMemberFunctions.MANAGER
+                team_dto.managers_count = members_count.get(
+                    (team.id, TeamMemberFunctions.MANAGER.value), 0
                 )
             teams_list_dto.teams.append(team_dto)
         return teams_list_dto
@@ -611,12 +622,15 @@ class TeamService:
             )
 
             messages = []
-            for team_member in team_members:
-                if team_member.user_id != message_dto.from_user_id:
-                    message = Message.from_dto(team_member.user_id, message_dto)
-                    message.message_type = MessageType.TEAM_BROADCAST.value
-                    message.save()
-                    user = UserService.get_user_by_id(team_member.user_id)
-                    messages.append(dict(message=message, user=user))
+            for user in MessageService._get_recipients(
+                user_ids=[
+                    team_member.user_id
+                    for team_member in team_members
+                    if team_member.user_id != message_dto.from_user_id
+                ]
+            ):
+                message = Message.from_dto(user.id, message_dto)
+                message.message_type = MessageType.TEAM_BROADCAST.value
+                messages.append(dict(message=message, user=user))
 
             MessageService._push_messages(messages)
@@ -1,7 +1,24 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
 import requests
 from flask import current_app
+from requests.adapters import HTTPAdapter
 
 from backend.models.dtos.user_dto import UserOSMDTO
+from backend.services.cache_service import CacheService
+
+# Users requested at once from the OSM multi user details endpoint
+OSM_USERS_PER_REQUEST = 100
+# Attempts of a request rate limited by the OSM API
+OSM_REQUEST_ATTEMPTS = 3
+# Seconds waited before retrying a rate limited request, unless the OSM API says otherwise
+OSM_RETRY_DELAY = 1
+# Longest wait before retrying, so rate limited requests don't hold the worker for long
+OSM_MAX_RETRY_DELAY = 10
+OSM_USER_DETAILS_CACHE = "osm_user_details"
 
 
 class OSMServiceError(Exception):
@@ -13,6 +30,49 @@ class OSMServiceError(Exception):
 
 
 class OSMService:
+    session = None
+
+    @staticmethod
+    def get_session() -> requests.Session:
+        """HTTP session shared by the requests to the OSM API, reusing pooled connections"""
+        if OSMService.session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_maxsize=current_app.config["OSM_REQUEST_CONCURRENCY"]
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            OSMService.session = session
+        return OSMService.session
+
+    @staticmethod
+    def _get(session: requests.Session, url: str, timeout: int, params=None):
+        """Gets the url, waiting and retrying when the OSM API rate limits the requests"""
+        for attempt in range(OSM_REQUEST_ATTEMPTS):
+            try:
+                response = session.get(url, params=params, timeout=timeout)
+            except requests.RequestException as e:
+                raise OSMServiceError(f"Error requesting OSM: {e}")
+            if response.status_code != 429 or attempt == OSM_REQUEST_ATTEMPTS - 1:
+                return response
+            time.sleep(OSMService._get_retry_delay(response.headers.get("Retry-After")))
+
+    @staticmethod
+    def _get_retry_delay(retry_after: str) -> float:
+        """Seconds to wait from a Retry-After header, given in seconds or as an HTTP date"""
+        delay = OSM_RETRY_DELAY
+        if retry_after:
+            retry_after = retry_after.strip()
+            if retry_after.isdigit():
+                delay = int(retry_after)
+            else:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    pass
+        return min(max(delay, 0), OSM_MAX_RETRY_DELAY)
+
     @staticmethod
     def get_osm_details_for_user(user_id: int) -> UserOSMDTO:
         """
@@ -23,13 +83,87 @@ class OSMService:
         osm_user_details_url = (
             f"{current_app.config['OSM_SERVER_URL']}/api/0.6/user/{user_id}.json"
         )
-        response = requests.get(osm_user_details_url)
+        response = OSMService._get(
+            OSMService.get_session(),
+            osm_user_details_url,
+            current_app.config["OSM_REQUEST_TIMEOUT"],
+        )
 
         if response.status_code != 200:
             raise OSMServiceError("Bad response from OSM")
 
         return OSMService._parse_osm_user_details_response(response.json())
 
+    @staticmethod
+    def get_osm_details_for_users(user_ids: list) -> dict:
+        """
+        Gets OSM details for the users, using the cached details when available and requesting
+        the others from the OSM multi user endpoint with a few concurrent requests
+        :param user_ids: user ids in scope
+        :return: details by user id, users not found in OSM or whose request failed are missing
+        """
+        details = CacheService.get_many(OSM_USER_DETAILS_CACHE, user_ids)
+        missing_user_ids = [user_id for user_id in user_ids if user_id not in details]
+        if not missing_user_ids:
+            return details
+
+        # Requests run outside of the app context, read what they need beforehand
+        session = OSMService.get_session()
+        osm_users_url = f"{current_app.config['OSM_SERVER_URL']}/api/0.6/users.json"
+        timeout = current_app.config["OSM_REQUEST_TIMEOUT"]
+        logger = current_app.logger
+
+        def get_osm_details(chunk):
+            try:
+                return OSMService._get_osm_details_for_users(
+                    session, osm_users_url, timeout, chunk
+                )
+            except OSMServiceError:
+                logger.error(f"Error getting OSM details of users {chunk}")
+                return {}
+
+        chunks = []
+        for start in range(0, len(missing_user_ids), OSM_USERS_PER_REQUEST):
+            end = start + OSM_USERS_PER_REQUEST
+            chunks.append(missing_user_ids[start:end])
+        requested_details = {}
+        with ThreadPoolExecutor(
+            max_workers=current_app.config["OSM_REQUEST_CONCURRENCY"]
+        ) as executor:
+            for chunk_details in executor.map(get_osm_details, chunks):
+                requested_details.update(chunk_details)
+
+        CacheService.set_many(
+            OSM_USER_DETAILS_CACHE,
+            requested_details,
+            current_app.config["OSM_USER_DETAILS_CACHE_TTL"],
+        )
+        details.update(requested_details)
+        return details
+
+    @staticmethod
+    def _get_osm_details_for_users(
+        session: requests.Session, url: str, timeout: int, user_ids: list
+    ) -> dict:
+        response = OSMService._get(
+            session,
+            url,
+            timeout,
+            params={"users": ",".join(str(user_id) for user_id in user_ids)},
+        )
+        if response.status_code == 404:
+            # None of the users exist anymore, missing users are otherwise left out
+            return {}
+        if response.status_code != 200:
+            raise OSMServiceError("Bad response from OSM")
+
+        return {
+            osm_user["user"]["id"]: OSMService._parse_osm_user_details_response(
+                osm_user
+            )
+            for osm_user in response.json().get("users", [])
+        }
+
     @staticmethod
     def _parse_osm_user_details_response(
         osm_response: dict, user_element="user"
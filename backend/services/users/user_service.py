@@ -1,8 +1,6 @@
-from cachetools import TTLCache, cached
 from flask import current_app
 import datetime
-from sqlalchemy.sql.expression import literal
-from sqlalchemy import func, or_, desc, and_, distinct, cast, Time, column
+from sqlalchemy import func, or_, desc, and_, distinct, column, update
 
 from backend.exceptions import NotFound
 from backend import db
@@ -14,21 +12,20 @@ from backend.models.dtos.user_dto import (
     UserSearchQuery,
     UserSearchDTO,
     UserStatsDTO,
-    UserContributionDTO,
     UserRegisterEmailDTO,
-    UserCountryContributed,
-    UserCountriesContributed,
 )
 from backend.models.dtos.interests_dto import InterestsListDTO, InterestDTO
 from backend.models.postgis.interests import Interest, project_interests
 from backend.models.postgis.message import Message, MessageType
 from backend.models.postgis.project import Project
 from backend.models.postgis.user import User, UserRole, MappingLevel, UserEmail
-from backend.models.postgis.task import TaskHistory, TaskAction, Task
+from backend.models.postgis.user_stats import UserStats
+from backend.models.postgis.task import TaskHistory, Task
 from backend.models.dtos.user_dto import UserTaskDTOs
 from backend.models.dtos.stats_dto import Pagination
 from backend.models.postgis.statuses import TaskStatus, ProjectStatus
 from backend.services.users.osm_service import OSMService, OSMServiceError
+from backend.services.cache_service import CacheService
 from backend.services.messaging.smtp_service import SMTPService
 from backend.services.messaging.template_service import (
     get_txt_template,
@@ -36,9 +33,6 @@ from backend.services.messaging.template_service import (
 )
 
 
-user_filter_cache = TTLCache(maxsize=1024, ttl=600)
-
-
 class UserServiceError(Exception):
     """Custom Exception to notify callers an error occurred when in the User Service"""
 
@@ -68,27 +62,7 @@ class UserService:
 
     @staticmethod
     def get_contributions_by_day(user_id: int):
-        # Validate that user exists.
-        stats = (
-            TaskHistory.query.with_entities(
-                func.DATE(TaskHistory.action_date).label("day"),
-                func.count(TaskHistory.action).label("cnt"),
-            )
-            .filter(TaskHistory.user_id == user_id)
-            .filter(TaskHistory.action == TaskAction.STATE_CHANGE.name)
-            .filter(
-                func.DATE(TaskHistory.action_date)
-                > datetime.date.today() - datetime.timedelta(days=365)
-            )
-            .group_by("day")
-            .order_by(desc("day"))
-        )
-
-        contributions = [
-            UserContributionDTO(dict(date=str(s[0]), count=s[1])) for s in stats
-        ]
-
-        return contributions
+        return UserService.get_user_stats(user_id).get_contributions_by_day()
 
     @staticmethod
     def get_project_managers() -> User:
@@ -326,145 +300,39 @@ class UserService:
     @staticmethod
     def get_detailed_stats(username: str):
         user = UserService.get_user_by_username(username)
+        user_stats = UserService.get_user_stats(user.id)
         stats_dto = UserStatsDTO()
 
-        actions = [
-            TaskStatus.VALIDATED.name,
-            TaskStatus.INVALIDATED.name,
-            TaskStatus.MAPPED.name,
-        ]
-
-        actions_table = (
-            db.session.query(literal(TaskStatus.VALIDATED.name).label("action_text"))
-            .union(
-                db.session.query(
-                    literal(TaskStatus.INVALIDATED.name).label("action_text")
-                ),
-                db.session.query(literal(TaskStatus.MAPPED.name).label("action_text")),
-            )
-            .subquery()
-            .alias("actions_table")
-        )
-
-        # Get only rows with the given actions.
-        filtered_actions = (
-            TaskHistory.query.with_entities(
-                TaskHistory.user_id,
-                TaskHistory.project_id,
-                TaskHistory.task_id,
-                TaskHistory.action_text,
-            )
-            .filter(TaskHistory.action_text.in_(actions))
-            .subquery()
-            .alias("filtered_actions")
-        )
-
-        user_tasks = (
-            db.session.query(filtered_actions)
-            .filter(filtered_actions.c.user_id == user.id)
-            .distinct(
-                filtered_actions.c.project_id,
-                filtered_actions.c.task_id,
-                filtered_actions.c.action_text,
-            )
-            .subquery()
-            .alias("user_tasks")
-        )
-
-        others_tasks = (
-            db.session.query(filtered_actions)
-            .filter(filtered_actions.c.user_id != user.id)
-            .filter(filtered_actions.c.task_id == user_tasks.c.task_id)
-            .filter(filtered_actions.c.project_id == user_tasks.c.project_id)
-            .filter(filtered_actions.c.action_text != TaskStatus.MAPPED.name)
-            .distinct(
-                filtered_actions.c.project_id,
-                filtered_actions.c.task_id,
-                filtered_actions.c.action_text,
-            )
-            .subquery()
-            .alias("others_tasks")
-        )
-
-        user_stats = (
-            db.session.query(
-                actions_table.c.action_text, func.count(user_tasks.c.action_text)
-            )
-            .outerjoin(
-                user_tasks, actions_table.c.action_text == user_tasks.c.action_text
-            )
-            .group_by(actions_table.c.action_text)
-        )
-
-        others_stats = (
-            db.session.query(
-                func.concat(actions_table.c.action_text, "_BY_OTHERS"),
-                func.count(others_tasks.c.action_text),
-            )
-            .outerjoin(
-                others_tasks, actions_table.c.action_text == others_tasks.c.action_text
-            )
-            .group_by(actions_table.c.action_text)
-        )
-
-        res = user_stats.union(others_stats).all()
-        results = {key: value for key, value in res}
-
         projects_mapped = UserService.get_projects_mapped(user.id)
-        stats_dto.tasks_mapped = results["MAPPED"]
-        stats_dto.tasks_validated = results["VALIDATED"]
-        stats_dto.tasks_invalidated = results["INVALIDATED"]
-        stats_dto.tasks_validated_by_others = results["VALIDATED_BY_OTHERS"]
-        stats_dto.tasks_invalidated_by_others = results["INVALIDATED_BY_OTHERS"]
+        stats_dto.tasks_mapped = user_stats.tasks_mapped
+        stats_dto.tasks_validated = user_stats.tasks_validated
+        stats_dto.tasks_invalidated = user_stats.tasks_invalidated
+        stats_dto.tasks_validated_by_others = user_stats.tasks_validated_by_others
+        stats_dto.tasks_invalidated_by_others = user_stats.tasks_invalidated_by_others
         stats_dto.projects_mapped = len(projects_mapped)
-        stats_dto.countries_contributed = UserService.get_countries_contributed(user.id)
-        stats_dto.contributions_by_day = UserService.get_contributions_by_day(user.id)
-        stats_dto.total_time_spent = 0
-        stats_dto.time_spent_mapping = 0
-        stats_dto.time_spent_validating = 0
-
-        query = (
-            TaskHistory.query.with_entities(
-                func.date_trunc("minute", TaskHistory.action_date).label("trn"),
-                func.max(TaskHistory.action_text).label("tm"),
-            )
-            .filter(TaskHistory.user_id == user.id)
-            .filter(TaskHistory.action == "LOCKED_FOR_VALIDATION")
-            .group_by("trn")
-            .subquery()
+        stats_dto.countries_contributed = user_stats.get_countries_contributed()
+        stats_dto.contributions_by_day = user_stats.get_contributions_by_day()
+        stats_dto.time_spent_mapping = user_stats.time_spent_mapping.total_seconds()
+        stats_dto.time_spent_validating = (
+            user_stats.time_spent_validating.total_seconds()
         )
-        total_validation_time = db.session.query(
-            func.sum(cast(func.to_timestamp(query.c.tm, "HH24:MI:SS"), Time))
-        ).scalar()
-
-        if total_validation_time:
-            stats_dto.time_spent_validating = total_validation_time.total_seconds()
-            stats_dto.total_time_spent += stats_dto.time_spent_validating
-
-        total_mapping_time = (
-            db.session.query(
-                func.sum(
-                    cast(func.to_timestamp(TaskHistory.action_text, "HH24:MI:SS"), Time)
-                )
-            )
-            .filter(
-                or_(
-                    TaskHistory.action == TaskAction.LOCKED_FOR_MAPPING.name,
-                    TaskHistory.action == TaskAction.AUTO_UNLOCKED_FOR_MAPPING.name,
-                )
-            )
-            .filter(TaskHistory.user_id == user.id)
-            .scalar()
+        stats_dto.total_time_spent = (
+            stats_dto.time_spent_mapping + stats_dto.time_spent_validating
         )
-
-        if total_mapping_time:
-            stats_dto.time_spent_mapping = total_mapping_time.total_seconds()
-            stats_dto.total_time_spent += stats_dto.time_spent_mapping
-
         stats_dto.contributions_interest = UserService.get_interests_stats(user.id)
 
         return stats_dto
 
+    @staticmethod
+    def get_user_stats(user_id: int) -> UserStats:
+        """Gets the contribution profile of the user, built from the task history on first use"""
+        user_stats = UserStats.get(user_id)
+        if user_stats is None:
+            UserStats.rebuild([user_id])
+            db.session.commit()
+            user_stats = UserStats.get(user_id)
+        return user_stats
+
     @staticmethod
     def update_user_details(user_id: int, user_dto: UserDTO) -> dict:
         """Update user with info supplied by user, if they add or change their email address a verification mail
@@ -498,7 +366,7 @@ class UserService:
         return User.get_all_users(query)
 
     @staticmethod
-    @cached(user_filter_cache)
+    @CacheService.cached("user_filter", ttl=600)
     def filter_users(username: str, project_id: int, page: int) -> UserFilterDTO:
         """Gets paginated list of users, filtered by username, for autocomplete"""
         return User.filter_users(username, project_id, page)
@@ -548,60 +416,7 @@ class UserService:
 
     @staticmethod
     def get_countries_contributed(user_id: int):
-        query = (
-            TaskHistory.query.with_entities(
-                func.unnest(Project.country).label("country"),
-                TaskHistory.action_text,
-                func.count(TaskHistory.action_text).label("count"),
-            )
-            .filter(TaskHistory.user_id == user_id)
-            .filter(
-                TaskHistory.action_text.in_(
-                    [
-                        TaskStatus.MAPPED.name,
-                        TaskStatus.BADIMAGERY.name,
-                        TaskStatus.VALIDATED.name,
-                    ]
-                )
-            )
-            .group_by("country", TaskHistory.action_text)
-            .outerjoin(Project, Project.id == TaskHistory.project_id)
-            .all()
-        )
-        countries = list(set([q.country for q in query]))
-        result = []
-        for country in countries:
-            values = [q for q in query if q.country == country]
-
-            # Filter element to sum mapped values.
-            mapped = sum(
-                [
-                    v.count
-                    for v in values
-                    if v.action_text
-                    in [TaskStatus.MAPPED.name, TaskStatus.BADIMAGERY.name]
-                ]
-            )
-            validated = sum(
-                [v.count for v in values if v.action_text == TaskStatus.VALIDATED.name]
-            )
-            dto = UserCountryContributed(
-                dict(
-                    name=country,
-                    mapped=mapped,
-                    validated=validated,
-                    total=mapped + validated,
-                )
-            )
-            result.append(dto)
-
-        # Order by total
-        result = sorted(result, reverse=True, key=lambda i: i.total)
-        countries_dto = UserCountriesContributed()
-        countries_dto.countries_contributed = result
-        countries_dto.total = len(result)
-
-        return countries_dto
+        return UserService.get_user_stats(user_id).get_countries_contributed()
 
     @staticmethod
     def upsert_mapped_projects(user_id: int, project_id: int, local_session=None):
@@ -658,15 +473,7 @@ class UserService:
             projs.extend(remaining_projs)
 
         dto = ProjectSearchResultsDTO()
-
-        # Get all total contributions for each paginated project.
-        contrib_counts = ProjectSearchService.get_total_contributions(projs)
-
-        zip_items = zip(projs, contrib_counts)
-
-        dto.results = [
-            ProjectSearchService.create_result_dto(p, "en", t) for p, t in zip_items
-        ]
+        dto.results = ProjectSearchService.create_result_dtos(projs, "en")
 
         return dto
 
@@ -760,32 +567,46 @@ class UserService:
         if user_level == MappingLevel.ADVANCED:
             return  # User has achieved highest level, so no need to do further checking
 
-        intermediate_level = current_app.config["MAPPER_LEVEL_INTERMEDIATE"]
-        advanced_level = current_app.config["MAPPER_LEVEL_ADVANCED"]
-
         try:
             osm_details = OSMService.get_osm_details_for_user(user_id)
-            if (
-                osm_details.changeset_count > advanced_level
-                and user.mapping_level != MappingLevel.ADVANCED.value
-            ):
-                user.mapping_level = MappingLevel.ADVANCED.value
-                UserService.notify_level_upgrade(user_id, user.username, "ADVANCED")
-            elif (
-                intermediate_level < osm_details.changeset_count < advanced_level
-                and user.mapping_level != MappingLevel.INTERMEDIATE.value
-            ):
-                user.mapping_level = MappingLevel.INTERMEDIATE.value
-                UserService.notify_level_upgrade(user_id, user.username, "INTERMEDIATE")
         except OSMServiceError:
             # Swallow exception as we don't want to blow up the server for this
             current_app.logger.error("Error attempting to update mapper level")
             return
 
+        new_level = UserService._get_upgraded_mapping_level(
+            osm_details.changeset_count, user.mapping_level
+        )
+        if new_level is not None:
+            user.mapping_level = new_level.value
+            UserService.notify_level_upgrade(user_id, user.username, new_level.name)
+
         user.save()
 
+    @staticmethod
+    def _get_upgraded_mapping_level(changeset_count: int, mapping_level: int):
+        """Returns the level reached with the changeset count, None if it isn't an upgrade"""
+        intermediate_level = current_app.config["MAPPER_LEVEL_INTERMEDIATE"]
+        advanced_level = current_app.config["MAPPER_LEVEL_ADVANCED"]
+
+        if (
+            changeset_count > advanced_level
+            and mapping_level != MappingLevel.ADVANCED.value
+        ):
+            return MappingLevel.ADVANCED
+        if (
+            intermediate_level < changeset_count < advanced_level
+            and mapping_level != MappingLevel.INTERMEDIATE.value
+        ):
+            return MappingLevel.INTERMEDIATE
+        return None
+
     @staticmethod
     def notify_level_upgrade(user_id: int, username: str, level: str):
+        UserService._get_level_upgrade_message(user_id, username, level).save()
+
+    @staticmethod
+    def _get_level_upgrade_message(user_id: int, username: str, level: str) -> Message:
         text_template = get_txt_template("level_upgrade_message_en.txt")
         replace_list = [
             ["[USERNAME]", username],
@@ -801,22 +622,58 @@ class UserService:
         )
         level_upgrade_message.message = text_template
         level_upgrade_message.message_type = MessageType.SYSTEM.value
-        level_upgrade_message.save()
+        return level_upgrade_message
 
     @staticmethod
-    def refresh_mapper_level() -> int:
-        """Helper function to run thru all users in the DB and update their mapper level"""
-        users = User.get_all_users_not_paginated()
-        users_updated = 1
-        total_users = len(users)
-
-        for user in users:
-            UserService.check_and_update_mapper_level(user.id)
-
-            if users_updated % 50 == 0:
-                print(f"{users_updated} users updated of {total_users}")
-
-            users_updated += 1
+    def refresh_mapper_level(page_size: int = 1000) -> int:
+        """
+        Runs through the users not yet advanced in pages, requests their OSM details at once and
+        upgrades the levels of each page in bulk
+        :param page_size: users processed per page
+        :return: number of users upgraded
+        """
+        users_updated = 0
+        users_processed = 0
+        last_user_id = None
+        while True:
+            users_query = User.query.with_entities(
+                User.id, User.username, User.mapping_level
+            ).filter(User.mapping_level != MappingLevel.ADVANCED.value)
+            if last_user_id is not None:
+                users_query = users_query.filter(User.id > last_user_id)
+            users = users_query.order_by(User.id).limit(page_size).all()
+            if not users:
+                break
+            last_user_id = users[-1].id
+
+            osm_details = OSMService.get_osm_details_for_users(
+                [user.id for user in users]
+            )
+            upgraded_users = {}
+            for user in users:
+                if user.id not in osm_details:
+                    continue
+                new_level = UserService._get_upgraded_mapping_level(
+                    osm_details[user.id].changeset_count, user.mapping_level
+                )
+                if new_level is not None:
+                    upgraded_users.setdefault(new_level, []).append(user)
+
+            for new_level, level_users in upgraded_users.items():
+                db.session.execute(
+                    update(User)
+                    .where(User.id.in_([user.id for user in level_users]))
+                    .values(mapping_level=new_level.value)
+                )
+                for user in level_users:
+                    UserService._get_level_upgrade_message(
+                        user.id, user.username, new_level.name
+                    ).add_message()
+                users_updated += len(level_users)
+            db.session.commit()
+
+            users_processed += len(users)
+            print(f"{users_processed} users processed, {users_updated} upgraded")
 
         return users_updated
 
@@ -1,8 +1,5 @@
 from flask import current_app
 from sqlalchemy import text
-from multiprocessing.dummy import Pool as ThreadPool
-from sqlalchemy.orm import scoped_session, sessionmaker
-import os
 
 from backend import db
 from backend.exceptions import NotFound
@@ -20,11 +17,13 @@ from backend.models.dtos.validator_dto import (
 from backend.models.postgis.statuses import ValidatingNotAllowed
 from backend.models.postgis.task import (
     Task,
+    TaskAction,
     TaskStatus,
     TaskHistory,
     TaskInvalidationHistory,
     TaskMappingIssue,
 )
+from backend.models.postgis.user import User
 from backend.models.postgis.utils import UserLicenseError, timestamp
 from backend.models.postgis.project_info import ProjectInfo
 from backend.services.messaging.message_service import MessageService
@@ -50,9 +49,15 @@ class ValidatorService:
         :raises ValidatorServiceError
         """
         # Loop supplied tasks to check they can all be locked for validation
+        tasks = {
+            task.id: task
+            for task in Task.get_tasks(
+                validation_dto.project_id, validation_dto.task_ids
+            )
+        }
         tasks_to_lock = []
         for task_id in validation_dto.task_ids:
-            task = Task.get(task_id, validation_dto.project_id)
+            task = tasks.get(task_id)
 
             if task is None:
                 raise NotFound(
@@ -60,6 +65,7 @@ class ValidatorService:
                     task_id=task_id,
                     project_id=validation_dto.project_id,
                 )
+            task.unlock_if_expired()
             if not (
                 task.locked_by == validation_dto.user_id
                 and TaskStatus(task.task_status) == TaskStatus.LOCKED_FOR_VALIDATION
@@ -109,14 +115,17 @@ class ValidatorService:
                     f"ValidtionNotAllowed- Validation not allowed because: {error_reason}"
                 )
 
-        # Lock all tasks for validation
-        dtos = []
+        # Lock all tasks for validation in a single transaction
         for task in tasks_to_lock:
-            task.lock_task_for_validating(validation_dto.user_id)
-            dtos.append(task.as_dto_with_instructions(validation_dto.preferred_locale))
+            task.lock_task_for_validating(validation_dto.user_id, commit=False)
+        db.session.commit()
 
         task_dtos = TaskDTOs()
-        task_dtos.tasks = dtos
+        task_dtos.tasks = ValidatorService._get_task_dtos(
+            validation_dto.project_id,
+            [task.id for task in tasks_to_lock],
+            validation_dto.preferred_locale,
+        )
 
         return task_dtos
 
@@ -139,83 +148,23 @@ class ValidatorService:
             return False
 
     @staticmethod
-    def _process_tasks(args):
-        (
-            app_context,
-            task_to_unlock,
-            project_id,
-            validated_dto,
-            message_sent_to,
-            dtos,
-        ) = args
-        with app_context:
-            Session = scoped_session(sessionmaker(bind=db.engine))
-            local_session = Session()
-            task = task_to_unlock["task"]
-            task = (
-                local_session.query(Task)
-                .filter_by(id=task.id, project_id=project_id)
-                .one()
-            )
-
-            if task_to_unlock["comment"]:
-                # Parses comment to see if any users have been @'d
-                MessageService.send_message_after_comment(
-                    validated_dto.user_id,
-                    task_to_unlock["comment"],
-                    task.id,
-                    validated_dto.project_id,
-                )
-            if (
-                task_to_unlock["new_state"] == TaskStatus.VALIDATED
-                or task_to_unlock["new_state"] == TaskStatus.INVALIDATED
-            ):
-                # All mappers get a notification if their task has been validated or invalidated.
-                # Only once if multiple tasks mapped
-                if task.mapped_by not in message_sent_to:
-                    MessageService.send_message_after_validation(
-                        task_to_unlock["new_state"],
-                        validated_dto.user_id,
-                        task.mapped_by,
-                        task.id,
-                        validated_dto.project_id,
-                    )
-                    message_sent_to.append(task.mapped_by)
-
-                if task_to_unlock["new_state"] == TaskStatus.VALIDATED:
-                    # Set last_validation_date for the mapper to current date
-                    task.mapper.last_validation_date = timestamp()
-
-            # Update stats if user setting task to a different state from previous state
-            prev_status = TaskHistory.get_last_status(project_id, task.id)
-            if prev_status != task_to_unlock["new_state"]:
-                StatsService.update_stats_after_task_state_change(
-                    validated_dto.project_id,
-                    validated_dto.user_id,
-                    prev_status,
-                    task_to_unlock["new_state"],
-                    local_session=local_session,
-                )
-            task_mapping_issues = ValidatorService.get_task_mapping_issues(
-                task_to_unlock
-            )
-            task.unlock_task(
-                validated_dto.user_id,
-                task_to_unlock["new_state"],
-                task_to_unlock["comment"],
-                issues=task_mapping_issues,
-                local_session=local_session,
-            )
-            dtos.append(task.as_dto_with_instructions(validated_dto.preferred_locale))
-            local_session.commit()
-            Session.remove()
+    def _get_task_dtos(project_id: int, task_ids: list, preferred_locale: str) -> list:
+        """Builds the DTOs of the tasks in the order of the supplied ids"""
+        tasks = {
+            task.id: task for task in Task.get_tasks_with_history(project_id, task_ids)
+        }
+        return [
+            tasks[task_id].as_dto_with_instructions(preferred_locale)
+            for task_id in task_ids
+        ]
 
     @staticmethod
     def unlock_tasks_after_validation(
         validated_dto: UnlockAfterValidationDTO,
     ) -> TaskDTOs:
         """
-        Unlocks supplied tasks after validation
+        Unlocks supplied tasks after validation. All tasks are unlocked in a single transaction,
+        notifications are sent once it's committed
         :raises ValidatorServiceError
         """
         validated_tasks = validated_dto.validated_tasks
@@ -224,34 +173,72 @@ class ValidatorService:
         tasks_to_unlock = ValidatorService.get_tasks_locked_by_user(
             project_id, validated_tasks, user_id
         )
+        task_ids = [task_to_unlock["task"].id for task_to_unlock in tasks_to_unlock]
+        last_statuses = TaskHistory.get_last_statuses(project_id, task_ids)
 
         # Unlock all tasks
-        dtos = []
-        message_sent_to = []
-        args_list = []
+        state_changes = []
+        validation_messages = []
+        message_sent_to = set()
+        validated_mappers = set()
         for task_to_unlock in tasks_to_unlock:
-            args = (
-                current_app.app_context(),
-                task_to_unlock,
-                project_id,
-                validated_dto,
-                message_sent_to,
-                dtos,
+            task = task_to_unlock["task"]
+            new_state = task_to_unlock["new_state"]
+            if new_state in [TaskStatus.VALIDATED, TaskStatus.INVALIDATED]:
+                # All mappers get a notification if their task has been validated or invalidated.
+                # Only once if multiple tasks mapped
+                if task.mapped_by not in message_sent_to:
+                    validation_messages.append((new_state, task.mapped_by, task.id))
+                    message_sent_to.add(task.mapped_by)
+
+                if new_state == TaskStatus.VALIDATED and task.mapped_by is not None:
+                    validated_mappers.add(task.mapped_by)
+
+            # Update stats if user setting task to a different state from previous state
+            prev_status = last_statuses[task.id]
+            if prev_status != new_state:
+                state_changes.append((prev_status, new_state))
+
+            task.unlock_task(
+                user_id,
+                new_state,
+                task_to_unlock["comment"],
+                issues=ValidatorService.get_task_mapping_issues(task_to_unlock),
+                commit=False,
             )
-            args_list.append(args)
 
-        # Create a pool and Process the tasks in parallel
-        pool = ThreadPool(os.cpu_count())
-        pool.map(ValidatorService._process_tasks, args_list)
+        TaskHistory.update_tasks_locked_with_duration(
+            project_id, task_ids, TaskAction.LOCKED_FOR_VALIDATION, user_id
+        )
+        if validated_mappers:
+            # Set last_validation_date for the mappers to current date
+            User.query.filter(User.id.in_(validated_mappers)).update(
+                {"last_validation_date": timestamp()}
+            )
+        StatsService.update_stats_after_task_state_changes(
+            project_id, user_id, state_changes
+        )
+        db.session.commit()
 
-        # Close the pool and wait for the threads to finish
-        pool.close()
-        pool.join()
+        for task_to_unlock in tasks_to_unlock:
+            if task_to_unlock["comment"]:
+                # Parses comment to see if any users have been @'d
+                MessageService.send_message_after_comment(
+                    user_id,
+                    task_to_unlock["comment"],
+                    task_to_unlock["task"].id,
+                    project_id,
+                )
+        MessageService.send_messages_after_validation(
+            user_id, project_id, validation_messages
+        )
 
         # Send email on project progress
         ProjectService.send_email_on_project_progress(validated_dto.project_id)
         task_dtos = TaskDTOs()
-        task_dtos.tasks = dtos
+        task_dtos.tasks = ValidatorService._get_task_dtos(
+            project_id, task_ids, validated_dto.preferred_locale
+        )
 
         return task_dtos
 
@@ -300,10 +287,16 @@ class ValidatorService:
         :raises ValidatorServiceError
         :raises NotFound
         """
+        tasks = {
+            task.id: task
+            for task in Task.get_tasks(
+                project_id, [unlock_task.task_id for unlock_task in unlock_tasks]
+            )
+        }
         tasks_to_unlock = []
         # Loop supplied tasks to check they can all be unlocked
         for unlock_task in unlock_tasks:
-            task = Task.get(unlock_task.task_id, project_id)
+            task = tasks.get(unlock_task.task_id)
 
             if task is None:
                 raise NotFound(
@@ -2,7 +2,7 @@ import os
 import warnings
 import base64
 import csv
-import datetime
+import time
 import click
 from flask_migrate import Migrate
 from dotenv import load_dotenv
@@ -12,9 +12,12 @@ from backend.services.users.authentication_service import AuthenticationService
 from backend.services.users.user_service import UserService
 from backend.services.stats_service import StatsService
 from backend.services.interests_service import InterestService
-from backend.models.postgis.task import Task, TaskHistory
+from backend.services.recommendation_service import ProjectRecommendationService
+from backend.services.messaging.smtp_service import SMTPService
+from backend.models.postgis.task import Task
+from backend.models.postgis.stats_rollup import DailyTaskStats
+from backend.models.postgis.user_stats import UserStats
 
-from sqlalchemy import func
 import atexit
 from apscheduler.schedulers.background import BackgroundScheduler
 
@@ -51,30 +54,40 @@ except Exception:
 migrate = Migrate(application, db)
 
 
-# Job runs once every 2 hours
 @application.cli.command("auto_unlock_tasks")
 def auto_unlock_tasks():
     with application.app_context():
-        # Identify distinct project IDs that were touched in the last 2 hours
-        query = (
-            TaskHistory.query.with_entities(TaskHistory.project_id)
-            .filter(
-                func.DATE(TaskHistory.action_date)
-                > datetime.datetime.utcnow() - datetime.timedelta(minutes=130)
-            )
-            .distinct()
-        )
-        projects = query.all()
-        # For each project update task history for tasks that were not manually unlocked
-        for project in projects:
-            project_id = project[0]
-            Task.auto_unlock_tasks(project_id)
+        # Unlock the expired tasks of all projects at once
+        start_time = time.perf_counter()
+        tasks_unlocked = Task.auto_unlock_tasks()
+        elapsed = time.perf_counter() - start_time
+        print(f"Auto unlocked {tasks_unlocked} tasks in {elapsed:.2f} seconds")
+
+
+def auto_unlock_tasks_job():
+    with application.app_context():
+        Task.auto_unlock_tasks()
+
+
+def refresh_homepage_stats_job():
+    with application.app_context():
+        StatsService.refresh_homepage_stats()
+
+
+def send_queued_emails_job():
+    with application.app_context():
+        SMTPService.send_queued_emails()
 
 
 # Setup a background cron job
 cron = BackgroundScheduler(daemon=True)
 # Initiate the background thread
-cron.add_job(auto_unlock_tasks, "interval", hours=2)
+# Expired locks are found from the index of the locked tasks, tasks read in the meantime are
+# unlocked on read. Sweeps of the workers skip the tasks another sweep is unlocking
+cron.add_job(auto_unlock_tasks_job, "interval", minutes=5, max_instances=1)
+cron.add_job(refresh_homepage_stats_job, "interval", minutes=10)
+# Every worker runs the job, the outbox rows are locked so each email is sent once
+cron.add_job(send_queued_emails_job, "interval", seconds=30, max_instances=1)
 cron.start()
 application.logger.debug("Initiated background thread to auto unlock tasks")
 
@@ -93,17 +106,81 @@ def gen_token(user_id):
 
 
 @application.cli.command("refresh_levels")
-def refresh_levels():
+@click.option("--page-size", type=int, default=1000, help="Users processed per page")
+def refresh_levels(page_size):
     print("Started updating mapper levels...")
-    users_updated = UserService.refresh_mapper_level()
+    users_updated = UserService.refresh_mapper_level(page_size)
     print(f"Updated {users_updated} user mapper levels")
 
 
 @application.cli.command("refresh_project_stats")
-def refresh_project_stats():
+@click.option(
+    "--check",
+    is_flag=True,
+    help="Only report the projects whose task counters have drifted",
+)
+def refresh_project_stats(check):
+    if check:
+        drift = StatsService.get_project_stats_drift()
+        for project_drift in drift:
+            project_id = project_drift.pop("project_id")
+            counters = ", ".join(
+                f"{counter} {stored} != {actual}"
+                for counter, (stored, actual) in project_drift.items()
+            )
+            print(f"Project {project_id}: {counters}")
+        print(f"{len(drift)} projects with drifted task counters")
+        return
+
     print("Started updating project stats...")
-    StatsService.update_all_project_stats()
-    print("Project stats updated")
+    projects_updated = StatsService.update_all_project_stats()
+    print(f"Project stats updated, {projects_updated} projects corrected")
+
+
+@application.cli.command("refresh_homepage_stats")
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Also recompute the AOI area of every project, to repair the stats",
+)
+def refresh_homepage_stats(full):
+    print("Started refreshing homepage stats...")
+    StatsService.refresh_homepage_stats(full)
+    print("Homepage stats refreshed")
+
+
+@application.cli.command("backfill_task_stats")
+def backfill_task_stats():
+    print("Started rebuilding daily task stats from the task history...")
+    rows_created = DailyTaskStats.backfill()
+    print(f"Daily task stats rebuilt, {rows_created} rows created")
+
+
+@application.cli.command("rebuild_user_stats")
+@click.option("-u", "--user_id", type=int, help="Only rebuild the stats of this user")
+def rebuild_user_stats(user_id):
+    print("Started rebuilding user stats from the task history...")
+    users_rebuilt = UserStats.rebuild([user_id] if user_id else None)
+    db.session.commit()
+    print(f"User stats rebuilt for {users_rebuilt} users")
+
+
+@application.cli.command("rebuild_recommendation_index")
+def rebuild_recommendation_index():
+    print("Started rebuilding the project recommendation index...")
+    projects_indexed = ProjectRecommendationService.rebuild_index()
+    db.session.commit()
+    print(f"Recommendation index rebuilt for {projects_indexed} projects")
+
+
+@application.cli.command("send_queued_emails")
+@click.option(
+    "--batch-size", type=int, help="Number of emails sent per SMTP connection"
+)
+def send_queued_emails(batch_size):
+    print("Started sending queued emails...")
+    emails_sent = SMTPService.send_queued_emails(batch_size)
+    print(f"{emails_sent} queued emails sent")
 
 
 @application.cli.command("update_project_categories")
@@ -0,0 +1,45 @@
+"""Precompute task areas and add homepage stats rollups
+
+Revision ID: 3b2f6c1d8a47
+Revises: 6276c258149c
+Create Date: 2026-10-18 09:12:31.402113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "3b2f6c1d8a47"
+down_revision = "6276c258149c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("tasks", sa.Column("area", sa.Float(), nullable=True))
+    op.execute("UPDATE tasks SET area = ST_Area(geometry, True) / 1000000")
+    op.create_table(
+        "project_stats_rollups",
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("total_area", sa.Float(), nullable=False),
+        sa.Column("mapped_area", sa.Float(), nullable=False),
+        sa.Column("validated_area", sa.Float(), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("project_id"),
+    )
+    op.create_table(
+        "stats_rollups",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("data", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade():
+    op.drop_table("stats_rollups")
+    op.drop_table("project_stats_rollups")
+    op.drop_column("tasks", "area")
@@ -0,0 +1,43 @@
+"""Add email outbox
+
+Revision ID: 5e8a0c93d1b6
+Revises: 9d41e7c2b5f3
+Create Date: 2026-10-18 13:05:41.602118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5e8a0c93d1b6"
+down_revision = "9d41e7c2b5f3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("to_address", sa.String(), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("html_message", sa.String(), nullable=True),
+        sa.Column("text_message", sa.String(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("created_date", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_email_outbox_next_attempt_at"),
+        "email_outbox",
+        ["next_attempt_at"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_email_outbox_next_attempt_at"), table_name="email_outbox")
+    op.drop_table("email_outbox")
@@ -0,0 +1,56 @@
+"""Add daily task stats fact table
+
+Revision ID: 9d41e7c2b5f3
+Revises: 3b2f6c1d8a47
+Create Date: 2026-10-18 11:40:05.218734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9d41e7c2b5f3"
+down_revision = "3b2f6c1d8a47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "daily_task_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("action_text", sa.String(), nullable=False),
+        sa.Column("tasks", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("day", "project_id", "action_text"),
+    )
+    op.create_index(
+        op.f("ix_daily_task_stats_project_id"),
+        "daily_task_stats",
+        ["project_id"],
+        unique=False,
+    )
+    # Same aggregation as DailyTaskStats.backfill, counting the first time each task reached a state
+    op.execute(
+        """
+        INSERT INTO daily_task_stats (day, project_id, action_text, tasks)
+        SELECT day, project_id, action_text, count(*)
+        FROM (
+            SELECT DISTINCT ON (project_id, task_id, action_text)
+                project_id, action_text, DATE(action_date) AS day
+            FROM task_history
+            WHERE action = 'STATE_CHANGE'
+                AND action_text IN ('MAPPED', 'VALIDATED', 'BADIMAGERY')
+            ORDER BY project_id, task_id, action_text, action_date
+        ) AS first_state_changes
+        WHERE project_id IS NOT NULL
+        GROUP BY day, project_id, action_text
+        """
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_daily_task_stats_project_id"), table_name="daily_task_stats")
+    op.drop_table("daily_task_stats")
@@ -0,0 +1,61 @@
+"""Add lock duration to task history
+
+Revision ID: a4c7e2f0b813
+Revises: 5e8a0c93d1b6
+Create Date: 2026-10-18 14:22:09.417350
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a4c7e2f0b813"
+down_revision = "5e8a0c93d1b6"
+branch_labels = None
+depends_on = None
+
+lock_duration_actions = sa.text(
+    "action IN ('LOCKED_FOR_MAPPING', 'LOCKED_FOR_VALIDATION', "
+    "'AUTO_UNLOCKED_FOR_MAPPING', 'AUTO_UNLOCKED_FOR_VALIDATION')"
+)
+
+
+def upgrade():
+    op.add_column("task_history", sa.Column("lock_duration", sa.Interval()))
+    # Durations were only stored as HH:MM:SS text in action_text
+    op.execute(
+        """
+        UPDATE task_history
+        SET lock_duration = action_text::interval
+        WHERE action IN (
+            'LOCKED_FOR_MAPPING',
+            'LOCKED_FOR_VALIDATION',
+            'AUTO_UNLOCKED_FOR_MAPPING',
+            'AUTO_UNLOCKED_FOR_VALIDATION'
+        )
+        AND action_text ~ '^[0-9]{2}:[0-9]{2}:[0-9]{2}(\\.[0-9]+)?$'
+        """
+    )
+    op.create_index(
+        "idx_task_history_project_lock_duration",
+        "task_history",
+        ["project_id", "action"],
+        unique=False,
+        postgresql_include=["lock_duration"],
+        postgresql_where=lock_duration_actions,
+    )
+    op.create_index(
+        "idx_task_history_user_lock_duration",
+        "task_history",
+        ["user_id", "action"],
+        unique=False,
+        postgresql_include=["action_date", "lock_duration"],
+        postgresql_where=lock_duration_actions,
+    )
+
+
+def downgrade():
+    op.drop_index("idx_task_history_user_lock_duration", table_name="task_history")
+    op.drop_index("idx_task_history_project_lock_duration", table_name="task_history")
+    op.drop_column("task_history", "lock_duration")
@@ -0,0 +1,57 @@
+"""Add the project recommendation features
+
+Revision ID: b2dbd2911135
+Revises: c81f5d2e9a64
+Create Date: 2026-10-18 17:12:40.218305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b2dbd2911135"
+down_revision = "c81f5d2e9a64"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "project_features",
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("feature", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("project_id", "feature"),
+    )
+    op.create_index(
+        op.f("ix_project_features_feature"),
+        "project_features",
+        ["feature"],
+        unique=False,
+    )
+    # Index the published projects, as ProjectFeature.get_features does. They are reindexed when
+    # they change, `flask rebuild_recommendation_index` rebuilds the index
+    op.execute(
+        """
+        INSERT INTO project_features (project_id, feature)
+        SELECT DISTINCT projects.id, project_features.feature
+        FROM projects,
+        LATERAL (
+            SELECT 'default_locale_' || projects.default_locale
+            UNION ALL SELECT 'difficulty_' || projects.difficulty
+            UNION ALL SELECT 'country_' || projects.country[1]
+            UNION ALL SELECT 'mapping_types_' || UNNEST(projects.mapping_types)
+            UNION ALL SELECT 'categories_' || project_interests.interest_id
+            FROM project_interests
+            WHERE project_interests.project_id = projects.id
+        ) AS project_features (feature)
+        WHERE projects.status = 1
+        AND project_features.feature IS NOT NULL
+        """
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_project_features_feature"), table_name="project_features")
+    op.drop_table("project_features")
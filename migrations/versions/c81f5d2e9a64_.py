@@ -0,0 +1,54 @@
+"""Add per user contribution stats
+
+Revision ID: c81f5d2e9a64
+Revises: a4c7e2f0b813
+Create Date: 2026-10-18 15:48:27.603914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "c81f5d2e9a64"
+down_revision = "a4c7e2f0b813"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Profiles are built from the task history on first view, run `flask rebuild_user_stats`
+    # after upgrading to build them all at once, see docs/sysadmins/migration.md
+    op.create_table(
+        "user_stats",
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("tasks_mapped", sa.Integer(), nullable=False),
+        sa.Column("tasks_validated", sa.Integer(), nullable=False),
+        sa.Column("tasks_invalidated", sa.Integer(), nullable=False),
+        sa.Column("tasks_validated_by_others", sa.Integer(), nullable=False),
+        sa.Column("tasks_invalidated_by_others", sa.Integer(), nullable=False),
+        sa.Column("time_spent_mapping", sa.Interval(), nullable=False),
+        sa.Column("time_spent_validating", sa.Interval(), nullable=False),
+        sa.Column(
+            "countries_mapped",
+            postgresql.JSONB(astext_type=sa.Text()),
+            nullable=False,
+        ),
+        sa.Column(
+            "countries_validated",
+            postgresql.JSONB(astext_type=sa.Text()),
+            nullable=False,
+        ),
+        sa.Column(
+            "contributions_by_day",
+            postgresql.JSONB(astext_type=sa.Text()),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("user_stats")
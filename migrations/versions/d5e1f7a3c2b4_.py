@@ -0,0 +1,63 @@
+"""Add the lock expiry of tasks
+
+Revision ID: d5e1f7a3c2b4
+Revises: b2dbd2911135
+Create Date: 2026-10-18 19:05:31.842113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+from backend.models.postgis.utils import parse_duration
+
+
+# revision identifiers, used by Alembic.
+revision = "d5e1f7a3c2b4"
+down_revision = "b2dbd2911135"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("tasks", sa.Column("lock_expires_at", sa.DateTime()))
+    # Current locks expire the auto-unlock delta after their last lock or extension, or at
+    # once if their history is missing
+    op.execute(
+        sa.text(
+            """
+            UPDATE tasks
+            SET lock_expires_at = COALESCE(
+                (
+                    SELECT MAX(task_history.action_date)
+                    FROM task_history
+                    WHERE task_history.project_id = tasks.project_id
+                    AND task_history.task_id = tasks.id
+                    AND task_history.action_text IS NULL
+                    AND task_history.action IN (
+                        'LOCKED_FOR_MAPPING',
+                        'LOCKED_FOR_VALIDATION',
+                        'EXTENDED_FOR_MAPPING',
+                        'EXTENDED_FOR_VALIDATION'
+                    )
+                ) + :expiry_delta,
+                NOW() AT TIME ZONE 'UTC'
+            )
+            WHERE task_status IN (1, 3)
+            """
+        ).bindparams(
+            expiry_delta=parse_duration(current_app.config["TASK_AUTOUNLOCK_AFTER"])
+        )
+    )
+    op.create_index(
+        "idx_tasks_lock_expires_at",
+        "tasks",
+        ["lock_expires_at"],
+        unique=False,
+        postgresql_where=sa.text("lock_expires_at IS NOT NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index("idx_tasks_lock_expires_at", table_name="tasks")
+    op.drop_column("tasks", "lock_expires_at")
@@ -0,0 +1,87 @@
+"""Keep the unread message counters of users on their notifications
+
+Revision ID: e8a2c4f6b1d9
+Revises: d5e1f7a3c2b4
+Create Date: 2026-10-18 21:42:17.306154
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e8a2c4f6b1d9"
+down_revision = "d5e1f7a3c2b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Counters are kept on a single row per user, the last checked one is kept
+    op.execute(
+        """
+        DELETE FROM notifications
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT
+                    id,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY user_id ORDER BY date DESC NULLS LAST, id DESC
+                    ) AS row_number
+                FROM notifications
+            ) AS user_notifications
+            WHERE row_number > 1
+        )
+        """
+    )
+    op.drop_index("ix_notifications_user_id", table_name="notifications")
+    op.create_index(
+        "ix_notifications_user_id", "notifications", ["user_id"], unique=True
+    )
+    op.add_column(
+        "notifications",
+        sa.Column("new_unread_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    # Users with messages that never checked their notifications see the last 30 days as new
+    op.execute(
+        """
+        INSERT INTO notifications (user_id, unread_count, new_unread_count, date)
+        SELECT DISTINCT to_user_id, 0, 0, NOW() AT TIME ZONE 'UTC' - INTERVAL '30 days'
+        FROM messages
+        WHERE to_user_id IS NOT NULL
+        AND NOT read
+        AND NOT EXISTS (
+            SELECT 1 FROM notifications WHERE notifications.user_id = messages.to_user_id
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE notifications
+        SET unread_count = COALESCE(unread_messages.unread_count, 0),
+            new_unread_count = COALESCE(unread_messages.new_unread_count, 0)
+        FROM notifications AS user_notifications
+        LEFT JOIN (
+            SELECT
+                messages.to_user_id,
+                COUNT(*) AS unread_count,
+                COUNT(*) FILTER (
+                    WHERE messages.date > checked_notifications.date
+                ) AS new_unread_count
+            FROM messages
+            JOIN notifications AS checked_notifications
+            ON checked_notifications.user_id = messages.to_user_id
+            WHERE NOT messages.read
+            GROUP BY messages.to_user_id
+        ) AS unread_messages ON unread_messages.to_user_id = user_notifications.user_id
+        WHERE notifications.id = user_notifications.id
+        """
+    )
+
+
+def downgrade():
+    op.drop_column("notifications", "new_unread_count")
+    op.drop_index("ix_notifications_user_id", table_name="notifications")
+    op.create_index(
+        "ix_notifications_user_id", "notifications", ["user_id"], unique=False
+    )
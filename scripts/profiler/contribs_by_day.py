@@ -0,0 +1,53 @@
+"""
+Benchmark of the contributions timeline behind /projects/<id>/contributions/queries/day/
+
+Replays synthetic state changes of a multi-year project, growing up to 500k events, and prints
+the time per event which stays flat as the timeline is computed in a single pass.
+
+Run from the repository root, with it on the PYTHONPATH:
+    PYTHONPATH=. python scripts/profiler/contribs_by_day.py
+"""
+import datetime
+import random
+import time
+
+from backend.services.project_service import ProjectService
+
+EVENT_COUNTS = [62_500, 125_000, 250_000, 500_000]
+DAYS = 3 * 365
+STATES = ["MAPPED", "VALIDATED", "INVALIDATED"]
+
+
+def synthetic_stats(event_count: int) -> list:
+    """(action_text, day, task_id) rows as returned by the query, in the same order"""
+    rng = random.Random(event_count)
+    first_day = datetime.date(2020, 1, 1)
+    task_count = max(event_count // 5, 1)
+    stats = {
+        (
+            rng.choice(STATES),
+            first_day + datetime.timedelta(days=rng.randrange(DAYS)),
+            rng.randrange(task_count),
+        )
+        for _ in range(event_count)
+    }
+    # Ordered by day, action_text desc, task_id desc like the query
+    stats = sorted(stats, key=lambda row: (row[0], row[2]), reverse=True)
+    return sorted(stats, key=lambda row: row[1])
+
+
+def main():
+    print(f"{'events':>10} {'days':>6} {'seconds':>9} {'us/event':>9}")
+    for event_count in EVENT_COUNTS:
+        stats = synthetic_stats(event_count)
+        started = time.perf_counter()
+        timeline = ProjectService._get_contribs_timeline(stats, len(stats))
+        elapsed = time.perf_counter() - started
+        print(
+            f"{len(stats):>10} {len(timeline):>6} {elapsed:>9.3f} "
+            f"{elapsed / len(stats) * 1e6:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
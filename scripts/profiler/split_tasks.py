@@ -0,0 +1,80 @@
+"""
+Benchmark of the geometry computations behind /projects/{project_id}/tasks/actions/split/{task_id}/
+
+Splits square tasks of the OSM tile grid and non square tasks clipped to an AOI, and prints the
+time per split. No database is configured, so any database round trip would fail the benchmark.
+
+Run from the repository root, with it on the PYTHONPATH:
+    PYTHONPATH=. python scripts/profiler/split_tasks.py
+"""
+import math
+import time
+
+from geoalchemy2 import shape
+from shapely.geometry import MultiPolygon, Polygon
+
+from backend.models.postgis.task import Task
+from backend.services.grid.split_service import SplitService
+
+SPLIT_COUNT = 2_000
+ZOOMS = [12, 15, 17]
+# Vertices of the outline of the non square tasks
+TASK_VERTICES = 200
+
+
+def square_tasks(zoom: int) -> list:
+    """Tasks of the tile grid around the center of the map"""
+    tasks = []
+    for index in range(SPLIT_COUNT):
+        task = Task()
+        task.is_square = True
+        task.x = 2 ** (zoom - 1) + index % 50
+        task.y = 2 ** (zoom - 1) + index // 50
+        task.zoom = zoom
+        tasks.append(task)
+    return tasks
+
+
+def non_square_tasks() -> list:
+    """Tasks with a round outline, as the tiles clipped to a coastline"""
+    tasks = []
+    for index in range(SPLIT_COUNT):
+        center_x, center_y = index % 50 * 0.01, index // 50 * 0.01
+        outline = [
+            (
+                center_x + 0.004 * math.cos(2 * math.pi * vertex / TASK_VERTICES),
+                center_y + 0.004 * math.sin(2 * math.pi * vertex / TASK_VERTICES),
+            )
+            for vertex in range(TASK_VERTICES)
+        ]
+        task = Task()
+        task.is_square = False
+        task.geometry = shape.from_shape(MultiPolygon([Polygon(outline)]), 4326)
+        tasks.append(task)
+    return tasks
+
+
+def time_splits(tasks: list) -> float:
+    started = time.perf_counter()
+    for task in tasks:
+        SplitService._create_split_tasks(task.x, task.y, task.zoom, task)
+    return time.perf_counter() - started
+
+
+def main():
+    print(f"{'tasks':>12} {'splits':>8} {'seconds':>9} {'us/split':>9}")
+    for zoom in ZOOMS:
+        elapsed = time_splits(square_tasks(zoom))
+        print(
+            f"{f'zoom {zoom}':>12} {SPLIT_COUNT:>8} {elapsed:>9.3f} "
+            f"{elapsed / SPLIT_COUNT * 1e6:>9.1f}"
+        )
+    elapsed = time_splits(non_square_tasks())
+    print(
+        f"{'non square':>12} {SPLIT_COUNT:>8} {elapsed:>9.3f} "
+        f"{elapsed / SPLIT_COUNT * 1e6:>9.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark of the grid trimming behind /projects/actions/intersecting-tiles/
+
+Trims square grids of up to 40k tiles to a jagged AOI of 5k vertices, as drawn or imported in
+the project creation wizard, and prints the time per tile with and without clipping the tiles.
+
+Run from the repository root, with it on the PYTHONPATH:
+    PYTHONPATH=. python scripts/profiler/trim_grid_to_aoi.py
+"""
+import math
+import random
+import time
+
+from backend.models.dtos.grid_dto import GridDTO
+from backend.services.grid.grid_service import GridService
+
+TILE_COUNTS = [2_500, 10_000, 40_000]
+AOI_VERTICES = 5_000
+# Side of a zoom 17 tile in meters, the AOI spans the grid
+TILE_SIZE = 305.7481
+
+
+def synthetic_aoi(radius: float) -> dict:
+    """Lobed polygon with a jagged outline like a coastline, centered on the origin"""
+    rng = random.Random(AOI_VERTICES)
+    ring = []
+    for vertex in range(AOI_VERTICES):
+        angle = 2 * math.pi * vertex / AOI_VERTICES
+        distance = radius * (0.85 + 0.1 * math.sin(5 * angle)) * rng.uniform(0.99, 1)
+        ring.append([distance * math.cos(angle), distance * math.sin(angle)])
+    ring.append(ring[0])
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+                "properties": {},
+            }
+        ],
+    }
+
+
+def synthetic_grid(tiles_per_side: int) -> dict:
+    """Square grid centered on the origin, with the feature properties of the wizard grid"""
+    origin = -tiles_per_side * TILE_SIZE / 2
+    features = []
+    for x in range(tiles_per_side):
+        for y in range(tiles_per_side):
+            min_x = origin + x * TILE_SIZE
+            min_y = origin + y * TILE_SIZE
+            square = [
+                [min_x, min_y],
+                [min_x, min_y + TILE_SIZE],
+                [min_x + TILE_SIZE, min_y + TILE_SIZE],
+                [min_x + TILE_SIZE, min_y],
+                [min_x, min_y],
+            ]
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "MultiPolygon", "coordinates": [[square]]},
+                    "properties": {"x": x, "y": y, "zoom": 17, "isSquare": True},
+                }
+            )
+    return {"type": "FeatureCollection", "features": features}
+
+
+def main():
+    print(f"{'tiles':>8} {'clip':>6} {'kept':>8} {'seconds':>9} {'us/tile':>9}")
+    for tile_count in TILE_COUNTS:
+        tiles_per_side = int(math.sqrt(tile_count))
+        grid = synthetic_grid(tiles_per_side)
+        aoi = synthetic_aoi(tiles_per_side * TILE_SIZE / 2)
+        for clip_to_aoi in (False, True):
+            grid_dto = GridDTO(
+                {"areaOfInterest": aoi, "grid": grid, "clipToAoi": clip_to_aoi}
+            )
+            started = time.perf_counter()
+            trimmed_grid = GridService.trim_grid_to_aoi(grid_dto)
+            elapsed = time.perf_counter() - started
+            tiles = len(grid["features"])
+            print(
+                f"{tiles:>8} {str(clip_to_aoi):>6} {len(trimmed_grid['features']):>8} "
+                f"{elapsed:>9.3f} {elapsed / tiles * 1e6:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ import os
 from typing import Optional
 from shapely.geometry import shape
 from backend import create_app, db
+from backend.services.cache_service import CacheService
 import geojson
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
@@ -56,6 +57,7 @@ class BaseTestCase(unittest.TestCase):
         self.app_context = self.app.app_context()
         self.app_context.push()
         clean_db(self.db)
+        CacheService.clear()
 
     def tearDown(self):
         super(BaseTestCase, self).tearDown()
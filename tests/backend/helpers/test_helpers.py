@@ -4,6 +4,8 @@ import json
 import os
 from typing import Tuple
 import xml.etree.ElementTree as ET
+from sqlalchemy import event
+from backend import db
 from backend.models.dtos.organisation_dto import (
     UpdateOrganisationDTO,
 )
@@ -143,17 +145,9 @@ def get_canned_user(username: str) -> User:
     return test_user
 
 
-def create_canned_project(name=TEST_PROJECT_NAME) -> Tuple[Project, User]:
-    """Generates a canned project in the DB to help with integration tests"""
+def return_canned_draft_project(name=TEST_PROJECT_NAME) -> Project:
+    """Returns a canned draft project without tasks, authored by the canned user"""
     test_aoi_geojson = geojson.loads(json.dumps(get_canned_json("test_aoi.json")))
-
-    task_feature = geojson.loads(json.dumps(get_canned_json("splittable_task.json")))
-    task_non_square_feature = geojson.loads(
-        json.dumps(get_canned_json("non_square_task.json"))
-    )
-    task_arbitrary_feature = geojson.loads(
-        json.dumps(get_canned_json("splittable_task.json"))
-    )
     test_user = get_canned_user(TEST_USERNAME)
     if test_user is None:
         test_user = create_canned_user()
@@ -165,7 +159,20 @@ def create_canned_project(name=TEST_PROJECT_NAME) -> Tuple[Project, User]:
     test_project = Project()
     test_project.create_draft_project(test_project_dto)
     test_project.set_project_aoi(test_project_dto)
-    test_project.total_tasks = 3
+    return test_project
+
+
+def create_canned_project(name=TEST_PROJECT_NAME) -> Tuple[Project, User]:
+    """Generates a canned project in the DB to help with integration tests"""
+    task_feature = geojson.loads(json.dumps(get_canned_json("splittable_task.json")))
+    task_non_square_feature = geojson.loads(
+        json.dumps(get_canned_json("non_square_task.json"))
+    )
+    task_arbitrary_feature = geojson.loads(
+        json.dumps(get_canned_json("splittable_task.json"))
+    )
+    test_project = return_canned_draft_project(name)
+    test_user = get_canned_user(TEST_USERNAME)
 
     # Setup test task
     test_task = Task.from_geojson_feature(1, task_feature)
@@ -390,3 +397,22 @@ def create_canned_notification(user_id, unread_count, date) -> Notification:
     test_notification.date = date
     test_notification.save()
     return test_notification
+
+
+class QueryCounter:
+    """Context manager counting the SQL statements sent to the database"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def _count_query(self, connection, cursor, statement, *args, **kwargs):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(db.engine, "before_cursor_execute", self._count_query)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(db.engine, "before_cursor_execute", self._count_query)
@@ -476,3 +476,39 @@ class TestNotificationsQueriesPostUnreadAPI(BaseTestCase):
         response_body = response.get_json()
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response_body, 1)
+
+
+class TestNotificationsQueriesStreamUnreadAPI(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_user = create_canned_user()
+        self.test_user_token = generate_encoded_token(self.test_user.id)
+        self.url = "/api/v2/notifications/queries/own/stream-unread/"
+        self.test_message = create_canned_message(
+            subject=TEST_SUBJECT, message=TEST_MESSAGE
+        )
+        self.test_message.to_user_id = self.test_user.id
+
+    def test_stream_unread_count_returns_401(self):
+        """
+        Test that endpoint returns 401 when an unauthenticated user wants to stream the unread count
+        """
+        response = self.client.get(self.url)
+        response_body = response.get_json()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response_body["SubCode"], "InvalidToken")
+
+    def test_stream_unread_count_starts_with_current_count(self):
+        """
+        Test that the stream sends the current unread count of the authenticated user first
+        """
+        response = self.client.get(
+            self.url,
+            headers={"Authorization": self.test_user_token},
+            buffered=False,
+        )
+        first_event = next(response.iter_encoded())
+        response.close()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.assertEqual(first_event, b'data: {"newMessages": true, "unread": 1}\n\n')
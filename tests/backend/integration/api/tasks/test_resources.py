@@ -1,3 +1,4 @@
+import gzip
 import xml.etree.ElementTree as ET
 
 from tests.backend.base import BaseTestCase
@@ -292,6 +293,67 @@ class TestTasksQueriesGpxAPI(BaseTestCase):
             f"attachment; filename=HOT-project-{self.test_project.id}.gpx",
         )
 
+    def test_returns_gzip_compressed_gpx_if_accepted(self):
+        """Test that the GPX is gzip compressed if the client accepts it."""
+        # Act
+        response = self.client.get(
+            self.url + "?tasks=1", headers={"Accept-Encoding": "gzip"}
+        )
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        response_xml = ET.fromstring(gzip.decompress(response.get_data()))
+        trk = response_xml.find("gpx:trk", {"gpx": "http://www.topografix.com/GPX/1/1"})
+        self.assertEqual(len(trk), 2)  # name and the trkseg of task 1
+
+
+class TestTasksQueriesTileAPI(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_project, self.test_author = create_canned_project()
+        self.url = f"/api/v2/projects/{self.test_project.id}/tasks/tiles/0/0/0.mvt"
+
+    def test_returns_404_if_project_does_not_exist(self):
+        """Test that a 404 is returned if the project does not exist."""
+        # Act
+        response = self.client.get("/api/v2/projects/11111/tasks/tiles/0/0/0.mvt")
+        # Assert
+        self.assertEqual(response.status_code, 404)
+
+    def test_returns_400_if_tile_is_out_of_range(self):
+        """Test that a 400 is returned if the tile doesn't exist at the zoom level."""
+        # Act
+        response = self.client.get(
+            f"/api/v2/projects/{self.test_project.id}/tasks/tiles/1/2/0.mvt"
+        )
+        # Assert
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["SubCode"], "InvalidData")
+
+    def test_returns_vector_tile(self):
+        """Test that the tasks are returned as a vector tile."""
+        # Act
+        response = self.client.get(self.url)
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.headers["Content-Type"], "application/vnd.mapbox-vector-tile"
+        )
+        self.assertIn(b"tasks", response.data)
+        self.assertIn(b"MAPPED", response.data)
+
+    def test_tile_is_refreshed_when_task_state_changes(self):
+        """Test that the cached tile is invalidated when a task in it changes state."""
+        # Arrange
+        tile = self.client.get(self.url).data
+        task = Task.get(1, self.test_project.id)
+        # Act
+        task.lock_task_for_validating(self.test_author.id)
+        refreshed_tile = self.client.get(self.url).data
+        # Assert
+        self.assertNotEqual(tile, refreshed_tile)
+        self.assertIn(b"LOCKED_FOR_VALIDATION", refreshed_tile)
+
 
 class TestTasksQueriesXmlAPI(BaseTestCase):
     def setUp(self):
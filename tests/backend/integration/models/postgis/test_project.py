@@ -42,6 +42,24 @@ class TestProject(BaseTestCase):
             self.test_project.total_tasks, len(feature_collection.features)
         )
 
+    def test_streamed_feature_collection_matches_feature_collection(self):
+        self.test_project, self.test_user = create_canned_project()
+        # Act
+        feature_collection = Task.get_tasks_as_geojson_feature_collection(
+            self.test_project.id, None
+        )
+        chunks = list(
+            Task.stream_tasks_as_geojson_feature_collection(
+                self.test_project.id, None, batch_size=2
+            )
+        )
+        # Assert
+        self.assertGreater(len(chunks), 2)
+        streamed = geojson.loads("".join(chunks))
+        self.assertDeepAlmostEqual(
+            geojson.loads(geojson.dumps(feature_collection)), streamed
+        )
+
     def test_project_can_be_generated_as_dto(self):
         self.test_project, self.test_user = create_canned_project()
         # Arrange
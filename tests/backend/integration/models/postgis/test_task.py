@@ -0,0 +1,172 @@
+import datetime
+
+from backend import db
+from backend.models.postgis.statuses import TaskStatus
+from backend.models.postgis.task import Task, TaskAction, TaskHistory
+from backend.models.postgis.utils import InvalidData
+from tests.backend.base import BaseTestCase
+from tests.backend.helpers.test_helpers import (
+    create_canned_project,
+    get_canned_json,
+    return_canned_draft_project,
+)
+
+
+class TestTaskAutoUnlock(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_project, self.test_author = create_canned_project()
+        self.expired_date = (
+            datetime.datetime.utcnow()
+            - Task.auto_unlock_delta()
+            - datetime.timedelta(hours=1)
+        )
+
+    def expire_lock(self, task_id: int):
+        TaskHistory.query.filter_by(
+            project_id=self.test_project.id, task_id=task_id
+        ).update({"action_date": self.expired_date})
+        Task.query.filter_by(project_id=self.test_project.id, id=task_id).update(
+            {"lock_expires_at": self.expired_date + Task.auto_unlock_delta()}
+        )
+        db.session.commit()
+
+    def test_auto_unlock_tasks_unlocks_expired_tasks(self):
+        # Arrange
+        task = Task.get(1, self.test_project.id)
+        task.lock_task_for_mapping(self.test_author.id)
+        self.expire_lock(1)
+        task = Task.get(3, self.test_project.id)
+        task.set_task_history(
+            TaskAction.STATE_CHANGE, self.test_author.id, new_state=TaskStatus.MAPPED
+        )
+        task.lock_task_for_validating(self.test_author.id)
+        self.expire_lock(3)
+        task = Task.get(2, self.test_project.id)
+        task.lock_task_for_mapping(self.test_author.id)
+
+        # Act
+        tasks_unlocked = Task.auto_unlock_tasks()
+
+        # Assert
+        self.assertEqual(tasks_unlocked, 2)
+        mapping_task = Task.get(1, self.test_project.id)
+        self.assertEqual(mapping_task.task_status, TaskStatus.READY.value)
+        self.assertIsNone(mapping_task.locked_by)
+        last_action = TaskHistory.get_last_action(self.test_project.id, 1)
+        self.assertEqual(last_action.action, TaskAction.AUTO_UNLOCKED_FOR_MAPPING.name)
+        self.assertIsNotNone(last_action.action_text)
+        self.assertEqual(last_action.lock_duration, Task.auto_unlock_delta())
+        validation_task = Task.get(3, self.test_project.id)
+        self.assertEqual(validation_task.task_status, TaskStatus.MAPPED.value)
+        self.assertIsNone(validation_task.locked_by)
+        locked_task = Task.get(2, self.test_project.id)
+        self.assertEqual(locked_task.task_status, TaskStatus.LOCKED_FOR_MAPPING.value)
+        self.assertEqual(locked_task.locked_by, self.test_author.id)
+
+    def test_auto_unlock_tasks_only_unlocks_requested_project(self):
+        # Arrange
+        task = Task.get(1, self.test_project.id)
+        task.lock_task_for_mapping(self.test_author.id)
+        self.expire_lock(1)
+
+        # Act
+        tasks_unlocked = Task.auto_unlock_tasks(self.test_project.id + 1)
+
+        # Assert
+        self.assertEqual(tasks_unlocked, 0)
+        task = Task.get(1, self.test_project.id)
+        self.assertEqual(task.task_status, TaskStatus.LOCKED_FOR_MAPPING.value)
+
+    def test_lock_task_for_mapping_sets_lock_expiry(self):
+        # Arrange
+        task = Task.get(2, self.test_project.id)
+
+        # Act
+        task.lock_task_for_mapping(self.test_author.id)
+
+        # Assert
+        task = Task.get(2, self.test_project.id)
+        self.assertAlmostEqual(
+            task.lock_expires_at,
+            datetime.datetime.utcnow() + Task.auto_unlock_delta(),
+            delta=datetime.timedelta(minutes=1),
+        )
+        task.unlock_task(self.test_author.id, TaskStatus.READY)
+        self.assertIsNone(Task.get(2, self.test_project.id).lock_expires_at)
+
+    def test_unlock_if_expired_unlocks_read_task(self):
+        # Arrange
+        task = Task.get(2, self.test_project.id)
+        task.lock_task_for_mapping(self.test_author.id)
+        self.expire_lock(2)
+        task = Task.get(2, self.test_project.id)
+
+        # Act
+        unlocked = task.unlock_if_expired()
+
+        # Assert
+        self.assertTrue(unlocked)
+        self.assertEqual(task.task_status, TaskStatus.READY.value)
+        self.assertIsNone(task.locked_by)
+        self.assertIsNone(task.lock_expires_at)
+        last_action = TaskHistory.get_last_action(self.test_project.id, 2)
+        self.assertEqual(last_action.action, TaskAction.AUTO_UNLOCKED_FOR_MAPPING.name)
+
+    def test_unlock_if_expired_keeps_current_lock(self):
+        # Arrange
+        task = Task.get(2, self.test_project.id)
+        task.lock_task_for_mapping(self.test_author.id)
+
+        # Act
+        unlocked = task.unlock_if_expired()
+
+        # Assert
+        self.assertFalse(unlocked)
+        task = Task.get(2, self.test_project.id)
+        self.assertEqual(task.task_status, TaskStatus.LOCKED_FOR_MAPPING.value)
+        self.assertEqual(task.locked_by, self.test_author.id)
+
+
+class TestTaskInsertFromGeojsonFeatures(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_project = return_canned_draft_project()
+        db.session.add(self.test_project)
+        db.session.flush()
+
+    def test_insert_from_geojson_features_inserts_tasks_in_batches(self):
+        # Arrange
+        task_feature = get_canned_json("splittable_task.json")
+        task_feature["properties"]["extra_properties"] = {"name": "test"}
+
+        # Act
+        task_count = Task.insert_from_geojson_features(
+            self.test_project.id, [task_feature] * 5, batch_size=2
+        )
+        db.session.commit()
+
+        # Assert
+        self.assertEqual(task_count, 5)
+        tasks = (
+            Task.query.filter_by(project_id=self.test_project.id)
+            .order_by(Task.id)
+            .all()
+        )
+        self.assertEqual([task.id for task in tasks], [1, 2, 3, 4, 5])
+        for task in tasks:
+            self.assertEqual(task.task_status, TaskStatus.READY.value)
+            self.assertEqual(task.extra_properties, '{"name": "test"}')
+            self.assertGreater(task.area, 0)
+
+    def test_insert_from_geojson_features_raises_error_on_invalid_feature(self):
+        # Arrange
+        task_feature = get_canned_json("splittable_task.json")
+        invalid_task_feature = get_canned_json("splittable_task.json")
+        del invalid_task_feature["properties"]["x"]
+
+        # Act / Assert
+        with self.assertRaises(InvalidData):
+            Task.insert_from_geojson_features(
+                self.test_project.id, [task_feature, invalid_task_feature]
+            )
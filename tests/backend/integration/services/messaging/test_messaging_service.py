@@ -7,6 +7,7 @@ from backend.models.postgis.message import MessageType, Message, NotFound
 from backend.models.postgis.task import Task
 from backend.services.messaging.smtp_service import SMTPService
 from tests.backend.helpers.test_helpers import (
+    QueryCounter,
     add_manager_to_organisation,
     create_canned_organisation,
     return_canned_user,
@@ -96,6 +97,38 @@ class TestMessageService(BaseTestCase):
         # Assert
         mock_push_message.assert_called()
 
+    def test_send_message_after_comment_query_count_is_constant(self):
+        # Arrange
+        canned_project, canned_author = create_canned_project()
+        canned_project = update_project_with_info(canned_project)
+        for i in range(3):
+            return_canned_user(f"mentioned_{i}", 4000 + i).create()
+
+        # Act
+        MessageService.send_message_after_comment(
+            canned_author.id, "@mentioned_0 Warm up", 1, canned_project.id
+        )
+        with QueryCounter() as single_mention:
+            MessageService.send_message_after_comment(
+                canned_author.id, "@mentioned_0 Test message", 1, canned_project.id
+            )
+        with QueryCounter() as multiple_mentions:
+            MessageService.send_message_after_comment(
+                canned_author.id,
+                "@mentioned_0 @mentioned_1 @mentioned_2 @unknown_user Test message",
+                1,
+                canned_project.id,
+            )
+
+        # Assert
+        for i in range(3):
+            messages = Message.query.filter(
+                Message.to_user_id == 4000 + i,
+                Message.message_type == MessageType.MENTION_NOTIFICATION.value,
+            ).all()
+            self.assertEqual(len(messages), 3 if i == 0 else 1)
+        self.assertEqual(single_mention.count, multiple_mentions.count)
+
     @patch.object(SMTPService, "_send_message")
     def test_send_project_transfer_messgae(self, mock_send_message):
         test_project, test_author = create_canned_project()
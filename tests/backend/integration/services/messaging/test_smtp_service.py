@@ -3,6 +3,8 @@ from urllib.parse import urlparse, parse_qs
 from unittest.mock import patch, MagicMock
 from flask import current_app
 
+from backend import db
+from backend.models.postgis.email_outbox import EmailOutbox
 from backend.models.postgis.message import Message
 from backend.models.postgis.statuses import EncouragingEmailType
 from backend.services.messaging.smtp_service import SMTPService
@@ -205,3 +207,89 @@ class TestSMTPService(BaseTestCase):
             EncouragingEmailType.PROJECT_PROGRESS.value, 1, "test", 50
         )
         mock_send_message.assert_called()
+
+    def queue_emails(self, count: int):
+        for _ in range(count):
+            SMTPService.queue_message(self.to_address, self.subject, self.content)
+        db.session.commit()
+
+    def send_queued_emails(self):
+        """Sends the queued emails with SMTP enabled and without rate limit"""
+        log_level = current_app.config["LOG_LEVEL"]
+        rate_limit = current_app.config["MAIL_OUTBOX_RATE_LIMIT"]
+        current_app.config["LOG_LEVEL"] = "INFO"
+        current_app.config["MAIL_OUTBOX_RATE_LIMIT"] = 0
+        try:
+            return SMTPService.send_queued_emails()
+        finally:
+            current_app.config["LOG_LEVEL"] = log_level
+            current_app.config["MAIL_OUTBOX_RATE_LIMIT"] = rate_limit
+
+    def test_send_email_alert_queues_email(self):
+        # Act
+        sent_alert = SMTPService.send_email_alert(
+            to_address=self.to_address,
+            username=self.to_username,
+            user_email_verified=True,
+            message_id=self.message_id,
+            from_username=self.from_username,
+            project_id=self.project_id,
+            project_name=self.project_name,
+            task_id=self.task_id,
+            subject=self.subject,
+            content=self.content,
+            message_type=self.message_type,
+        )
+        db.session.commit()
+
+        # Assert
+        self.assertTrue(sent_alert)
+        queued_email = EmailOutbox.query.one()
+        self.assertEqual(queued_email.to_address, self.to_address)
+        self.assertEqual(queued_email.subject, self.subject)
+
+    @patch("backend.services.messaging.smtp_service.mail")
+    def test_send_queued_emails_uses_one_connection(self, mock_mail):
+        # Arrange
+        self.queue_emails(3)
+        connection = mock_mail.connect.return_value.__enter__.return_value
+
+        # Act
+        emails_sent = self.send_queued_emails()
+
+        # Assert
+        self.assertEqual(emails_sent, 3)
+        mock_mail.connect.assert_called_once()
+        self.assertEqual(connection.send.call_count, 3)
+        self.assertEqual(EmailOutbox.query.count(), 0)
+
+    @patch("backend.services.messaging.smtp_service.mail")
+    def test_send_queued_emails_retries_failed_emails_later(self, mock_mail):
+        # Arrange
+        self.queue_emails(2)
+        connection = mock_mail.connect.return_value.__enter__.return_value
+        connection.send.side_effect = [Exception("Mailbox unavailable"), None]
+
+        # Act
+        emails_sent = self.send_queued_emails()
+        emails_sent_on_retry = self.send_queued_emails()
+
+        # Assert
+        self.assertEqual(emails_sent, 1)
+        self.assertEqual(emails_sent_on_retry, 0)
+        failed_email = EmailOutbox.query.one()
+        self.assertEqual(failed_email.attempts, 1)
+        self.assertEqual(failed_email.last_error, "Mailbox unavailable")
+
+    @patch("backend.services.messaging.smtp_service.mail")
+    def test_send_queued_emails_keeps_emails_if_smtp_unreachable(self, mock_mail):
+        # Arrange
+        self.queue_emails(2)
+        mock_mail.connect.return_value.__enter__.side_effect = ConnectionRefusedError()
+
+        # Act
+        emails_sent = self.send_queued_emails()
+
+        # Assert
+        self.assertEqual(emails_sent, 0)
+        self.assertEqual([email.attempts for email in EmailOutbox.query.all()], [1, 1])
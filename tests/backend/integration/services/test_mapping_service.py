@@ -1,7 +1,7 @@
 import datetime
 import xml.etree.ElementTree as ET
-from unittest.mock import patch
-from backend.services.mapping_service import MappingService, Task
+from backend.exceptions import NotFound
+from backend.services.mapping_service import MappingService
 from backend.models.postgis.task import TaskStatus
 from tests.backend.base import BaseTestCase
 from tests.backend.helpers.test_helpers import create_canned_project
@@ -19,18 +19,17 @@ class TestMappingService(BaseTestCase):
         super().setUp()
         self.test_project, self.test_user = create_canned_project()
 
-    @patch.object(Task, "get_tasks")
-    def test_generate_gpx(self, mock_task):
+    def test_generate_gpx(self):
         # Create a sample project ID and task IDs string
-        project_id = 1
-        task_ids_str = "1,2"
-        task = Task.get(1, self.test_project.id)
-        mock_task.return_value = [task]
+        project_id = self.test_project.id
+        task_ids_str = "1"
 
         timestamp = datetime.datetime(2017, 4, 13)
 
         # Call the generate_gpx function with some test data
-        xml_str = MappingService.generate_gpx(1, task_ids_str, timestamp)
+        xml_str = b"".join(
+            MappingService.generate_gpx(project_id, task_ids_str, timestamp)
+        )
 
         # Parse the XML string and retrieve the root element
         root = ET.fromstring(xml_str)
@@ -84,15 +83,13 @@ class TestMappingService(BaseTestCase):
             self.assertIn("lat", wpt.attrib)
             self.assertIn("lon", wpt.attrib)
 
-    @patch.object(Task, "get_tasks")
-    def test_generate_osm_xml(self, mock_task):
+    def test_generate_osm_xml(self):
         # Test with a single task
         task_ids_str = "1"
-        task_1 = Task.get(1, self.test_project.id)
-        task_2 = Task.get(2, self.test_project.id)
-        mock_task.return_value = [task_1]
 
-        xml = MappingService.generate_osm_xml(1, task_ids_str)
+        xml = b"".join(
+            MappingService.generate_osm_xml(self.test_project.id, task_ids_str)
+        )
         self.assertIsNotNone(xml)
 
         # Assert that the generated XML is in the correct format
@@ -110,8 +107,9 @@ class TestMappingService(BaseTestCase):
 
         # Test with multiple tasks
         task_ids_str = "1,2"
-        mock_task.return_value = [task_1, task_2]
-        xml = MappingService.generate_osm_xml(1, task_ids_str)
+        xml = b"".join(
+            MappingService.generate_osm_xml(self.test_project.id, task_ids_str)
+        )
         self.assertIsNotNone(xml)
 
         # Assert that the generated XML is in the correct format
@@ -127,6 +125,11 @@ class TestMappingService(BaseTestCase):
         ways = root.findall("./way")
         self.assertEqual(len(ways), 2)
 
+    def test_generate_osm_xml_raises_not_found_before_streaming(self):
+        # Act/Assert
+        with self.assertRaises(NotFound):
+            MappingService.generate_osm_xml(self.test_project.id, "999")
+
     def test_map_all_sets_counters_correctly(self):
         if self.skip_tests:
             return
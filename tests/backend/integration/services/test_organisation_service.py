@@ -2,12 +2,15 @@ from datetime import datetime
 from schematics.exceptions import UndefinedValueError
 
 from tests.backend.base import BaseTestCase
-from backend.models.postgis.statuses import ProjectStatus, TeamVisibility
+from backend import db
+from backend.models.postgis.statuses import ProjectStatus, TaskStatus, TeamVisibility
+from backend.models.postgis.task import Task
 from tests.backend.helpers.test_helpers import (
     add_manager_to_organisation,
     create_canned_organisation,
     TEST_ORGANISATION_ID,
     TEST_USER_ID,
+    QueryCounter,
     create_canned_project,
     create_canned_user,
     return_canned_team,
@@ -139,6 +142,46 @@ class TestOrgansitaionService(BaseTestCase):
         self.assertEqual(org_stats.active_tasks.validated, 0)
         self.assertEqual(org_stats.active_tasks.invalidated, 0)
 
+    def test_get_organisation_stats_is_refreshed_on_task_status_change(self):
+        # Arrange
+        test_project, _ = create_canned_project()
+        test_project.organisation = self.test_org
+        test_project.status = ProjectStatus.PUBLISHED.value
+        test_project.save()
+        cached_stats = OrganisationService.get_organisation_stats(self.test_org.id)
+        task = Task.get(2, test_project.id)
+        task.task_status = TaskStatus.MAPPED.value
+        db.session.commit()
+        # Act
+        org_stats = OrganisationService.get_organisation_stats(self.test_org.id)
+        # Assert
+        self.assertEqual(
+            org_stats.active_tasks.mapped, cached_stats.active_tasks.mapped + 1
+        )
+        self.assertEqual(
+            org_stats.active_tasks.ready, cached_stats.active_tasks.ready - 1
+        )
+
+    def test_organisation_is_looked_up_once_per_flush(self):
+        # Arrange
+        test_project, _ = create_canned_project()
+        test_project.organisation = self.test_org
+        test_project.save()
+        tasks = Task.query.filter(Task.project_id == test_project.id).all()
+        # Act
+        with QueryCounter() as queries:
+            for task in tasks:
+                task.task_status = TaskStatus.LOCKED_FOR_MAPPING.value
+            db.session.flush()
+        # Assert
+        organisation_lookups = [
+            statement
+            for statement in queries.statements
+            if statement.startswith("SELECT projects.organisation_id")
+        ]
+        self.assertGreater(len(tasks), 1)
+        self.assertEqual(len(organisation_lookups), 1)
+
     def assert_org_dto(self, org_dto):
         """Asserts that the organisation DTO is correct"""
         self.assertEqual(org_dto.organisation_id, self.test_org.id)
@@ -28,6 +28,7 @@ from tests.backend.helpers.test_helpers import (
     return_canned_user,
     create_canned_organisation,
     create_canned_user,
+    return_canned_draft_project,
 )
 
 
@@ -145,7 +146,7 @@ class TestProjectAdminService(BaseTestCase):
             '"Feature"}], "type": "FeatureCollection"}'
         )
 
-        test_project = Project()
+        test_project = return_canned_draft_project()
 
         # Act
         ProjectAdminService._attach_tasks_to_project(
@@ -158,6 +159,7 @@ class TestProjectAdminService(BaseTestCase):
             test_project.tasks.count(),
             "One task should have been attached to project",
         )
+        self.assertEqual(1, test_project.total_tasks)
 
     @patch.object(UserService, "is_user_the_project_author")
     @patch.object(UserService, "is_user_an_admin")
@@ -7,7 +7,12 @@ from unittest.mock import patch
 from backend.models.dtos.project_dto import ProjectSearchBBoxDTO
 from backend.models.postgis.user import User
 from tests.backend.base import BaseTestCase
-from tests.backend.helpers.test_helpers import get_canned_json
+from backend.models.postgis.statuses import ProjectStatus
+from tests.backend.helpers.test_helpers import (
+    QueryCounter,
+    create_canned_project,
+    get_canned_json,
+)
 
 
 class TestProjectSearchService(BaseTestCase):
@@ -109,3 +114,28 @@ class TestProjectSearchService(BaseTestCase):
 
         # assert
         self.assertAlmostEqual(expected, 28276407740.2797, places=3)
+
+    def test_create_result_dtos_query_count_is_constant(self):
+        # arrange
+        for i in range(4):
+            test_project, _ = create_canned_project(name=f"Test {i}")
+            test_project.status = ProjectStatus.PUBLISHED.value
+            test_project.save()
+        projects = ProjectSearchService.create_search_query().all()
+
+        # act
+        with QueryCounter() as single_page:
+            single_result = ProjectSearchService.create_result_dtos(projects[:1], "en")
+        with QueryCounter() as full_page:
+            results = ProjectSearchService.create_result_dtos(projects, "en")
+
+        # assert
+        self.assertEqual(len(single_result), 1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(single_page.count, full_page.count)
+        self.assertEqual([r.project_id for r in results], [p.id for p in projects])
+        for result in results:
+            self.assertEqual(result.percent_mapped, 66)
+            self.assertEqual(result.percent_validated, 33)
+            self.assertEqual(result.total_contributors, 0)
+            self.assertEqual(result.campaigns, [])
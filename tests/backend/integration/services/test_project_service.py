@@ -1,11 +1,26 @@
 from unittest.mock import patch
 
-from backend.models.postgis.statuses import ProjectStatus, UserRole
+from backend import db
+from backend.models.postgis.project import Project
+from backend.models.postgis.statuses import (
+    MappingNotAllowed,
+    MappingPermission,
+    ProjectStatus,
+    TeamMemberFunctions,
+    TeamRoles,
+    UserRole,
+)
 from backend.services.project_admin_service import ProjectAdminService
 from backend.services.project_service import ProjectService, ProjectServiceError
 from backend.services.team_service import TeamService
 from tests.backend.base import BaseTestCase
-from tests.backend.helpers.test_helpers import create_canned_project, return_canned_user
+from tests.backend.helpers.test_helpers import (
+    add_user_to_team,
+    assign_team_to_project,
+    create_canned_project,
+    create_canned_team,
+    return_canned_user,
+)
 
 
 class TestProjectService(BaseTestCase):
@@ -90,3 +105,53 @@ class TestProjectService(BaseTestCase):
         )
         # Assert
         self.assertIsNotNone(project_dto)
+
+    def test_is_user_permitted_to_map_checks_project_team_membership(self):
+        # Arrange
+        self.test_project.status = ProjectStatus.PUBLISHED.value
+        self.test_project.mapping_permission = MappingPermission.TEAMS.value
+        self.test_project.save()
+        test_team = create_canned_team()
+        assign_team_to_project(self.test_project, test_team, TeamRoles.MAPPER.value)
+
+        # Act
+        not_member = ProjectService.is_user_permitted_to_map(
+            self.test_project.id, self.test_mapper.id
+        )
+        add_user_to_team(
+            test_team, self.test_mapper, TeamMemberFunctions.MEMBER.value, True
+        )
+        member = ProjectService.is_user_permitted_to_map(
+            self.test_project.id, self.test_mapper.id
+        )
+
+        # Assert
+        self.assertEqual(not_member, (False, MappingNotAllowed.USER_NOT_TEAM_MEMBER))
+        self.assertEqual(member, (True, "User allowed to map"))
+
+    def test_permission_context_is_loaded_once_per_transaction(self):
+        # Arrange
+        self.test_project.status = ProjectStatus.PUBLISHED.value
+        self.test_project.save()
+
+        with patch.object(
+            Project,
+            "get_permission_context",
+            wraps=Project.get_permission_context,
+        ) as mock_get_context:
+            # Act
+            ProjectService.is_user_permitted_to_map(
+                self.test_project.id, self.test_mapper.id
+            )
+            ProjectService.is_user_permitted_to_validate(
+                self.test_project.id, self.test_mapper.id
+            )
+            calls_before_commit = mock_get_context.call_count
+            db.session.commit()
+            ProjectService.is_user_permitted_to_map(
+                self.test_project.id, self.test_mapper.id
+            )
+
+        # Assert
+        self.assertEqual(calls_before_commit, 1)
+        self.assertEqual(mock_get_context.call_count, 2)
@@ -1,7 +1,5 @@
-import pandas as pd
-from unittest.mock import patch
-
 from backend.models.postgis.project import ProjectStatus
+from backend.models.postgis.project_feature import ProjectFeature
 from tests.backend.base import BaseTestCase
 from backend.services.recommendation_service import ProjectRecommendationService
 from tests.backend.helpers.test_helpers import (
@@ -16,6 +14,14 @@ class TestProjectRecommendationService(BaseTestCase):
         super().setUp()
         self.service = ProjectRecommendationService()
 
+    @staticmethod
+    def get_features(project_id):
+        """Get the indexed features of a project"""
+        return sorted(
+            feature.feature
+            for feature in ProjectFeature.query.filter_by(project_id=project_id)
+        )
+
     def create_project(self, is_published=True):
         """Create a canned project"""
         project, _ = create_canned_project()
@@ -25,75 +31,6 @@ class TestProjectRecommendationService(BaseTestCase):
         project.save()
         return project
 
-    def test_build_encoded_data_frame_returns_encoded_data_frame(self):
-        """Test that build_encoded_data_frame returns encoded data frame"""
-        # Arrange
-        df = pd.DataFrame(
-            {
-                "id": [1, 2],
-                "default_locale": ["en", "ne"],
-                "difficulty": [1, 2],
-                "country": [["England"], ["Nepal"]],
-                "mapping_types": [[1, 2], [2, 3]],
-                "categories": [[1, 2], [2, 3]],
-            }
-        )
-        # Since default_locale, difficulty, and country are one-hot encoded with each having 2 unique values,
-        # and mapping_types and categories are multi-hot encoded with each having 3 unique values,
-        # the resulting data frame should have 13 columns (2 + 2 + 2 + 3 + 3) + 1 -> the id column
-        # Act
-        df = self.service.build_encoded_data_frame(df)
-        # Assert
-        self.assertEqual(df.shape, (2, 13))
-        self.assertEqual(df["id"].tolist(), [1, 2])
-        self.assertEqual(df["default_locale_en"].tolist(), [1, 0])
-        self.assertEqual(df["default_locale_ne"].tolist(), [0, 1])
-        self.assertEqual(df["difficulty_1"].tolist(), [1, 0])
-        self.assertEqual(df["difficulty_2"].tolist(), [0, 1])
-        self.assertEqual(df["country_England"].tolist(), [1, 0])
-        self.assertEqual(df["country_Nepal"].tolist(), [0, 1])
-        self.assertEqual(df["mapping_types_1"].tolist(), [1, 0])
-        self.assertEqual(df["mapping_types_2"].tolist(), [1, 1])
-        self.assertEqual(df["mapping_types_3"].tolist(), [0, 1])
-        self.assertEqual(df["categories_1"].tolist(), [1, 0])
-        self.assertEqual(df["categories_2"].tolist(), [1, 1])
-        self.assertEqual(df["categories_3"].tolist(), [0, 1])
-
-    def test_get_similar_project_ids_returns_similar_project_ids(self):
-        """Test that get_similar_project_ids returns similar project ids"""
-        # Arrange
-        df = pd.DataFrame(
-            {
-                "id": [1, 2, 3, 4, 5],
-                "default_locale": ["en", "en", "ne", "ne", "ne"],
-                "difficulty": [1, 1, 1, 2, 2],
-                "country": [
-                    ["England"],
-                    ["England"],
-                    ["Nepal"],
-                    ["Nepal"],
-                    ["England"],
-                ],
-                "mapping_types": [[1, 2], [1, 2], [1, 2], [2, 3], [2, 3]],
-                "categories": [[1, 2], [1, 2], [2, 3], [2, 3], [2, 3]],
-            }
-        )
-        df = self.service.build_encoded_data_frame(df)
-        # Act
-        similar_project_ids = self.service.get_similar_project_ids(
-            df, df[df["id"] == 1]
-        )
-        # Assert
-        self.assertEqual(
-            similar_project_ids[0], 2
-        )  # project id 2 is the most similar to project id 1
-        self.assertEqual(
-            similar_project_ids[1], 3
-        )  # project id 1 is the second most similar to project id 1
-        self.assertEqual(
-            similar_project_ids[2], 5
-        )  # project id 5 is the third most similar to project id 1
-
     @staticmethod
     def set_project_columns(project, **kwargs):
         """Set project columns"""
@@ -101,55 +38,64 @@ class TestProjectRecommendationService(BaseTestCase):
             setattr(project, key, value)
         project.save()
 
-    def test_create_project_matrix_returns_project_matrix(self):
-        """Test that create_project_matrix returns project matrix"""
+    def test_project_features_are_updated_with_the_project(self):
+        """Test that the features of a project are updated when the project changes"""
         # Arrange
-        test_interest_1 = create_canned_interest("test-interest-1")
-        test_interest_2 = create_canned_interest("test-interest-2")
-
-        project_1 = self.create_project()
-        project_2 = self.create_project()
-        self.create_project(is_published=False)  # project_3
+        test_interest = create_canned_interest("test-interest-1")
+        project = self.create_project()
+        # Act
         TestProjectRecommendationService.set_project_columns(
-            project_1,
+            project,
             default_locale="en",
             difficulty=1,
             country=["England"],
             mapping_types=[1, 2],
-            interests=[test_interest_1, test_interest_2],
+            interests=[test_interest],
         )
+        # Assert
+        self.assertEqual(
+            self.get_features(project.id),
+            [
+                f"categories_{test_interest.id}",
+                "country_England",
+                "default_locale_en",
+                "difficulty_1",
+                "mapping_types_1",
+                "mapping_types_2",
+            ],
+        )
+        # Unpublished projects are removed from the index
         TestProjectRecommendationService.set_project_columns(
-            project_2,
-            default_locale="ne",
-            difficulty=2,
-            country=["Nepal"],
-            mapping_types=[2],
-            interests=[test_interest_2],
+            project, status=ProjectStatus.ARCHIVED.value
         )
+        self.assertEqual(self.get_features(project.id), [])
+
+    def test_rebuild_index_indexes_published_projects(self):
+        """Test that rebuild_index indexes the published projects only"""
+        # Arrange
+        project_1 = self.create_project()
+        project_2 = self.create_project(is_published=False)
+        ProjectFeature.query.delete()
         # Act
-        project_matrix = self.service.create_project_matrix(project_1.id)
+        projects_indexed = self.service.rebuild_index()
         # Assert
-        # Since default_locale, difficulty, and country are one-hot encoded with each having 2 unique values,
-        # and mapping_types and categories are multi-hot encoded with each having 2 unique values,
-        # the resulting data frame should have 11 columns (2 + 2 + 2 + 2 + 2) + 1 -> the id column
-        self.assertEqual(project_matrix.shape, (2, 11))
-        # Since project_3 is not published, it should not be included in the project matrix
-        self.assertEqual(project_matrix["id"].tolist(), [project_1.id, project_2.id])
-        self.assertEqual(project_matrix["default_locale_en"].tolist(), [1, 0])
-        self.assertEqual(project_matrix["default_locale_ne"].tolist(), [0, 1])
-        self.assertEqual(project_matrix["difficulty_1"].tolist(), [1, 0])
-        self.assertEqual(project_matrix["difficulty_2"].tolist(), [0, 1])
-        self.assertEqual(project_matrix["country_England"].tolist(), [1, 0])
-        self.assertEqual(project_matrix["country_Nepal"].tolist(), [0, 1])
-        self.assertEqual(project_matrix["mapping_types_1"].tolist(), [1, 0])
-        self.assertEqual(project_matrix["mapping_types_2"].tolist(), [1, 1])
-        self.assertEqual(project_matrix["categories_1"].tolist(), [1, 0])
-        self.assertEqual(project_matrix["categories_2"].tolist(), [1, 1])
+        self.assertEqual(projects_indexed, 1)
+        self.assertNotEqual(self.get_features(project_1.id), [])
+        self.assertEqual(self.get_features(project_2.id), [])
 
-    @patch.object(ProjectRecommendationService, "get_similar_project_ids")
-    def test_get_similar_projects_returns_similar_projects(
-        self, mock_get_similar_project_ids
-    ):
+    def test_get_similar_projects_indexes_the_missing_target_only(self):
+        """Test that get_similar_projects indexes the target if it isn't indexed yet"""
+        # Arrange
+        project_1 = self.create_project()
+        project_2 = self.create_project()
+        ProjectFeature.query.delete()
+        # Act
+        self.service.get_similar_projects(project_1.id)
+        # Assert
+        self.assertNotEqual(self.get_features(project_1.id), [])
+        self.assertEqual(self.get_features(project_2.id), [])
+
+    def test_get_similar_projects_returns_similar_projects(self):
         """Test that get_similar_projects returns similar projects"""
         # Arrange
         # Create test interests
@@ -167,10 +113,7 @@ class TestProjectRecommendationService(BaseTestCase):
         update_project_with_info(project_2)
         update_project_with_info(project_3)
 
-        # Set mock return value for get_similar_project_ids
-        mock_get_similar_project_ids.return_value = [project_2.id, project_3.id]
-
-        # Set different values for columns to be used in the project matrix for similarity calculation
+        # Set different values for columns the project features are computed from
         TestProjectRecommendationService.set_project_columns(
             project_1,
             default_locale="en",
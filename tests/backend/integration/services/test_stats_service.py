@@ -1,4 +1,15 @@
-from backend.services.stats_service import StatsService
+from datetime import datetime
+
+from backend import db
+from backend.models.postgis.project import Project
+from backend.models.postgis.stats_rollup import (
+    DailyTaskStats,
+    ProjectStatsRollup,
+    StatsRollup,
+)
+from backend.models.postgis.statuses import TaskStatus
+from backend.models.postgis.task import Task
+from backend.services.stats_service import HOMEPAGE_STATS_ROLLUP, StatsService
 from tests.backend.base import BaseTestCase
 from tests.backend.helpers.test_helpers import create_canned_project
 
@@ -17,3 +28,117 @@ class TestStatsService(BaseTestCase):
         self.assertGreaterEqual(stats.mappers_online, 0)
         self.assertGreater(stats.tasks_mapped, 0)
         self.assertGreater(stats.total_mappers, 0)
+
+    def test_get_project_stats_drift_reports_diverged_counters(self):
+        # Arrange
+        self.test_project.tasks_validated = 0
+        self.test_project.save()
+
+        # Act
+        drift = StatsService.get_project_stats_drift()
+
+        # Assert
+        self.assertEqual(
+            drift, [{"project_id": self.test_project.id, "tasks_validated": (0, 1)}]
+        )
+
+    def test_update_all_project_stats_recounts_tasks(self):
+        # Arrange
+        self.test_project.total_tasks = 3
+        self.test_project.tasks_mapped = 2
+        self.test_project.save()
+
+        # Act
+        projects_updated = StatsService.update_all_project_stats()
+
+        # Assert
+        self.assertEqual(projects_updated, 1)
+        project = Project.get(self.test_project.id)
+        self.assertEqual(project.total_tasks, 4)
+        self.assertEqual(project.tasks_mapped, 1)
+        self.assertEqual(project.tasks_validated, 1)
+        self.assertEqual(project.tasks_bad_imagery, 1)
+        self.assertEqual(StatsService.get_project_stats_drift(), [])
+        self.assertEqual(StatsService.update_all_project_stats(), 0)
+
+    def test_update_all_project_stats_resets_projects_without_tasks(self):
+        # Arrange
+        Task.query.filter(Task.project_id == self.test_project.id).delete()
+        db.session.commit()
+
+        # Act
+        drift = StatsService.get_project_stats_drift()
+        projects_updated = StatsService.update_all_project_stats()
+
+        # Assert
+        self.assertEqual(
+            drift,
+            [
+                {
+                    "project_id": self.test_project.id,
+                    "total_tasks": (4, 0),
+                    "tasks_mapped": (1, 0),
+                    "tasks_validated": (1, 0),
+                    "tasks_bad_imagery": (1, 0),
+                }
+            ],
+        )
+        self.assertEqual(projects_updated, 1)
+        project = Project.get(self.test_project.id)
+        self.assertEqual(project.total_tasks, 0)
+        self.assertEqual(project.tasks_mapped, 0)
+        self.assertEqual(project.tasks_validated, 0)
+        self.assertEqual(project.tasks_bad_imagery, 0)
+
+    def test_full_homepage_stats_are_read_from_rollups(self):
+        # Act
+        stats = StatsService.get_homepage_stats(abbrev=False)
+
+        # Assert
+        self.assertGreater(stats.total_area, 0)
+        self.assertGreater(stats.total_mapped_area, 0)
+        self.assertGreater(stats.total_validated_area, 0)
+        self.assertEqual(stats.total_validators, 1)
+        self.assertEqual(stats.tasks_validated, 1)
+        self.assertIsNotNone(StatsRollup.get(HOMEPAGE_STATS_ROLLUP))
+
+    def test_refresh_homepage_stats_recomputes_task_status_changes(self):
+        # Arrange
+        StatsService.refresh_homepage_stats()
+        rollup = db.session.get(ProjectStatsRollup, self.test_project.id)
+        mapped_area = rollup.mapped_area
+        # Locking for validation changes the task status without updating the project
+        task = Task.query.filter_by(
+            project_id=self.test_project.id, task_status=TaskStatus.MAPPED.value
+        ).first()
+        task.lock_task_for_validating(self.test_user.id)
+
+        # Act
+        projects_refreshed = ProjectStatsRollup.refresh()
+
+        # Assert
+        self.assertEqual(projects_refreshed, 1)
+        db.session.refresh(rollup)
+        self.assertAlmostEqual(rollup.mapped_area, mapped_area - task.area)
+
+    def test_backfill_task_stats_matches_incremental_stats(self):
+        # Arrange
+        for task_id in [1, 2]:
+            task = Task.get(task_id, self.test_project.id)
+            task.lock_task_for_mapping(self.test_user.id)
+            task.unlock_task(self.test_user.id, TaskStatus.MAPPED)
+        today = datetime.utcnow().date()
+        incremental_stats = StatsService.get_task_stats(
+            today, today, None, None, None, None, None
+        ).to_primitive()
+
+        # Act
+        rows_created = DailyTaskStats.backfill()
+        backfilled_stats = StatsService.get_task_stats(
+            today, today, None, None, None, None, None
+        ).to_primitive()
+
+        # Assert
+        self.assertEqual(rows_created, 1)
+        self.assertEqual(incremental_stats["taskStats"][0]["mapped"], 2)
+        self.assertEqual(backfilled_stats, incremental_stats)
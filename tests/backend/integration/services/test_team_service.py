@@ -1,5 +1,6 @@
 from unittest.mock import patch
 
+from backend.models.dtos.team_dto import TeamSearchDTO
 from backend.models.postgis.statuses import (
     TeamJoinMethod,
     TeamMemberFunctions,
@@ -17,7 +18,9 @@ from tests.backend.helpers.test_helpers import (
     create_canned_project,
     create_canned_team,
     create_canned_user,
+    return_canned_team,
     return_canned_user,
+    QueryCounter,
 )
 
 
@@ -146,3 +149,45 @@ class TestTeamService(BaseTestCase):
         TeamService.request_to_join_team(self.test_team.id, test_user.id)
         # Assert
         mock_send_notification.assert_not_called()
+
+    def test_get_all_teams_query_count_is_constant(self):
+        # Arrange
+        test_user = create_canned_user()
+        for i in range(3):
+            test_team = return_canned_team(name=f"Query count team {i}")
+            test_team.create()
+            add_user_to_team(
+                test_team,
+                return_canned_user(f"member {i}", 2000 + i),
+                TeamMemberFunctions.MEMBER.value,
+                True,
+            )
+            add_user_to_team(
+                test_team,
+                return_canned_user(f"manager {i}", 3000 + i),
+                TeamMemberFunctions.MANAGER.value,
+                True,
+            )
+        search_dto = TeamSearchDTO()
+        search_dto.user_id = test_user.id
+        search_dto.full_members_list = False
+
+        # Act
+        search_dto.team_name = "Query count team 0"
+        with QueryCounter() as single_team:
+            single_team_list = TeamService.get_all_teams(search_dto)
+        search_dto.team_name = "Query count team"
+        with QueryCounter() as all_teams:
+            teams_list = TeamService.get_all_teams(search_dto)
+
+        # Assert
+        self.assertEqual(len(single_team_list.teams), 1)
+        self.assertEqual(len(teams_list.teams), 3)
+        self.assertEqual(single_team.count, all_teams.count)
+        for team_dto in teams_list.teams:
+            self.assertEqual(team_dto.members_count, 1)
+            self.assertEqual(team_dto.managers_count, 1)
+            self.assertEqual(
+                [member.function for member in team_dto.members],
+                [TeamMemberFunctions.MEMBER.name, TeamMemberFunctions.MANAGER.name],
+            )
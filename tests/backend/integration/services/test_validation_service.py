@@ -1,10 +1,18 @@
+from unittest.mock import patch
+
 from backend.services.validator_service import (
+    MessageService,
     ValidatorService,
     ValidatorServiceError,
     TaskStatus,
     Task,
 )
-from backend.models.dtos.validator_dto import RevertUserTasksDTO
+from backend.models.dtos.validator_dto import (
+    RevertUserTasksDTO,
+    UnlockAfterValidationDTO,
+    ValidatedTask,
+)
+from backend.models.postgis.task import TaskAction, TaskHistory
 from tests.backend.base import BaseTestCase
 from tests.backend.helpers.test_helpers import create_canned_project, return_canned_user
 
@@ -136,3 +144,48 @@ class TestValidationService(BaseTestCase):
         self.assertEqual(task_1.task_status, TaskStatus.READY.value)
         # task_2 is set as bad imagery by test_author so it should not be reverted to ready status
         self.assertEqual(task_2.task_status, TaskStatus.BADIMAGERY.value)
+
+    @patch.object(MessageService, "_push_messages")
+    def test_unlock_tasks_after_validation_updates_all_tasks(self, mock_push_messages):
+        # Arrange
+        for task_id in [1, 2]:
+            task = Task.get(task_id, self.test_project.id)
+            task.lock_task_for_mapping(self.test_author.id)
+            task.unlock_task(self.test_author.id, new_state=TaskStatus.MAPPED)
+            task.lock_task_for_validating(self.test_user.id)
+        tasks_mapped = self.test_project.tasks_mapped
+        tasks_validated = self.test_project.tasks_validated
+        validated_dto = UnlockAfterValidationDTO()
+        validated_dto.project_id = self.test_project.id
+        validated_dto.user_id = self.test_user.id
+        validated_dto.validated_tasks = []
+        for task_id, status in [(1, "VALIDATED"), (2, "INVALIDATED")]:
+            validated_task = ValidatedTask()
+            validated_task.task_id = task_id
+            validated_task.status = status
+            validated_dto.validated_tasks.append(validated_task)
+
+        # Act
+        task_dtos = ValidatorService.unlock_tasks_after_validation(validated_dto)
+
+        # Assert
+        self.assertEqual([dto.task_id for dto in task_dtos.tasks], [1, 2])
+        self.assertEqual(
+            Task.get(1, self.test_project.id).task_status, TaskStatus.VALIDATED.value
+        )
+        self.assertEqual(
+            Task.get(2, self.test_project.id).task_status,
+            TaskStatus.INVALIDATED.value,
+        )
+        self.assertEqual(self.test_project.tasks_mapped, tasks_mapped - 2)
+        self.assertEqual(self.test_project.tasks_validated, tasks_validated + 1)
+        self.assertIsNotNone(self.test_author.last_validation_date)
+        open_locks = TaskHistory.query.filter_by(
+            project_id=self.test_project.id,
+            action=TaskAction.LOCKED_FOR_VALIDATION.name,
+            action_text=None,
+        ).count()
+        self.assertEqual(open_locks, 0)
+        # The mapper of both tasks is only notified once
+        mock_push_messages.assert_called_once()
+        self.assertEqual(len(mock_push_messages.call_args[0][0]), 1)
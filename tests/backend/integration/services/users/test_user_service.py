@@ -1,7 +1,12 @@
+import datetime
 from unittest.mock import patch
 
 from tests.backend.base import BaseTestCase
+from backend import db
 from backend.models.postgis.message import Message
+from backend.models.postgis.statuses import TaskStatus
+from backend.models.postgis.task import Task, TaskAction
+from backend.models.postgis.user_stats import UserStats
 from backend.services.users.user_service import (
     UserService,
     MappingLevel,
@@ -78,6 +83,41 @@ class TestUserService(BaseTestCase):
         # Assert
         self.assertTrue(test_user.mapping_level, MappingLevel.INTERMEDIATE.value)
 
+    @patch.object(OSMService, "get_osm_details_for_users")
+    def test_refresh_mapper_level_upgrades_users_in_pages(self, mock_osm):
+        # Arrange
+        changesets = {1: 10, 2: 300, 3: 600}
+        for user_id in changesets:
+            return_canned_user(f"Test User {user_id}", user_id).create()
+
+        def get_osm_details(user_ids):
+            details = {}
+            for user_id in user_ids:
+                details[user_id] = UserOSMDTO()
+                details[user_id].changeset_count = changesets[user_id]
+            return details
+
+        mock_osm.side_effect = get_osm_details
+
+        # Act
+        users_updated = UserService.refresh_mapper_level(page_size=2)
+
+        # Assert
+        self.assertEqual(users_updated, 2)
+        self.assertEqual(mock_osm.call_count, 2)
+        levels = [
+            UserService.get_user_by_id(user_id).mapping_level for user_id in changesets
+        ]
+        self.assertEqual(
+            levels,
+            [
+                MappingLevel.BEGINNER.value,
+                MappingLevel.INTERMEDIATE.value,
+                MappingLevel.ADVANCED.value,
+            ],
+        )
+        self.assertEqual(Message.query.count(), 2)
+
     def test_update_user_updates_user_details(self):
         # Arrange
         create_canned_user()
@@ -97,3 +137,96 @@ class TestUserService(BaseTestCase):
         # Assert
         self.assertEqual(expected_user.username, test_user.username)
         self.assertEqual(expected_user.mapping_level, MappingLevel.INTERMEDIATE.value)
+
+    def test_detailed_stats_are_updated_on_state_changes(self):
+        # Arrange
+        test_project, test_user = create_canned_project()
+        test_project.country = ["Nepal"]
+        test_project.save()
+        validator = return_canned_user("Test Validator", 888888)
+        validator.create()
+        UserService.get_detailed_stats(test_user.username)
+        for task_id, review in [
+            (1, TaskStatus.VALIDATED),
+            (2, TaskStatus.INVALIDATED),
+        ]:
+            task = Task.get(task_id, test_project.id)
+            task.set_task_history(
+                TaskAction.STATE_CHANGE, test_user.id, new_state=TaskStatus.MAPPED
+            )
+            task.set_task_history(
+                TaskAction.STATE_CHANGE, validator.id, new_state=review
+            )
+        lock = Task.get(3, test_project.id).set_task_history(
+            TaskAction.LOCKED_FOR_MAPPING, test_user.id
+        )
+        db.session.flush()
+        lock.set_lock_duration(datetime.timedelta(minutes=10))
+        db.session.commit()
+
+        # Act
+        stats = UserService.get_detailed_stats(test_user.username)
+
+        # Assert
+        self.assertEqual(stats.tasks_mapped, 2)
+        self.assertEqual(stats.tasks_validated_by_others, 1)
+        self.assertEqual(stats.tasks_invalidated_by_others, 1)
+        self.assertEqual(stats.time_spent_mapping, 600)
+        self.assertEqual(stats.total_time_spent, 600)
+        country = stats.countries_contributed.countries_contributed[0]
+        self.assertEqual((country.name, country.mapped), ("Nepal", 2))
+        self.assertEqual(stats.contributions_by_day[0].count, 2)
+
+    def test_rebuilt_user_stats_match_incremental_updates(self):
+        # Arrange
+        test_project, test_user = create_canned_project()
+        validator = return_canned_user("Test Validator", 888888)
+        validator.create()
+        UserService.get_user_stats(test_user.id)
+        UserService.get_user_stats(validator.id)
+        task = Task.get(1, test_project.id)
+        task.set_task_history(
+            TaskAction.STATE_CHANGE, validator.id, new_state=TaskStatus.INVALIDATED
+        )
+        task.set_task_history(
+            TaskAction.STATE_CHANGE, test_user.id, new_state=TaskStatus.MAPPED
+        )
+        task.set_task_history(
+            TaskAction.STATE_CHANGE, validator.id, new_state=TaskStatus.VALIDATED
+        )
+        db.session.commit()
+        incremental_stats = [
+            UserService.get_detailed_stats(user.username).to_primitive()
+            for user in [test_user, validator]
+        ]
+
+        # Act
+        UserStats.rebuild()
+        db.session.commit()
+        db.session.expire_all()
+
+        # Assert
+        rebuilt_stats = [
+            UserService.get_detailed_stats(user.username).to_primitive()
+            for user in [test_user, validator]
+        ]
+        self.assertEqual(rebuilt_stats, incremental_stats)
+        self.assertEqual(incremental_stats[0]["tasksInvalidatedByOthers"], 1)
+
+    def test_user_stats_are_rebuilt_when_history_is_deleted(self):
+        # Arrange
+        test_project, test_user = create_canned_project()
+        UserService.get_user_stats(test_user.id)
+        Task.get(1, test_project.id).set_task_history(
+            TaskAction.STATE_CHANGE, test_user.id, new_state=TaskStatus.MAPPED
+        )
+        db.session.commit()
+        mapped_before = UserStats.get(test_user.id).tasks_mapped
+
+        # Act
+        test_project.delete()
+        db.session.expire_all()
+
+        # Assert
+        self.assertEqual(mapped_before, 1)
+        self.assertEqual(UserStats.get(test_user.id).tasks_mapped, 0)
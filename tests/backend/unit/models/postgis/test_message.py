@@ -1,4 +1,5 @@
 from backend.models.postgis.message import Message, MessageType, NotFound
+from backend.models.postgis.notification import Notification
 from backend.services.messaging.message_service import MessageService
 
 from tests.backend.base import BaseTestCase
@@ -123,3 +124,63 @@ class TestMessage(BaseTestCase):
             messages.user_messages[0].message_type,
             MessageType.INVITATION_NOTIFICATION.name,
         )
+
+    def get_unread_counters(self):
+        notification = Notification.query.filter(
+            Notification.user_id == self.test_user.id
+        ).one()
+        return notification.unread_count, notification.new_unread_count
+
+    def test_unread_counters_follow_the_messages(self):
+        """Tests that the unread counters are updated as messages are sent, read and deleted"""
+        # Arrange
+        message_ids = self.send_multiple_welcome_messages(4)
+        bulk_message = Message()
+        bulk_message.message_type = MessageType.SYSTEM.value
+        bulk_message.to_user_id = self.test_user.id
+        Message.insert_messages([bulk_message])
+        # Assert
+        self.assertEqual(self.get_unread_counters(), (5, 5))
+        # Act
+        Message.mark_multiple_messages_read(message_ids[:2], self.test_user.id)
+        # Assert
+        self.assertEqual(self.get_unread_counters(), (3, 3))
+        # Act
+        MessageService.get_message_as_dto(message_ids[2], self.test_user.id)
+        MessageService.delete_message(message_ids[0], self.test_user.id)
+        # Assert
+        self.assertEqual(self.get_unread_counters(), (2, 2))
+        # Act
+        Message.delete_all_messages(self.test_user.id)
+        # Assert
+        self.assertEqual(self.get_unread_counters(), (0, 0))
+
+    def test_checked_messages_are_not_counted_as_new(self):
+        """Tests that the messages received before the last check are only counted as unread"""
+        # Arrange
+        message_ids = self.send_multiple_welcome_messages(2)
+        # Act
+        Notification.query.filter(
+            Notification.user_id == self.test_user.id
+        ).one().update()
+        self.send_multiple_welcome_messages(1)
+        # Assert
+        self.assertEqual(self.get_unread_counters(), (3, 1))
+        # Act
+        Message.mark_multiple_messages_read(message_ids, self.test_user.id)
+        # Assert
+        self.assertEqual(self.get_unread_counters(), (1, 1))
+
+    def test_unread_counters_are_created_once(self):
+        """Tests that reading the count creates the counters of users without any, once"""
+        # Act
+        first_count = Notification.get_unread_message_count(self.test_user.id)
+        second_count = Notification.get_unread_message_count(self.test_user.id)
+        # Assert
+        self.assertEqual((first_count, second_count), (0, 0))
+        self.assertEqual(
+            Notification.query.filter(
+                Notification.user_id == self.test_user.id
+            ).count(),
+            1,
+        )
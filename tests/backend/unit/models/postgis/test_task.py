@@ -1,7 +1,9 @@
+import datetime
 import geojson
 from backend.models.postgis.task import (
     InvalidGeoJson,
     InvalidData,
+    MVT_MAX_ZOOM,
     Task,
     TaskAction,
     TaskHistory,
@@ -185,12 +187,58 @@ class TestTask(BaseTestCase):
 
         test_task = Task()
         test_task.locked_by = "testuser"
-        lock_duration = "02:00"
+        lock_duration = datetime.timedelta(hours=2)
         test_task.record_auto_unlock(lock_duration)
 
         mock_set_task_history.assert_called_with(
             action=TaskAction.AUTO_UNLOCKED_FOR_MAPPING, user_id="testuser"
         )
-        self.assertEqual(mock_history.action_text, lock_duration)
+        mock_history.set_lock_duration.assert_called_with(lock_duration)
         self.assertEqual(test_task.locked_by, None)
         mock_last_action.delete.assert_called()
+
+    def test_get_tiles_covering_bounds_includes_tile_of_each_zoom(self):
+        # Arrange
+        bounds = (-0.1, 51.4, -0.09, 51.41)
+
+        # Act
+        tiles = Task.get_tiles_covering_bounds(bounds)
+
+        # Assert
+        self.assertIn((0, 0, 0), tiles)
+        self.assertIn((12, 2046, 1363), tiles)
+        self.assertEqual({tile[0] for tile in tiles}, set(range(MVT_MAX_ZOOM + 1)))
+
+    def test_get_tiles_covering_bounds_returns_none_above_max_tiles(self):
+        # Act
+        tiles = Task.get_tiles_covering_bounds((-10, 40, 10, 50), max_tiles=256)
+
+        # Assert
+        self.assertIsNone(tiles)
+
+    def test_set_lock_duration_keeps_durations_over_a_day(self):
+        # Arrange
+        history = TaskHistory(1, 1, 1)
+        lock_duration = datetime.timedelta(days=1, hours=2, minutes=3, seconds=4)
+
+        # Act
+        history.set_lock_duration(lock_duration)
+
+        # Assert
+        self.assertEqual(history.lock_duration, lock_duration)
+        self.assertEqual(history.action_text, "02:03:04")
+
+    @patch.object(Task, "auto_unlock_tasks")
+    def test_unlock_if_expired_skips_tasks_with_current_lock(
+        self, mock_auto_unlock_tasks
+    ):
+        # Arrange
+        test_task = Task()
+        test_task.set_lock_expiry()
+
+        # Act
+        unlocked = test_task.unlock_if_expired()
+
+        # Assert
+        self.assertFalse(unlocked)
+        mock_auto_unlock_tasks.assert_not_called()
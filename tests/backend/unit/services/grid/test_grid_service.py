@@ -69,6 +69,19 @@ class TestGridService(BaseTestCase):
         # assert
         self.assertDeepAlmostEqual(expected, result)
 
+    def test_trim_grid_to_aoi_leaves_grid_unchanged(self):
+        # arrange
+        grid_json = get_canned_json("test_grid.json")
+        grid_dto = GridDTO(grid_json)
+        grid_dto.clip_to_aoi = True
+        expected = json.loads(json.dumps(grid_dto.grid))
+
+        # act
+        GridService.trim_grid_to_aoi(grid_dto)
+
+        # assert
+        self.assertEqual(expected, grid_dto.grid)
+
     def test_tasks_from_aoi_features(self):
         # arrange
         grid_json = get_canned_json("test_arbitrary.json")
@@ -156,3 +169,31 @@ class TestGridService(BaseTestCase):
         features = GridService._to_shapely_geometries(grid_geojson)
         # Assert
         self.assertNotEqual(0, len(features))
+
+    def test_get_tiles_bounds_matches_postgis_transform(self):
+        # Arrange
+        # Squares of the tiles transformed from EPSG:3857 by PostGIS
+        expected_squares = get_canned_json("split_task.json")
+        xs = [square["properties"]["x"] for square in expected_squares]
+        ys = [square["properties"]["y"] for square in expected_squares]
+
+        # Act
+        bounds = GridService.get_tiles_bounds(xs, ys, 12)
+
+        # Assert
+        self.assertEqual(bounds.shape, (4, 4))
+        for square, square_bounds in zip(expected_squares, bounds):
+            ring = square["geometry"]["coordinates"][0][0]
+            expected_bounds = (ring[0][0], ring[0][1], ring[2][0], ring[2][1])
+            for expected, actual in zip(expected_bounds, square_bounds):
+                self.assertAlmostEqual(expected, actual, delta=1e-9)
+
+    def test_tiles_to_multi_polygons_returns_tile_squares(self):
+        # Arrange
+        expected_squares = geojson.loads(json.dumps(get_canned_json("split_task.json")))
+
+        # Act
+        squares = GridService.tiles_to_multi_polygons([2020], [2798], 12)
+
+        # Assert
+        self.assertEqual(squares, [expected_squares[0].geometry])
@@ -0,0 +1,151 @@
+import fnmatch
+import pickle
+
+from backend import db
+from backend.models.dtos.project_dto import ProjectSearchResultsDTO, ListSearchResultDTO
+from backend.services.cache_service import (
+    CacheService,
+    LocalCacheBackend,
+    RedisCacheBackend,
+)
+from tests.backend.base import BaseTestCase
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis client commands used by the backend"""
+
+    def __init__(self):
+        self.store = {}
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def scan_iter(self, match):
+        return [key for key in list(self.store) if fnmatch.fnmatch(key, match)]
+
+
+class TestCacheService(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.original_backend = CacheService.backend
+        CacheService.backend = LocalCacheBackend()
+        self.calls = 0
+
+    def tearDown(self):
+        CacheService.backend = self.original_backend
+        super().tearDown()
+
+    def _cached_function(self):
+        @CacheService.cached(
+            "test", ttl=60, tags=lambda project_id: [f"project:{project_id}"]
+        )
+        def get_value(project_id):
+            self.calls += 1
+            return {"project": project_id, "calls": self.calls}
+
+        return get_value
+
+    def test_cached_returns_stored_value(self):
+        # Arrange
+        get_value = self._cached_function()
+
+        # Act
+        first = get_value(1)
+        second = get_value(1)
+        other = get_value(2)
+
+        # Assert
+        self.assertEqual(first, second)
+        self.assertEqual(other["project"], 2)
+        self.assertEqual(self.calls, 2)
+
+    def test_invalidate_only_drops_tagged_entries(self):
+        # Arrange
+        get_value = self._cached_function()
+        get_value(1)
+        get_value(2)
+
+        # Act
+        CacheService.invalidate("project:1")
+        get_value(1)
+        get_value(2)
+
+        # Assert
+        self.assertEqual(self.calls, 3)
+
+    def test_invalidate_with_session_waits_for_commit(self):
+        # Arrange
+        get_value = self._cached_function()
+        get_value(1)
+
+        # Act
+        CacheService.invalidate("project:1", session=db.session)
+        get_value(1)
+        calls_before_commit = self.calls
+        db.session.commit()
+        get_value(1)
+
+        # Assert
+        self.assertEqual(calls_before_commit, 1)
+        self.assertEqual(self.calls, 2)
+
+    def test_invalidate_with_session_is_discarded_on_rollback(self):
+        # Arrange
+        get_value = self._cached_function()
+        get_value(1)
+
+        # Act
+        CacheService.invalidate("project:1", session=db.session)
+        db.session.rollback()
+        db.session.commit()
+        get_value(1)
+
+        # Assert
+        self.assertEqual(self.calls, 1)
+
+    def test_shared_backend_is_seen_by_all_workers(self):
+        # Arrange
+        client = FakeRedis()
+        worker_backends = [RedisCacheBackend(client), RedisCacheBackend(client)]
+        get_value = self._cached_function()
+
+        # Act
+        CacheService.backend = worker_backends[0]
+        first = get_value(1)
+        CacheService.backend = worker_backends[1]
+        second = get_value(1)
+        CacheService.invalidate("project:1")
+        CacheService.backend = worker_backends[0]
+        third = get_value(1)
+
+        # Assert
+        self.assertEqual(first, second)
+        self.assertEqual(third["calls"], 2)
+
+    def test_shared_backend_stores_dtos(self):
+        # Arrange
+        backend = RedisCacheBackend(FakeRedis())
+        dto = ProjectSearchResultsDTO()
+        result = ListSearchResultDTO()
+        result.project_id = 1
+        result.name = "Test"
+        dto.results = [result]
+
+        # Act
+        backend.set("dto", dto, 60)
+        stored = backend.get_many(["dto"])[0]
+
+        # Assert
+        self.assertIsInstance(stored, ProjectSearchResultsDTO)
+        self.assertEqual(stored.to_primitive(), dto.to_primitive())
+        self.assertRaises(TypeError, pickle.dumps, dto)
@@ -11,6 +11,7 @@ from backend.services.project_admin_service import (
 from backend.models.dtos.project_dto import ProjectInfoDTO
 from backend.models.postgis.task import Task
 from tests.backend.base import BaseTestCase
+from tests.backend.helpers.test_helpers import return_canned_draft_project
 
 
 class TestProjectAdminService(BaseTestCase):
@@ -34,7 +35,7 @@ class TestProjectAdminService(BaseTestCase):
             '"Feature"}], "type": "FeatureCollection"}'
         )
 
-        test_project = Project()
+        test_project = return_canned_draft_project()
 
         # Act
         ProjectAdminService._attach_tasks_to_project(
@@ -47,6 +48,7 @@ class TestProjectAdminService(BaseTestCase):
             test_project.tasks.count(),
             "One task should have been attached to project",
         )
+        self.assertEqual(1, test_project.total_tasks)
 
     @patch.object(Project, "get")
     def test_get_raises_error_if_not_found(self, mock_project):
@@ -1,3 +1,5 @@
+from datetime import date
+from types import SimpleNamespace
 from unittest.mock import patch
 from flask import current_app
 
@@ -8,13 +10,16 @@ from backend.services.project_service import (
     NotFound,
     ProjectStatus,
     MappingLevel,
-    UserService,
     MappingNotAllowed,
     ValidatingNotAllowed,
     ProjectInfo,
 )
-from backend.services.project_service import ProjectAdminService
-from backend.models.dtos.project_dto import LockedTasksForUser
+from backend.models.postgis.statuses import (
+    MappingPermission,
+    TeamRoles,
+    UserRole,
+    ValidationPermission,
+)
 from backend.models.postgis.task import Task
 from tests.backend.base import BaseTestCase
 
@@ -33,47 +38,54 @@ class TestProjectService(BaseTestCase):
         with self.assertRaises(NotFound):
             ProjectService.get_project_by_id(123)
 
-    @patch.object(UserService, "get_mapping_level")
-    def test_user_not_allowed_to_map_if_level_enforced(self, mock_level):
-        # Arrange
-        mock_level.return_value = MappingLevel.BEGINNER
-
+    def test_user_not_allowed_to_map_if_level_enforced(self):
         # Act / Assert
-        self.assertFalse(ProjectService._is_user_intermediate_or_advanced(1))
-
-    @patch.object(UserService, "get_mapping_level")
-    def test_user_is_allowed_to_map_if_level_enforced(self, mock_level):
-        # Arrange
-        mock_level.return_value = MappingLevel.ADVANCED
+        self.assertFalse(
+            ProjectService._is_user_intermediate_or_advanced(
+                MappingLevel.BEGINNER.value
+            )
+        )
 
+    def test_user_is_allowed_to_map_if_level_enforced(self):
         # Act / Assert
-        self.assertTrue(ProjectService._is_user_intermediate_or_advanced(1))
-
-    @patch.object(ProjectAdminService, "is_user_action_permitted_on_project")
-    @patch.object(UserService, "is_user_blocked")
-    @patch.object(UserService, "has_user_accepted_license")
-    @patch.object(Task, "get_locked_tasks_for_user")
-    @patch.object(Project, "get")
-    def test_user_allowed_to_map(
-        self,
-        mock_project,
-        mock_user_tasks,
-        mock_user_license,
-        mock_user_blocked,
-        mock_user_is_action_permitted,
-    ):
+        self.assertTrue(
+            ProjectService._is_user_intermediate_or_advanced(
+                MappingLevel.ADVANCED.value
+            )
+        )
+
+    @staticmethod
+    def get_permission_context(**attributes):
+        context = SimpleNamespace(
+            status=ProjectStatus.PUBLISHED.value,
+            private=False,
+            license_id=None,
+            mapping_permission=None,
+            validation_permission=None,
+            author_id=2,
+            organisation_id=None,
+            user_role=UserRole.MAPPER.value,
+            mapping_level=MappingLevel.BEGINNER.value,
+            license_accepted=False,
+            is_org_manager=False,
+            team_roles=None,
+            is_allowed_user=False,
+        )
+        context.__dict__.update(attributes)
+        return context
+
+    @patch.object(Task, "user_has_locked_tasks")
+    @patch.object(ProjectService, "get_permission_context")
+    def test_user_allowed_to_map(self, mock_context, mock_user_has_locked_tasks):
         # Mock project
-        stub_project = Project()
-        stub_project.status = ProjectStatus.PUBLISHED.value
-        stub_project.license_id = 11
-        mock_project.return_value = stub_project
+        stub_context = self.get_permission_context(
+            license_id=11, user_role=UserRole.ADMIN.value
+        )
+        mock_context.return_value = stub_context
 
         # Admin user related
-        mock_user_is_action_permitted.return_value = True
-        mock_user_tasks.return_value = LockedTasksForUser()
-        mock_user_tasks.return_value.locked_tasks = []
-        mock_user_license.return_value = True
-        mock_user_blocked.return_value = False
+        mock_user_has_locked_tasks.return_value = False
+        stub_context.license_accepted = True
 
         allowed, reason = ProjectService.is_user_permitted_to_map(1, 1)
 
@@ -81,117 +93,129 @@ class TestProjectService(BaseTestCase):
         self.assertEqual(reason, "User allowed to map")
 
         # Admin not accepted license should fail
-        mock_user_license.return_value = False
+        stub_context.license_accepted = False
         allowed, reason = ProjectService.is_user_permitted_to_map(1, 1)
         self.assertFalse(allowed)
         self.assertEqual(reason, MappingNotAllowed.USER_NOT_ACCEPTED_LICENSE)
 
         # Admin with already locked tasks should fail
-        mock_user_license.return_value = True
-        mock_user_tasks.return_value.locked_tasks = [1]
+        stub_context.license_accepted = True
+        mock_user_has_locked_tasks.return_value = True
         allowed, reason = ProjectService.is_user_permitted_to_map(1, 1)
         self.assertFalse(allowed)
         self.assertEqual(reason, MappingNotAllowed.USER_ALREADY_HAS_TASK_LOCKED)
 
         # Admin can access draft projects
-        stub_project.status = ProjectStatus.DRAFT.value
-        mock_user_tasks.return_value.locked_tasks = []
+        stub_context.status = ProjectStatus.DRAFT.value
+        mock_user_has_locked_tasks.return_value = False
         allowed, reason = ProjectService.is_user_permitted_to_map(1, 1)
         self.assertTrue(allowed)
         self.assertEqual(reason, "User allowed to map")
 
         # Mappers
-        mock_user_is_action_permitted.return_value = False
-        mock_user_blocked.return_value = False
+        stub_context.user_role = UserRole.MAPPER.value
 
         # cannot access unpublished project
         allowed, reason = ProjectService.is_user_permitted_to_map(1, 1)
         self.assertFalse(allowed)
         self.assertEqual(reason, MappingNotAllowed.PROJECT_NOT_PUBLISHED)
 
+        # Project managers of the organisation can access unpublished projects
+        stub_context.organisation_id = 1
+        stub_context.team_roles = [TeamRoles.PROJECT_MANAGER.value]
+        allowed, reason = ProjectService.is_user_permitted_to_map(1, 1)
+        self.assertTrue(allowed)
+        stub_context.team_roles = None
+        stub_context.status = ProjectStatus.PUBLISHED.value
+
+        # Mappers not on the project team should fail
+        stub_context.mapping_permission = MappingPermission.TEAMS.value
+        allowed, reason = ProjectService.is_user_permitted_to_map(1, 1)
+        self.assertFalse(allowed)
+        self.assertEqual(reason, MappingNotAllowed.USER_NOT_TEAM_MEMBER)
+        stub_context.team_roles = [TeamRoles.MAPPER.value]
+        allowed, reason = ProjectService.is_user_permitted_to_map(1, 1)
+        self.assertTrue(allowed)
+
         # Mappers not accepted license should fail
-        mock_user_license.return_value = False
+        stub_context.license_accepted = False
         allowed, reason = ProjectService.is_user_permitted_to_map(1, 1)
         self.assertFalse(allowed)
         self.assertEqual(reason, MappingNotAllowed.USER_NOT_ACCEPTED_LICENSE)
 
         # Blocked user
-        mock_user_blocked.return_value = True
+        stub_context.user_role = UserRole.READ_ONLY.value
         allowed, reason = ProjectService.is_user_permitted_to_map(1, 1)
         self.assertFalse(allowed)
         self.assertEqual(reason, MappingNotAllowed.USER_NOT_ON_ALLOWED_LIST)
 
-    @patch.object(ProjectAdminService, "is_user_action_permitted_on_project")
-    @patch.object(UserService, "is_user_blocked")
-    @patch.object(UserService, "has_user_accepted_license")
-    @patch.object(Task, "get_locked_tasks_for_user")
-    @patch.object(Project, "get")
-    def test_user_permitted_to_validate(
-        self,
-        mock_project,
-        mock_user_tasks,
-        mock_user_license,
-        mock_user_blocked,
-        mock_user_is_action_permitted,
-    ):
+    @patch.object(Task, "user_has_locked_tasks")
+    @patch.object(ProjectService, "get_permission_context")
+    def test_user_permitted_to_validate(self, mock_context, mock_user_has_locked_tasks):
         # Mock project
-        stub_project = Project()
-        stub_project.status = ProjectStatus.PUBLISHED.value
-        stub_project.license_id = 1
-        mock_project.return_value = stub_project
+        stub_context = self.get_permission_context(
+            license_id=1, author_id=1, license_accepted=True
+        )
+        mock_context.return_value = stub_context
 
-        # Admin user related
-        mock_user_is_action_permitted.return_value = True
-        mock_user_tasks.return_value = LockedTasksForUser()
-        mock_user_tasks.return_value.locked_tasks = []
-        mock_user_license.return_value = True
-        mock_user_blocked.return_value = False
+        # Author related
+        mock_user_has_locked_tasks.return_value = False
 
         allowed, reason = ProjectService.is_user_permitted_to_validate(1, 1)
 
         self.assertTrue(allowed)
         self.assertEqual(reason, "User allowed to validate")
 
-        # Admin not accepted license should fail
-        mock_user_license.return_value = False
+        # Author not accepted license should fail
+        stub_context.license_accepted = False
         allowed, reason = ProjectService.is_user_permitted_to_validate(1, 1)
         self.assertFalse(allowed)
         self.assertEqual(reason, ValidatingNotAllowed.USER_NOT_ACCEPTED_LICENSE)
 
-        # Admin with already locked tasks should fail
-        mock_user_license.return_value = True
-        mock_user_tasks.return_value.locked_tasks = [1]
+        # Author with already locked tasks should fail
+        stub_context.license_accepted = True
+        mock_user_has_locked_tasks.return_value = True
         allowed, reason = ProjectService.is_user_permitted_to_validate(1, 1)
         self.assertFalse(allowed)
         self.assertEqual(reason, ValidatingNotAllowed.USER_ALREADY_HAS_TASK_LOCKED)
 
         # Blocked user
-        mock_user_blocked.return_value = True
+        stub_context.user_role = UserRole.READ_ONLY.value
         allowed, reason = ProjectService.is_user_permitted_to_validate(1, 1)
         self.assertFalse(allowed)
         self.assertEqual(reason, ValidatingNotAllowed.USER_NOT_ON_ALLOWED_LIST)
 
         # Unpublished project
-        stub_project.status = ProjectStatus.DRAFT.value
-        mock_user_blocked.return_value = False
-        mock_user_is_action_permitted.return_value = False
+        stub_context.status = ProjectStatus.DRAFT.value
+        stub_context.user_role = UserRole.MAPPER.value
+        stub_context.author_id = 2
         allowed, reason = ProjectService.is_user_permitted_to_validate(1, 1)
         self.assertFalse(allowed)
         self.assertEqual(reason, ValidatingNotAllowed.PROJECT_NOT_PUBLISHED)
 
-        # Admin can access draft projects
-        stub_project.status = ProjectStatus.DRAFT.value
-        mock_user_blocked.return_value = False
-        mock_user_is_action_permitted.return_value = True
-        mock_user_tasks.return_value.locked_tasks = []
+        # Author can access draft projects
+        stub_context.author_id = 1
+        mock_user_has_locked_tasks.return_value = False
         allowed, reason = ProjectService.is_user_permitted_to_validate(1, 1)
         self.assertTrue(allowed)
         self.assertEqual(reason, "User allowed to validate")
 
+        # Beginners can't validate when the level is enforced
+        stub_context.status = ProjectStatus.PUBLISHED.value
+        stub_context.author_id = 2
+        stub_context.validation_permission = ValidationPermission.LEVEL.value
+        allowed, reason = ProjectService.is_user_permitted_to_validate(1, 1)
+        self.assertFalse(allowed)
+        self.assertEqual(reason, ValidatingNotAllowed.USER_IS_BEGINNER)
+
+        # Unless they are on the allowed list of a private project
+        stub_context.private = True
+        stub_context.is_allowed_user = True
+        allowed, reason = ProjectService.is_user_permitted_to_validate(1, 1)
+        self.assertTrue(allowed)
+
         # Mappers not accepted license should fail
-        mock_user_blocked.return_value = False
-        mock_user_is_action_permitted.return_value = False
-        mock_user_license.return_value = False
+        stub_context.license_accepted = False
         allowed, reason = ProjectService.is_user_permitted_to_validate(1, 1)
         self.assertFalse(allowed)
         self.assertEqual(reason, ValidatingNotAllowed.USER_NOT_ACCEPTED_LICENSE)
@@ -276,3 +300,37 @@ class TestProjectService(BaseTestCase):
             "SEND_PROJECT_EMAIL_UPDATES"
         ] = True  # Set to true for other tests
         self.assertFalse(mock_send_email.called)
+
+    def test_contribs_timeline_replays_state_changes_by_day(self):
+        # Arrange
+        day_1, day_2, day_3 = date(2023, 1, 1), date(2023, 1, 2), date(2023, 1, 3)
+        stats = [
+            ("MAPPED", day_1, 2),
+            ("MAPPED", day_1, 1),
+            ("VALIDATED", day_2, 1),
+            ("INVALIDATED", day_2, 2),
+            ("MAPPED", day_3, 2),
+        ]
+
+        # Act
+        timeline = ProjectService._get_contribs_timeline(stats, 4)
+
+        # Assert
+        self.assertEqual(
+            [
+                (
+                    day.date,
+                    day.mapped,
+                    day.validated,
+                    day.cumulative_mapped,
+                    day.cumulative_validated,
+                    day.total_tasks,
+                )
+                for day in timeline
+            ],
+            [
+                (day_1, 2, 0, 2, 0, 4),
+                (day_2, 0, 1, 1, 1, 4),
+                (day_3, 1, 0, 2, 1, 4),
+            ],
+        )
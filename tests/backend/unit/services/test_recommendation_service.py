@@ -1,6 +1,6 @@
-import pandas as pd
 from tests.backend.base import BaseTestCase
 from backend.models.postgis.project import ProjectStatus
+from backend.models.postgis.project_feature import ProjectFeature
 from backend.services.recommendation_service import ProjectRecommendationService
 from tests.backend.helpers.test_helpers import create_canned_project
 
@@ -19,32 +19,6 @@ class TestProjectRecommendationService(BaseTestCase):
         project.save()
         return project
 
-    def test_to_dataframe_returns_records_into_dataframe(self):
-        """Test that to_dataframe returns records into dataframe"""
-        # Arrange
-        records = [(1, 2, 3), (4, 5, 6)]
-        colunms = ["a", "b", "c"]
-        # Act
-        df = self.service.to_dataframe(records, colunms)
-        # Assert
-        self.assertEqual(df.shape, (2, 3))
-        self.assertEqual(df["a"].tolist(), [1, 4])
-        self.assertEqual(df["b"].tolist(), [2, 5])
-        self.assertEqual(df["c"].tolist(), [3, 6])
-
-    def test_to_dataframe_returns_empty_dataframe_when_records_is_empty(self):
-        """Test that to_dataframe returns empty dataframe when records is empty"""
-        # Arrange
-        records = []
-        colunms = ["a", "b", "c"]
-        # Act
-        df = self.service.to_dataframe(records, colunms)
-        # Assert
-        self.assertEqual(df.shape, (0, 3))
-        self.assertEqual(df["a"].tolist(), [])
-        self.assertEqual(df["b"].tolist(), [])
-        self.assertEqual(df["c"].tolist(), [])
-
     def test_get_all_published_projects_returns_published_projects(self):
         """Test that get_all_published_projects returns published projects"""
         # Arrange
@@ -90,83 +64,28 @@ class TestProjectRecommendationService(BaseTestCase):
         self.assertIsInstance(projects[0].interests, list)
         self.assertEqual(len(projects[0]), 6)
 
-    def test_mlb_transform_adds_new_transformed_columns(self):
-        """Test that mlb_transform adds new transformed columns"""
-        # Arrange
-        test_df = pd.DataFrame(
-            {
-                "id": [1, 2],
-                "mapping_types": [
-                    ["building", "waterway"],
-                    ["building", "road"],
-                ],
-            }
-        )
+    def test_get_features_returns_project_features(self):
+        """Test that get_features returns a feature per attribute value"""
         # Act
-        transformed_df = self.service.mlb_transform(
-            test_df, "mapping_types", "mapping_types_"
+        features = ProjectFeature.get_features(
+            "en", 1, ["Nepal", "India"], [1, 2], [3, None]
         )
         # Assert
-        self.assertEqual(transformed_df.shape, (2, 4))
-        self.assertEqual(transformed_df["mapping_types_building"].tolist(), [1, 1])
-        self.assertEqual(transformed_df["mapping_types_waterway"].tolist(), [1, 0])
-        self.assertEqual(transformed_df["mapping_types_road"].tolist(), [0, 1])
-        self.assertEqual(transformed_df["id"].tolist(), [1, 2])
-
-    def test_mlb_transform_adds_new_transformed_columns_when_column_is_empty(self):
-        """Test that mlb_transform adds new transformed columns when column is empty"""
-        # Arrange
-        test_df = pd.DataFrame(
+        self.assertEqual(
+            features,
             {
-                "id": [1, 2],
-                "mapping_types": [
-                    [],
-                    [],
-                ],
-            }
+                "default_locale_en",
+                "difficulty_1",
+                "country_Nepal",
+                "mapping_types_1",
+                "mapping_types_2",
+                "categories_3",
+            },
         )
-        # Act
-        transformed_df = self.service.mlb_transform(
-            test_df, "mapping_types", "mapping_types_"
-        )
-        # Assert
-        self.assertEqual(transformed_df.shape, (2, 1))
-        self.assertEqual(transformed_df["id"].tolist(), [1, 2])
-
-    def test_one_hot_encoding_adds_new_transformed_columns(self):
-        """Test that one_hot_encoding adds new transformed columns"""
-        # Arrange
-        test_df = pd.DataFrame(
-            {
-                "id": [1, 2],
-                "mapping_types": [
-                    "building",
-                    "waterway",
-                ],
-            }
-        )
-        # Act
-        transformed_df = self.service.one_hot_encoding(test_df, ["mapping_types"])
-        # Assert
-        self.assertEqual(transformed_df.shape, (2, 3))
-        self.assertEqual(transformed_df["mapping_types_building"].tolist(), [1, 0])
-        self.assertEqual(transformed_df["mapping_types_waterway"].tolist(), [0, 1])
-        self.assertEqual(transformed_df["id"].tolist(), [1, 2])
 
-    def test_one_hot_encoding_adds_new_transformed_columns_when_column_is_empty(self):
-        """Test that one_hot_encoding adds new transformed columns when column is empty"""
-        # Arrange
-        test_df = pd.DataFrame(
-            {
-                "id": [1, 2],
-                "mapping_types": [
-                    None,
-                    None,
-                ],
-            }
-        )
+    def test_get_features_ignores_empty_attributes(self):
+        """Test that get_features ignores the empty multi value attributes"""
         # Act
-        transformed_df = self.service.one_hot_encoding(test_df, ["mapping_types"])
+        features = ProjectFeature.get_features("en", 1, [], None, [None])
         # Assert
-        self.assertEqual(transformed_df.shape, (2, 1))
-        self.assertEqual(transformed_df["id"].tolist(), [1, 2])
+        self.assertEqual(features, {"default_locale_en", "difficulty_1"})
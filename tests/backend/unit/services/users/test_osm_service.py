@@ -1,6 +1,59 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
 from tests.backend.base import BaseTestCase
 from tests.backend.helpers.test_helpers import get_canned_osm_user_json_details
-from backend.services.users.osm_service import OSMService, OSMServiceError
+from backend.services.users.osm_service import (
+    OSM_MAX_RETRY_DELAY,
+    OSM_RETRY_DELAY,
+    OSMService,
+    OSMServiceError,
+)
+
+
+class StubOSMServer(ThreadingHTTPServer):
+    """Local stand-in for the OSM multi user details endpoint"""
+
+    def __init__(self, changesets_by_user: dict):
+        super().__init__(("127.0.0.1", 0), StubOSMHandler)
+        self.changesets_by_user = changesets_by_user
+        self.requested_users = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class StubOSMHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        user_ids = [
+            int(user_id) for user_id in parse_qs(url.query)["users"][0].split(",")
+        ]
+        self.server.requested_users.append(user_ids)
+        users = [
+            {
+                "user": {
+                    "id": user_id,
+                    "account_created": "2017-01-23T16:23:22Z",
+                    "changesets": {"count": self.server.changesets_by_user[user_id]},
+                }
+            }
+            for user_id in user_ids
+            if user_id in self.server.changesets_by_user
+        ]
+        self.send_response(200 if users else 404)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps({"users": users}).encode())
+
+    def log_message(self, format, *args):
+        pass
 
 
 class TestOsmService(BaseTestCase):
@@ -19,3 +72,58 @@ class TestOsmService(BaseTestCase):
         # Assert
         self.assertEqual(dto.account_created, "2017-01-23T16:23:22Z")
         self.assertEqual(dto.changeset_count, 16)
+
+    def test_get_retry_delay_parses_seconds_and_dates(self):
+        # Arrange
+        retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=5))
+        # Act/Assert
+        self.assertEqual(OSMService._get_retry_delay("3"), 3)
+        self.assertAlmostEqual(OSMService._get_retry_delay(retry_at), 5, delta=1.5)
+        self.assertEqual(OSMService._get_retry_delay("3600"), OSM_MAX_RETRY_DELAY)
+        self.assertEqual(OSMService._get_retry_delay("not a date"), OSM_RETRY_DELAY)
+        self.assertEqual(OSMService._get_retry_delay(None), OSM_RETRY_DELAY)
+
+
+class TestOsmServiceBatchRequests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = StubOSMServer({1: 10, 2: 300, 3: 600})
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.osm_server_url = self.app.config["OSM_SERVER_URL"]
+        self.app.config["OSM_SERVER_URL"] = self.server.url
+
+    def tearDown(self):
+        self.app.config["OSM_SERVER_URL"] = self.osm_server_url
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    @patch("backend.services.users.osm_service.OSM_USERS_PER_REQUEST", 2)
+    def test_get_osm_details_for_users_requests_users_in_batches(self):
+        # Act
+        details = OSMService.get_osm_details_for_users([1, 2, 3, 4])
+
+        # Assert
+        self.assertEqual(
+            {user_id: dto.changeset_count for user_id, dto in details.items()},
+            {1: 10, 2: 300, 3: 600},
+        )
+        self.assertEqual(sorted(self.server.requested_users), [[1, 2], [3, 4]])
+
+    def test_get_osm_details_for_users_uses_cached_details(self):
+        # Arrange
+        OSMService.get_osm_details_for_users([1, 2])
+
+        # Act
+        details = OSMService.get_osm_details_for_users([1, 2, 3])
+
+        # Assert
+        self.assertEqual(details[3].changeset_count, 600)
+        self.assertEqual(self.server.requested_users, [[1, 2], [3]])
+
+    def test_get_osm_details_for_users_skips_unknown_users(self):
+        # Act
+        details = OSMService.get_osm_details_for_users([5, 6])
+
+        # Assert
+        self.assertEqual(details, {})